@@ -0,0 +1,47 @@
+"""add outbox event
+
+Revision ID: 2c7e5a9f3d18
+Revises: d58a3e7c1b94
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7e5a9f3d18'
+down_revision: Union[str, Sequence[str], None] = 'd58a3e7c1b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notification_outbox', sa.Column('event', sa.String(), server_default='', nullable=False))
+
+    # Тип события — начало ключа идемпотентности: added:<ip>:<время>:<chat_id>
+    outbox = sa.table(
+        'notification_outbox',
+        sa.column('id', sa.Integer()),
+        sa.column('idempotency_key', sa.String()),
+        sa.column('event', sa.String()),
+    )
+    bind = op.get_bind()
+    rows = [
+        {'row_id': row_id, 'new_event': key.split(':', 1)[0]}
+        for row_id, key in bind.execute(sa.select(outbox.c.id, outbox.c.idempotency_key))
+    ]
+    stmt = outbox.update().where(outbox.c.id == sa.bindparam('row_id')).values(event=sa.bindparam('new_event'))
+    for i in range(0, len(rows), BATCH_SIZE):
+        bind.execute(stmt, rows[i:i + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('notification_outbox') as batch_op:
+        batch_op.drop_column('event')
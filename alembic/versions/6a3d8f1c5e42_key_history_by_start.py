@@ -0,0 +1,47 @@
+"""key history by start
+
+Revision ID: 6a3d8f1c5e42
+Revises: e9c4a2f7b316
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a3d8f1c5e42'
+down_revision: Union[str, Sequence[str], None] = 'e9c4a2f7b316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    history = sa.table(
+        'server_history',
+        sa.column('start', sa.DateTime(timezone=True)),
+        sa.column('end', sa.DateTime(timezone=True)),
+    )
+    # Старые записи об удалении без пары: начало неизвестно, периодом считается
+    # момент удаления. Строки без обеих дат ничего не показывали в /history
+    op.execute(history.delete().where(history.c.start.is_(None), history.c.end.is_(None)))
+    op.execute(history.update().where(history.c.start.is_(None)).values(start=history.c.end))
+
+    op.drop_index('ix_server_history_server_ip_start', table_name='server_history')
+    with op.batch_alter_table('server_history') as batch_op:
+        batch_op.alter_column('start', existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index(
+        'ix_server_history_server_ip_start_id', 'server_history', ['server_ip', 'start', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # start у бывших записей без пары остается равным end
+    op.drop_index('ix_server_history_server_ip_start_id', table_name='server_history')
+    with op.batch_alter_table('server_history') as batch_op:
+        batch_op.alter_column('start', existing_type=sa.DateTime(timezone=True), nullable=True)
+    op.create_index('ix_server_history_server_ip_start', 'server_history', ['server_ip', 'start'], unique=False)
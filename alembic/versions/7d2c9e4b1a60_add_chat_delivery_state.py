@@ -0,0 +1,35 @@
+"""add chat delivery state
+
+Revision ID: 7d2c9e4b1a60
+Revises: e3b7d41a6c28
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c9e4b1a60'
+down_revision: Union[str, Sequence[str], None] = 'e3b7d41a6c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('user', 'chat'):
+        op.add_column(table, sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+        op.add_column(table, sa.Column('send_failures', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('deactivated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('chat', 'user'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('deactivated_at')
+            batch_op.drop_column('send_failures')
+            batch_op.drop_column('is_active')
@@ -0,0 +1,70 @@
+"""initial schema
+
+Revision ID: 8cedf849a8d6
+Revises: 
+Create Date: 2025-08-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8cedf849a8d6'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'chat',
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('chat_type', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('chat_id'),
+    )
+    op.create_table(
+        'server',
+        sa.Column('ip_adress', sa.String(), nullable=False),
+        sa.Column('text', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('start', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'user',
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('telegram_id'),
+    )
+    op.create_table(
+        'server_history',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('server_ip', sa.String(), nullable=False),
+        sa.Column('start', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['server_ip'], ['server.ip_adress']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('server_history')
+    op.drop_table('user')
+    op.drop_table('server')
+    op.drop_table('chat')
@@ -0,0 +1,53 @@
+"""add server lookup indexes
+
+Revision ID: 9a4e6b1f0c53
+Revises: 3f1c9a7d2b4e
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b1f0c53'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Перед добавлением уникальности оставляем по одной (последней) записи на IP
+    op.execute(
+        'DELETE FROM server WHERE id NOT IN '
+        '(SELECT MAX(id) FROM server GROUP BY ip_adress)'
+    )
+    with op.batch_alter_table('server') as batch_op:
+        batch_op.create_unique_constraint('uq_server_ip_adress', ['ip_adress'])
+
+    is_active = sa.column('is_active', sa.Boolean()) == sa.true()
+    op.create_index(
+        'ix_server_active_ip_adress',
+        'server',
+        ['ip_adress'],
+        unique=False,
+        sqlite_where=is_active,
+        postgresql_where=is_active,
+    )
+    op.create_index(
+        'ix_server_history_server_ip_end',
+        'server_history',
+        ['server_ip', 'end'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_server_history_server_ip_end', table_name='server_history')
+    op.drop_index('ix_server_active_ip_adress', table_name='server')
+    with op.batch_alter_table('server') as batch_op:
+        batch_op.drop_constraint('uq_server_ip_adress', type_='unique')
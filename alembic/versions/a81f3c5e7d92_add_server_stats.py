@@ -0,0 +1,130 @@
+"""add server stats
+
+Revision ID: a81f3c5e7d92
+Revises: 7d2c9e4b1a60
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81f3c5e7d92'
+down_revision: Union[str, Sequence[str], None] = '7d2c9e4b1a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+MSK = timezone(timedelta(hours=3))
+
+
+# Снимок логики servercatcher.app.notification.stats на момент этой ревизии:
+# миграция не импортирует код приложения, чтобы его изменения не меняли прошлый backfill
+
+def as_msk(dt: datetime | None) -> datetime | None:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=MSK)
+    return dt
+
+
+def empty_stats(ip: str) -> dict:
+    return {
+        'ip_adress': ip,
+        'placements': 0,
+        'total_seconds': 0.0,
+        'first_seen': None,
+        'last_seen': None,
+        'current_start': None,
+        'is_active': False,
+        'rank_key': 0.0,
+    }
+
+
+def apply_placement(row: dict, op_name: str, at: datetime) -> None:
+    at = as_msk(at)
+    first_seen = as_msk(row['first_seen'])
+    last_seen = as_msk(row['last_seen'])
+    if first_seen is None or at < first_seen:
+        row['first_seen'] = at
+    if last_seen is None or at > last_seen:
+        row['last_seen'] = at
+
+    if op_name == 'open':
+        if row['is_active']:
+            return
+        # Повторное открытие не раньше прошлого закрытия: это время уже учтено
+        if last_seen is not None and at < last_seen:
+            at = last_seen
+        row['placements'] += 1
+        row['is_active'] = True
+        row['current_start'] = at
+        row['rank_key'] = row['total_seconds'] - at.timestamp()
+    elif row['is_active']:
+        start = as_msk(row['current_start'])
+        row['total_seconds'] += max(0.0, (at - start).total_seconds())
+        row['is_active'] = False
+        row['current_start'] = None
+        row['rank_key'] = row['total_seconds']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    server_stats = op.create_table(
+        'server_stats',
+        sa.Column('ip_adress', sa.String(), nullable=False),
+        sa.Column('placements', sa.Integer(), nullable=False),
+        sa.Column('total_seconds', sa.Float(), nullable=False),
+        sa.Column('first_seen', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_seen', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('current_start', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('rank_key', sa.Float(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ip_adress'),
+    )
+    op.create_index('ix_server_stats_is_active_rank_key', 'server_stats', ['is_active', 'rank_key'], unique=False)
+
+    # Заполняем сводку по уже накопленной истории: строка со start открывает
+    # размещение, строка с end — закрывает. Порядок — порядок вставки, как
+    # их применял цикл опроса (старт при повторном открытии бывает раньше закрытия)
+    history = sa.table(
+        'server_history',
+        sa.column('id', sa.Integer()),
+        sa.column('server_ip', sa.String()),
+        sa.column('start', sa.DateTime(timezone=True)),
+        sa.column('end', sa.DateTime(timezone=True)),
+    )
+    rows = op.get_bind().execute(
+        sa.select(history.c.server_ip, history.c.start, history.c.end)
+        .where(sa.or_(history.c.start.is_not(None), history.c.end.is_not(None)))
+        .order_by(history.c.server_ip, history.c.id)
+    )
+    batch: list[dict] = []
+    row = None
+    for ip, start, end in rows:
+        if row is None or row['ip_adress'] != ip:
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                op.bulk_insert(server_stats, batch)
+                batch = []
+            row = empty_stats(ip)
+        if start is not None:
+            apply_placement(row, 'open', start)
+        else:
+            apply_placement(row, 'close', end)
+    if row is not None:
+        batch.append(row)
+    if batch:
+        op.bulk_insert(server_stats, batch)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_server_stats_is_active_rank_key', table_name='server_stats')
+    op.drop_table('server_stats')
@@ -0,0 +1,32 @@
+"""add source provenance
+
+Revision ID: c27d5e8a4f19
+Revises: 9a4e6b1f0c53
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d5e8a4f19'
+down_revision: Union[str, Sequence[str], None] = '9a4e6b1f0c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('server', sa.Column('source', sa.String(), nullable=True))
+    op.add_column('server_history', sa.Column('source', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('server_history') as batch_op:
+        batch_op.drop_column('source')
+    with op.batch_alter_table('server') as batch_op:
+        batch_op.drop_column('source')
@@ -0,0 +1,49 @@
+"""add poller checkpoint
+
+Revision ID: d58a3e7c1b94
+Revises: b6e2a9d41f37
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd58a3e7c1b94'
+down_revision: Union[str, Sequence[str], None] = 'b6e2a9d41f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'poller_checkpoint',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('digest', sa.String(), nullable=False),
+        sa.Column('cycle_day', sa.Date(), nullable=False),
+        sa.Column('last_cycle_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('next_boundary', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'poller_server_state',
+        sa.Column('ip_adress', sa.String(), nullable=False),
+        sa.Column('start_raw', sa.String(), nullable=True),
+        sa.Column('end_raw', sa.String(), nullable=True),
+        sa.Column('listed', sa.Boolean(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ip_adress'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('poller_server_state')
+    op.drop_table('poller_checkpoint')
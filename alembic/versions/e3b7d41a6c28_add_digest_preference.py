@@ -0,0 +1,32 @@
+"""add digest preference
+
+Revision ID: e3b7d41a6c28
+Revises: 5b8f2c6d9e07
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7d41a6c28'
+down_revision: Union[str, Sequence[str], None] = '5b8f2c6d9e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('digest', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('chat', sa.Column('digest', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('chat') as batch_op:
+        batch_op.drop_column('digest')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('digest')
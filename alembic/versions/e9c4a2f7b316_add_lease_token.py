@@ -0,0 +1,29 @@
+"""add lease token
+
+Revision ID: e9c4a2f7b316
+Revises: 2c7e5a9f3d18
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c4a2f7b316'
+down_revision: Union[str, Sequence[str], None] = '2c7e5a9f3d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('lease', sa.Column('token', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('lease') as batch_op:
+        batch_op.drop_column('token')
@@ -0,0 +1,81 @@
+"""compact server history
+
+Revision ID: f4d19b7c2e85
+Revises: a81f3c5e7d92
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4d19b7c2e85'
+down_revision: Union[str, Sequence[str], None] = 'a81f3c5e7d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('server_stats', sa.Column('rolled_placements', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('server_stats', sa.Column('rolled_seconds', sa.Float(), server_default='0', nullable=False))
+    op.add_column('server_stats', sa.Column('rolled_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_server_history_server_ip_start', 'server_history', ['server_ip', 'start'], unique=False)
+
+    # Старая схема писала открытие строкой только со start, а закрытие —
+    # отдельной строкой только с end. Сводим их в периоды в порядке вставки:
+    # end записывается в открытую строку, строка закрытия удаляется
+    history = sa.table(
+        'server_history',
+        sa.column('id', sa.Integer()),
+        sa.column('server_ip', sa.String()),
+        sa.column('start', sa.DateTime(timezone=True)),
+        sa.column('end', sa.DateTime(timezone=True)),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(history.c.id, history.c.server_ip, history.c.start, history.c.end)
+        .order_by(history.c.server_ip, history.c.id)
+    ).all()
+
+    closes: list[dict] = []
+    deleted: list[int] = []
+    ip = open_id = None
+    for row_id, server_ip, start, end in rows:
+        if server_ip != ip:
+            ip, open_id = server_ip, None
+        if start is not None and end is None:
+            if open_id is None:
+                open_id = row_id
+            else:
+                # Повторное открытие без закрытия — продолжение того же периода
+                deleted.append(row_id)
+        elif start is None and end is not None and open_id is not None:
+            closes.append({'row_id': open_id, 'new_end': end})
+            deleted.append(row_id)
+            open_id = None
+
+    close = (
+        history.update()
+        .where(history.c.id == sa.bindparam('row_id'))
+        .values(end=sa.bindparam('new_end'))
+    )
+    for i in range(0, len(closes), BATCH_SIZE):
+        bind.execute(close, closes[i:i + BATCH_SIZE])
+    for i in range(0, len(deleted), BATCH_SIZE):
+        bind.execute(history.delete().where(history.c.id.in_(deleted[i:i + BATCH_SIZE])))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Периоды остаются слитыми: старое чтение берет строки с обоими полями как есть
+    op.drop_index('ix_server_history_server_ip_start', table_name='server_history')
+    with op.batch_alter_table('server_stats') as batch_op:
+        batch_op.drop_column('rolled_until')
+        batch_op.drop_column('rolled_seconds')
+        batch_op.drop_column('rolled_placements')
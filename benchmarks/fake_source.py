@@ -0,0 +1,65 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+
+class FakeSource:
+    """Источник со сгенерированным списком серверов.
+
+    size — размер списка, churn — доля серверов, которые при каждом
+    advance() уходят из списка и заменяются новыми IP. Ответ отдается
+    с ETag, поэтому условные GET работают как с настоящим источником.
+    """
+
+    def __init__(self, size: int, churn: float = 0.001, seed: int = 0):
+        self.size = size
+        self.churn = churn
+        self.random = random.Random(seed)
+        self.version = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._next_id = 0
+        today = datetime.now()
+        self.start = (today - timedelta(days=1)).strftime("%d/%m/%Y")
+        self.end = (today + timedelta(days=30)).strftime("%d/%m/%Y")
+        self.servers = [self._new_server() for _ in range(size)]
+        self._body = self._render()
+
+    def _new_server(self) -> dict:
+        n = self._next_id
+        self._next_id += 1
+        return {
+            "ip": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}:{27015 + (n >> 24)}",
+            "name": f"Server #{n}",
+            "start": self.start,
+            "end": self.end,
+        }
+
+    def _render(self) -> bytes:
+        return json.dumps({"servers": self.servers}).encode()
+
+    def advance(self) -> int:
+        """Заменяет долю churn серверов новыми, возвращает число замен"""
+        if not self.servers:
+            return 0
+        changed = max(1, round(self.size * self.churn)) if self.churn else 0
+        for idx in self.random.sample(range(len(self.servers)), min(changed, len(self.servers))):
+            self.servers[idx] = self._new_server()
+        self.version += 1
+        self._body = self._render()
+        return changed
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        self.bytes_sent += len(self._body)
+        return web.Response(body=self._body, content_type="application/json", headers={"ETag": etag})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.handle)
+        return app
@@ -0,0 +1,65 @@
+import asyncio
+import itertools
+import random
+import time
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    """Заглушка Bot API: отвечает на любой метод с задержкой latency,
+    а пока включен throttling — на долю rate_429 запросов sendMessage
+    ошибкой 429 с retry_after. Ответы обработчиков команд 429 не получают:
+    их повторы — забота рассылки, а не dispatcher"""
+
+    def __init__(self, latency: float = 0.02, rate_429: float = 0.0, retry_after: int = 1, seed: int = 0):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.throttling = False
+        self.calls: dict[str, int] = {}
+        self.throttled = 0
+        self.started = time.monotonic()
+        self._message_ids = itertools.count(1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        data = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "sendMessage":
+            if self.throttling and self.rate_429 and self.random.random() < self.rate_429:
+                self.throttled += 1
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {self.retry_after}",
+                        "parameters": {"retry_after": self.retry_after},
+                    },
+                    status=429,
+                )
+            chat_id = int(data.get("chat_id", 0))
+            return web.json_response({
+                "ok": True,
+                "result": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                    "text": data.get("text", ""),
+                },
+            })
+        if method == "getMe":
+            return web.json_response({
+                "ok": True,
+                "result": {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"},
+            })
+        return web.json_response({"ok": True, "result": True})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
@@ -0,0 +1,228 @@
+"""Воспроизведение архива ответов источников через сравнение и рассылку.
+
+Архив пишет бот, если задан ARCHIVE_DIR. Replay прогоняет записанные
+циклы по порядку с их исходным временем, но без пауз между ними, против
+временной БД и заглушки Bot API (FakeTelegram):
+
+    python -m benchmarks.replay ./archive --history-out history.jsonl
+    python -m benchmarks.replay ./archive --compare-history history.jsonl
+
+--compare-history сверяет получившуюся server_history с выгрузкой
+прошлого прогона — так проверяются переписывания сравнения.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.run import ROOT, db_statements_total, free_port, percentile
+
+
+def history_lines(rows) -> list[str]:
+    def iso(value: datetime | None) -> str | None:
+        return value.isoformat() if value is not None else None
+
+    return [
+        json.dumps(
+            {"server_ip": ip, "start": iso(start), "end": iso(end), "source": source},
+            ensure_ascii=False,
+        )
+        for ip, start, end, source in rows
+    ]
+
+
+def compare_history(expected_path: str, actual: list[str]) -> dict:
+    expected = Path(expected_path).read_text(encoding="utf-8").splitlines()
+    for idx, (before, after) in enumerate(zip(expected, actual)):
+        if before != after:
+            return {"identical": False, "first_difference": idx, "expected": before, "actual": after}
+    if len(expected) != len(actual):
+        return {
+            "identical": False,
+            "first_difference": min(len(expected), len(actual)),
+            "expected_rows": len(expected),
+            "actual_rows": len(actual),
+        }
+    return {"identical": True, "rows": len(actual)}
+
+
+async def replay(args, telegram_port: int) -> dict:
+    # Импорт после настройки окружения: настройки читаются при первом обращении
+    from aiohttp import web
+    from sqlalchemy import func, insert, select
+
+    from benchmarks.fake_telegram import FakeTelegram
+    from servercatcher.app.notification import outbox
+    from servercatcher.app.notification.archive import PayloadArchive
+    from servercatcher.app.notification.broadcast import Broadcaster
+    from servercatcher.app.notification.handler import PollState, apply_fetch
+    from servercatcher.app.notification.source import FetchResult, MergedFetch, close_sources, merge_fetches
+    from servercatcher.app.notification.subscribers import subscribers
+    from servercatcher.core.config import get_bot
+    from servercatcher.core.models import NotificationOutbox, ServerHistory, User, db_helper
+
+    bot = get_bot()
+
+    archive = PayloadArchive(args.archive)
+    telegram = FakeTelegram(latency=args.latency, seed=args.seed)
+    runner = web.AppRunner(telegram.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", telegram_port).start()
+
+    result: dict = {"archive": str(archive.root), "subscribers": args.subscribers}
+    try:
+        async with db_helper.session_factory() as session:
+            if args.subscribers:
+                await session.execute(
+                    insert(User), [{"telegram_id": chat_id} for chat_id in range(1, args.subscribers + 1)]
+                )
+                await session.commit()
+            await subscribers.load(session)
+        outbox.broadcaster = Broadcaster(
+            bot,
+            global_rate=args.send_rate,
+            private_rate=args.send_rate,
+            group_rate=args.send_rate,
+            concurrency=args.concurrency,
+        )
+
+        state = PollState()
+        loaded: dict[str, FetchResult] = {}
+        merged: MergedFetch | None = None
+        cycle_times: list[float] = []
+        cycle_statements: list[float] = []
+        parse_seconds = 0.0
+        delivered = 0
+        cycles = 0
+        first_at = last_at = None
+        started = time.perf_counter()
+
+        for at, digests in archive.observations():
+            if args.max_cycles is not None and cycles >= args.max_cycles:
+                break
+            cycles += 1
+            first_at = first_at or at
+            last_at = at
+
+            parts: list[tuple[str, FetchResult]] = []
+            failed = set()
+            for name, digest in digests.items():
+                if digest is None:
+                    failed.add(name)
+                    continue
+                fetch = loaded.get(name)
+                if fetch is None or fetch.digest != digest:
+                    parse_started = time.perf_counter()
+                    snapshot = archive.load(digest, name, previous=fetch.snapshot if fetch else None)
+                    parse_seconds += time.perf_counter() - parse_started
+                    fetch = loaded[name] = FetchResult(snapshot=snapshot, digest=digest)
+                parts.append((name, fetch))
+            merged = merge_fetches(parts, failed, merged)
+
+            previous_key = state.cycle_key
+            statements = db_statements_total()
+            cycle_started = time.perf_counter()
+            await apply_fetch(state, merged, at)
+            if state.cycle_key != previous_key:
+                # Учитываем только циклы, дошедшие до БД
+                cycle_times.append(time.perf_counter() - cycle_started)
+                cycle_statements.append(db_statements_total() - statements)
+
+            if args.deliver:
+                while processed := await outbox.drain_outbox_batch():
+                    delivered += processed
+
+        wall = time.perf_counter() - started
+        span = (last_at - first_at).total_seconds() if first_at is not None else 0.0
+        async with db_helper.session_factory() as session:
+            enqueued = await session.scalar(select(func.count(NotificationOutbox.id)))
+            history = (
+                await session.execute(
+                    select(
+                        ServerHistory.server_ip, ServerHistory.start, ServerHistory.end, ServerHistory.source
+                    ).order_by(ServerHistory.id)
+                )
+            ).all()
+
+        result.update(
+            {
+                "cycles": cycles,
+                "processed_cycles": len(cycle_times),
+                "span_seconds": span,
+                "wall_seconds": wall,
+                "speedup": span / wall if wall else 0.0,
+                "parse_seconds": parse_seconds,
+                "cycle_p50": statistics.median(cycle_times) if cycle_times else 0.0,
+                "cycle_p95": percentile(cycle_times, 0.95),
+                "cycle_max": max(cycle_times, default=0.0),
+                "db_statements_max": max(cycle_statements, default=0),
+                "enqueued": enqueued,
+                "delivered": delivered,
+                "api_calls": telegram.calls.get("sendMessage", 0),
+                "history_rows": len(history),
+            }
+        )
+
+        lines = history_lines(history)
+        if args.history_out:
+            Path(args.history_out).write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+        if args.compare_history:
+            result["history"] = compare_history(args.compare_history, lines)
+    finally:
+        await close_sources()
+        await bot.session.close()
+        await db_helper.dispose()
+        await runner.cleanup()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive", help="каталог архива (ARCHIVE_DIR бота)")
+    parser.add_argument("--db", help="файл SQLite для результата (по умолчанию временный)")
+    parser.add_argument("--max-cycles", type=int, help="прогнать только первые N циклов")
+    parser.add_argument("--subscribers", type=int, default=10, help="число подписчиков")
+    parser.add_argument("--no-deliver", dest="deliver", action="store_false", help="не отправлять outbox")
+    parser.add_argument("--send-rate", type=float, default=10000, help="лимит отправки, сообщений в секунду")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка заглушки Bot API, секунды")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history-out", help="выгрузить server_history в JSONL")
+    parser.add_argument("--compare-history", help="сверить server_history с прошлой выгрузкой")
+    args = parser.parse_args()
+
+    if not (Path(args.archive) / "observations.jsonl").exists():
+        raise SystemExit(f"[replay] в {args.archive} нет observations.jsonl")
+
+    telegram_port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db).resolve() if args.db else Path(tmp) / "replay.sqlite3"
+        if db_path.exists():
+            raise SystemExit(f"[replay] {db_path} уже существует, нужна пустая БД")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+        os.environ["TELEGRAM_API_BASE"] = f"http://127.0.0.1:{telegram_port}"
+        os.environ.setdefault("TELEGRAM_TOKEN", "1:replay")
+        os.environ.setdefault("BOT_USERNAME", "replay_bot")
+        # Воспроизведение не должно дописывать архив, который читает
+        os.environ.pop("ARCHIVE_DIR", None)
+
+        from alembic import command
+        from alembic.config import Config
+
+        command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+        result = asyncio.run(replay(args, telegram_port))
+
+    print(json.dumps(result, indent=2))
+    if result.get("history", {}).get("identical") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Бенчмарк цикла опроса, рассылки и команд на синтетических данных.
+
+Каждый размер запускается в отдельном процессе со своей временной БД,
+локальным источником (FakeSource) и заглушкой Bot API (FakeTelegram):
+
+    python -m benchmarks.run --sizes 100,10000,100000 --output bench.json
+    python -m benchmarks.run --sizes 10000 --compare bench.json
+
+Результат — JSON, который можно сравнивать между запусками через --compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Метрики, по которым --compare считает изменение (больше — хуже)
+COMPARED = {
+    "cold_cycle.seconds": ("cold_cycle", "seconds"),
+    "churn_cycle.seconds_p50": ("churn_cycles", "seconds_p50"),
+    "churn_cycle.db_statements": ("churn_cycles", "db_statements_max"),
+    "unchanged_cycle.seconds": ("unchanged_cycle", "seconds"),
+    "handlers.main_p95": ("handlers", "main_p95"),
+    "handlers.history_p95": ("handlers", "history_p95"),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def db_statements_total() -> float:
+    from servercatcher.core import metrics
+
+    return sum(metrics.db_statements._values.values())
+
+
+async def run_cycle(poll_once, state) -> dict:
+    started_statements = db_statements_total()
+    started = time.perf_counter()
+    await poll_once(state)
+    return {
+        "seconds": time.perf_counter() - started,
+        "db_statements": db_statements_total() - started_statements,
+    }
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+            "text": text,
+        },
+    }
+
+
+async def bench_size(args, source_port: int, telegram_port: int) -> dict:
+    # Импорт после настройки окружения: настройки читаются при первом обращении
+    from aiohttp import web
+    from aiogram.types import Update
+    from sqlalchemy import func, insert, select
+
+    from benchmarks.fake_source import FakeSource
+    from benchmarks.fake_telegram import FakeTelegram
+    from servercatcher.app.notification import outbox
+    from servercatcher.app.notification.broadcast import Broadcaster
+    from servercatcher.app.notification.handler import PollState, poll_once
+    from servercatcher.app.notification.source import close_sources
+    from servercatcher.app.notification.subscribers import subscribers
+    from servercatcher.core import metrics
+    from servercatcher.core.config import get_bot
+    from servercatcher.core.models import NotificationOutbox, User, db_helper
+    from servercatcher.factory import create_dispatcher
+
+    bot = get_bot()
+
+    source = FakeSource(args.size, churn=args.churn, seed=args.seed)
+    telegram = FakeTelegram(
+        latency=args.latency, rate_429=args.rate_429, retry_after=args.retry_after, seed=args.seed
+    )
+    runners = []
+    for app, port in ((source.app(), source_port), (telegram.app(), telegram_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        runners.append(runner)
+
+    result: dict = {"servers": args.size, "subscribers": args.subscribers}
+    try:
+        state = PollState()
+
+        # Первый цикл заполняет пустую БД, подписчиков еще нет
+        async with db_helper.session_factory() as session:
+            await subscribers.load(session)
+        result["cold_cycle"] = await run_cycle(poll_once, state)
+
+        async with db_helper.session_factory() as session:
+            await session.execute(
+                insert(User), [{"telegram_id": chat_id} for chat_id in range(1, args.subscribers + 1)]
+            )
+            await session.commit()
+            await subscribers.load(session)
+
+        result["unchanged_cycle"] = await run_cycle(poll_once, state)
+
+        cycles = []
+        for _ in range(args.cycles):
+            changed = source.advance()
+            async with db_helper.session_factory() as session:
+                before = await session.scalar(select(func.count(NotificationOutbox.id)))
+            cycle = await run_cycle(poll_once, state)
+            async with db_helper.session_factory() as session:
+                cycle["enqueued"] = await session.scalar(select(func.count(NotificationOutbox.id))) - before
+            cycle["changed_servers"] = changed
+            cycles.append(cycle)
+        result["churn_cycles"] = {
+            "runs": cycles,
+            "seconds_p50": statistics.median(c["seconds"] for c in cycles) if cycles else 0.0,
+            "db_statements_max": max((c["db_statements"] for c in cycles), default=0),
+        }
+
+        # Рассылка ограничена не лимитами Telegram, а самим конвейером
+        outbox.broadcaster = Broadcaster(
+            bot,
+            global_rate=args.send_rate,
+            private_rate=args.send_rate,
+            group_rate=args.send_rate,
+            concurrency=args.concurrency,
+        )
+        retry_after_before = sum(metrics.send_retry_after._values.values())
+        delivered = 0
+        # 429 — только на фазе рассылки: Broadcaster их повторяет, обработчики команд — нет
+        telegram.throttling = True
+        started = time.perf_counter()
+        try:
+            while delivered < args.deliver:
+                processed = await outbox.drain_outbox_batch()
+                if not processed:
+                    break
+                delivered += processed
+        finally:
+            telegram.throttling = False
+        elapsed = time.perf_counter() - started
+        result["delivery"] = {
+            "messages": delivered,
+            "seconds": elapsed,
+            "messages_per_second": delivered / elapsed if elapsed else 0.0,
+            "retry_after": sum(metrics.send_retry_after._values.values()) - retry_after_before,
+            "api_calls": telegram.calls.get("sendMessage", 0),
+        }
+
+        dp = create_dispatcher()
+        history_ip = source.servers[0]["ip"]
+        timings: dict[str, list[float]] = {"main": [], "history": []}
+        for i in range(args.handler_calls):
+            for name, text in (("main", "/main"), ("history", f"/history {history_ip}")):
+                update = Update.model_validate(make_update(i, text), context={"bot": bot})
+                started = time.perf_counter()
+                await dp.feed_update(bot, update)
+                timings[name].append(time.perf_counter() - started)
+        result["handlers"] = {
+            "calls": args.handler_calls,
+            **{f"{name}_p50": percentile(values, 0.5) for name, values in timings.items()},
+            **{f"{name}_p95": percentile(values, 0.95) for name, values in timings.items()},
+        }
+        result["source"] = {"requests": source.requests, "bytes_sent": source.bytes_sent}
+    finally:
+        await close_sources()
+        await bot.session.close()
+        await db_helper.dispose()
+        for runner in runners:
+            await runner.cleanup()
+    return result
+
+
+def run_child(args) -> None:
+    """Один размер в чистом процессе: временная БД, миграции, прогон"""
+    source_port, telegram_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.sqlite3"
+        os.environ["SOURCES"] = json.dumps({"bench": f"http://127.0.0.1:{source_port}/"})
+        os.environ["TELEGRAM_API_BASE"] = f"http://127.0.0.1:{telegram_port}"
+        os.environ.setdefault("TELEGRAM_TOKEN", "1:bench")
+        os.environ.setdefault("BOT_USERNAME", "bench_bot")
+
+        from alembic import command
+        from alembic.config import Config
+
+        command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+        result = asyncio.run(bench_size(args, source_port, telegram_port))
+    print(json.dumps(result))
+
+
+def compare(previous: dict, current: dict) -> None:
+    by_size = {r["servers"]: r for r in previous["results"]}
+    for result in current["results"]:
+        old = by_size.get(result["servers"])
+        if old is None:
+            continue
+        print(f"servers={result['servers']}:")
+        for label, (section, key) in COMPARED.items():
+            before, after = old[section][key], result[section][key]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {label:32} {before:10.4f} -> {after:10.4f} ({change:+.1f}%)")
+        before = old["delivery"]["messages_per_second"]
+        after = result["delivery"]["messages_per_second"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {'delivery.messages_per_second':32} {before:10.1f} -> {after:10.1f} ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000,100000", help="размеры списка серверов через запятую")
+    parser.add_argument("--subscribers", type=int, help="число подписчиков (по умолчанию равно размеру)")
+    parser.add_argument("--churn", type=float, default=0.0005, help="доля серверов, меняющихся за цикл")
+    parser.add_argument("--cycles", type=int, default=5, help="циклов с изменениями")
+    parser.add_argument("--deliver", type=int, default=5000, help="сколько сообщений outbox отправить")
+    parser.add_argument("--send-rate", type=float, default=1000, help="лимит отправки, сообщений в секунду")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка заглушки Bot API, секунды")
+    parser.add_argument("--rate-429", type=float, default=0.001, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--handler-calls", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл для JSON с результатами")
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size is not None:
+        if args.subscribers is None:
+            args.subscribers = args.size
+        run_child(args)
+        return
+
+    child_args = [a for a in sys.argv[1:]]
+    for flag in ("--sizes", "--output", "--compare"):
+        if flag in child_args:
+            idx = child_args.index(flag)
+            del child_args[idx:idx + 2]
+    child_args = [a for a in child_args if not a.startswith(("--sizes=", "--output=", "--compare="))]
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"[bench] servers={size}...", file=sys.stderr)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--size", str(size), *child_args],
+            cwd=ROOT,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"[bench] servers={size} завершился с кодом {proc.returncode}")
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+            ).stdout.strip() or None,
+            "args": {k: v for k, v in vars(args).items() if k not in ("size", "output", "compare")},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
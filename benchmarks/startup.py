@@ -0,0 +1,158 @@
+"""Стоимость импорта модулей и холодного старта.
+
+Каждый замер — отдельный процесс без TELEGRAM_TOKEN (кроме холодного
+старта бота), поэтому кэш импортов не мешает:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --import-budget 1.0 --cold-start-budget 10 --output startup.json
+
+Импорт должен обходиться без токена, ничего не печатать, не создавать
+движок БД и бота и укладываться в --import-budget. Холодный старт —
+от запуска интерпретатора до собранного диспетчера и проверенной БД —
+должен укладываться в --cold-start-budget. Превышение — код выхода 1.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.run import ROOT
+
+# Модули без aiogram: их импортируют миграции, админские команды и replay
+LIGHT_MODULES = (
+    "servercatcher.core.config",
+    "servercatcher.core.models",
+    "servercatcher.app.notification.handler",
+    "servercatcher.app.admin.cli",
+    "servercatcher.factory",
+)
+
+IMPORT_PROBE = """
+import contextlib, importlib, io, json, sys, time
+started = time.perf_counter()
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - started
+from servercatcher.core.config import get_bot
+from servercatcher.core.models import db_helper
+print(json.dumps({
+    "seconds": seconds,
+    "stdout": out.getvalue(),
+    "engine_created": db_helper._engine is not None,
+    "bot_created": get_bot.cache_info().currsize > 0,
+    "aiogram": "aiogram" in sys.modules,
+}))
+"""
+
+COLD_START_PROBE = """
+import asyncio, contextlib, io, json, time
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from servercatcher.core.config import get_bot
+    from servercatcher.core.models import db_helper
+    from servercatcher.factory import check_storage, create_dispatcher
+    imported = time.perf_counter()
+    create_dispatcher()
+    get_bot()
+
+    async def storage():
+        try:
+            return await check_storage()
+        finally:
+            await db_helper.dispose()
+            await get_bot().session.close()
+
+    problems = asyncio.run(storage())
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "import_seconds": imported - started,
+    "problems": problems,
+}))
+"""
+
+
+def probe(code: str, args: list[str], env: dict) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code, *args], env=env, cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(f"[startup] probe {args} завершился с ошибкой:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = wall
+    return result
+
+
+def summarize(runs: list[dict]) -> dict:
+    result = dict(runs[0])
+    for key in ("seconds", "process_seconds", "import_seconds"):
+        if key in result:
+            result[key] = statistics.median(run[key] for run in runs)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="запусков на замер, берется медиана")
+    parser.add_argument("--import-budget", type=float, default=1.0, help="секунд на импорт модуля без aiogram")
+    parser.add_argument("--cold-start-budget", type=float, default=10.0, help="секунд на холодный старт бота")
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ("TELEGRAM_TOKEN", "TOKEN", "BOT_USERNAME", "DATABASE_URL", "DB_URL")
+    }
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    failures: list[str] = []
+    result: dict = {"python": sys.version.split()[0], "imports": {}}
+    for module in LIGHT_MODULES:
+        measured = summarize([probe(IMPORT_PROBE, [module], env) for _ in range(args.repeat)])
+        result["imports"][module] = measured
+        if measured["seconds"] > args.import_budget:
+            failures.append(f"импорт {module}: {measured['seconds']:.3f}s > {args.import_budget}s")
+        if measured["stdout"]:
+            failures.append(f"импорт {module} печатает: {measured['stdout']!r}")
+        if measured["engine_created"]:
+            failures.append(f"импорт {module} создает движок БД")
+        if measured["bot_created"]:
+            failures.append(f"импорт {module} создает бота")
+        if measured["aiogram"]:
+            failures.append(f"импорт {module} тянет aiogram")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_env = {**env, "DATABASE_URL": f"sqlite+aiosqlite:///{Path(tmp) / 'startup.sqlite3'}"}
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            env=db_env, cwd=ROOT, check=True, capture_output=True,
+        )
+        bot_env = {**db_env, "TELEGRAM_TOKEN": "1:startup", "BOT_USERNAME": "startup_bot"}
+        cold = summarize([probe(COLD_START_PROBE, [], bot_env) for _ in range(args.repeat)])
+    result["cold_start"] = cold
+    if cold["process_seconds"] > args.cold_start_budget:
+        failures.append(f"холодный старт: {cold['process_seconds']:.3f}s > {args.cold_start_budget}s")
+    if cold["problems"]:
+        failures.append(f"полные сканы после миграций: {cold['problems']}")
+
+    result["budgets"] = {"import": args.import_budget, "cold_start": args.cold_start_budget}
+    result["failures"] = failures
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Точки входа по ролям:
+
+    python -m servercatcher            # бот и опрос в одном процессе
+    python -m servercatcher bot        # только прием обновлений Telegram
+    python -m servercatcher poller     # только опрос источника и рассылка
+    python -m servercatcher admin ...  # админские команды, без токена бота
+"""
+
+import argparse
+import asyncio
+import sys
+
+from servercatcher.app.admin.cli import add_arguments, run as run_admin
+from servercatcher.factory import ROLE_BOT, ROLE_POLLER, ROLES
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="servercatcher", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("all", help="бот и опрос в одном процессе (по умолчанию)")
+    commands.add_parser(ROLE_BOT, help="только прием обновлений Telegram")
+    commands.add_parser(ROLE_POLLER, help="только опрос источника и рассылка")
+    add_arguments(commands.add_parser("admin", help="админские команды"))
+    args = parser.parse_args()
+
+    if args.command == "admin":
+        sys.exit(asyncio.run(run_admin(args)))
+
+    from servercatcher.main import main as run_roles
+
+    run_roles(ROLES if args.command in (None, "all") else (args.command,))
+
+
+if __name__ == "__main__":
+    main()
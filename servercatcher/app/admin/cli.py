@@ -0,0 +1,60 @@
+"""Админские команды без бота и без TELEGRAM_TOKEN:
+
+    python -m servercatcher admin stats
+    python -m servercatcher admin check-db
+    python -m servercatcher admin rollup-history --days 90
+"""
+
+import argparse
+import asyncio
+import json
+
+from servercatcher.core.models import db_helper
+
+
+async def cmd_stats(args) -> int:
+    from .crud import get_delivery_stats
+
+    async with db_helper.session_factory() as session:
+        stats = await get_delivery_stats(session)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+async def cmd_check_db(args) -> int:
+    from servercatcher.factory import check_storage
+
+    problems = await check_storage()
+    if not problems:
+        print("[db] Горячие запросы идут по индексам")
+    return 1 if problems else 0
+
+
+async def cmd_rollup_history(args) -> int:
+    from servercatcher.app.notification.stats import rollup_expired_history
+
+    total = await rollup_expired_history(args.days)
+    print(f"[history] Свернуто периодов старше {args.days} дн.: {total}")
+    return 0
+
+
+COMMANDS = {
+    "stats": cmd_stats,
+    "check-db": cmd_check_db,
+    "rollup-history": cmd_rollup_history,
+}
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    commands = parser.add_subparsers(dest="admin_command", required=True)
+    commands.add_parser("stats", help="подписчики, очередь и активные сервера")
+    commands.add_parser("check-db", help="профиль БД и проверка индексов, код 1 при полных сканах")
+    rollup = commands.add_parser("rollup-history", help="свернуть старую историю в server_stats")
+    rollup.add_argument("--days", type=float, required=True, help="сворачивать периоды старше N дней")
+
+
+async def run(args) -> int:
+    try:
+        return await COMMANDS[args.admin_command](args)
+    finally:
+        await db_helper.dispose()
@@ -0,0 +1,29 @@
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.core.models.server import Server, NotificationOutbox
+from servercatcher.core.models.user import User, Chat
+
+
+async def get_delivery_stats(session: AsyncSession) -> dict[str, int]:
+    """Счетчики для админ-панели: подписчики, выключенные чаты, очередь"""
+    stats = {}
+    for name, model in (("users", User), ("chats", Chat)):
+        rows = await session.execute(
+            select(model.is_active, func.count()).group_by(model.is_active)
+        )
+        counts = dict(rows.all())
+        stats[f"{name}_active"] = counts.get(True, 0)
+        stats[f"{name}_pruned"] = counts.get(False, 0)
+
+    rows = await session.execute(
+        select(NotificationOutbox.status, func.count()).group_by(NotificationOutbox.status)
+    )
+    outbox = dict(rows.all())
+    stats["outbox_pending"] = outbox.get("pending", 0)
+    stats["outbox_failed"] = outbox.get("failed", 0)
+
+    stats["servers_active"] = await session.scalar(
+        select(func.count()).select_from(Server).where(Server.is_active == True)
+    )
+    return stats
@@ -0,0 +1,54 @@
+"""Проверка планов горячих запросов: при старте и в admin check-db"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.server.crud import history_page_query
+from servercatcher.core.models.poller import PollerServerState
+from servercatcher.core.models.server import Server, ServerHistory
+
+
+def hot_queries() -> dict[str, object]:
+    """Запросы горячего пути, которые обязаны идти по индексам"""
+    now = datetime.now(timezone.utc)
+    return {
+        "active servers": select(Server.id, Server.ip_adress).where(Server.is_active == True),
+        "servers by ip": select(Server.id).where(Server.ip_adress.in_(["0.0.0.0", "0.0.0.1"])),
+        "open history": select(ServerHistory.server_ip, ServerHistory.id)
+        .where(ServerHistory.server_ip.in_(["0.0.0.0", "0.0.0.1"]), ServerHistory.end == None)
+        .order_by(ServerHistory.id),
+        "history by ip": select(ServerHistory).where(ServerHistory.server_ip == "0.0.0.0"),
+        "history page": history_page_query("0.0.0.0", cursor=1, forward=True, limit=15),
+        "history page back": history_page_query("0.0.0.0", cursor=1, forward=False, limit=15),
+        "checkpoint servers by ip": select(PollerServerState.id)
+        .where(PollerServerState.ip_adress.in_(["0.0.0.0", "0.0.0.1"])),
+        "active servers for /main": select(Server).where(
+            Server.start <= now, Server.end >= now, Server.is_active == True
+        ),
+    }
+
+
+async def query_plan(session: AsyncSession, stmt) -> list[str]:
+    """Строки EXPLAIN QUERY PLAN запроса (только SQLite)"""
+    dialect = session.bind.dialect
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    # План не зависит от значений параметров
+    params = (None,) * len(compiled.positiontup)
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return [row[-1] for row in result]
+
+
+async def find_full_scans(session: AsyncSession) -> list[str]:
+    """Прогоняет EXPLAIN QUERY PLAN по горячим запросам и возвращает полные сканы таблиц"""
+    if session.bind.dialect.name != "sqlite":
+        return []
+
+    problems = []
+    for name, stmt in hot_queries().items():
+        for detail in await query_plan(session, stmt):
+            if detail.startswith("SCAN ") and " INDEX " not in detail:
+                problems.append(f"{name}: {detail}")
+    return problems
@@ -0,0 +1,31 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from servercatcher.core.config import settings
+from servercatcher.core.models import db_helper
+from servercatcher.app.notification.subscribers import subscribers
+from .crud import get_delivery_stats
+
+router = Router()
+
+
+@router.message(Command("admin"))
+async def cmd_admin(message: Message):
+    if message.from_user is None or message.from_user.id not in settings.admin_ids:
+        return
+
+    async with db_helper.session_factory() as session:
+        stats = await get_delivery_stats(session)
+
+    await message.answer(
+        f"""🛠 <b>Состояние рассылки</b>
+
+👥 Подписчики: <b>{stats['users_active']}</b> пользователей, <b>{stats['chats_active']}</b> групп
+🧹 Выключено за ошибки доставки: <b>{stats['users_pruned']}</b> пользователей, <b>{stats['chats_pruned']}</b> групп
+📨 В списке рассылки процесса: <b>{len(subscribers)}</b>
+
+📬 Очередь: <b>{stats['outbox_pending']}</b> ожидают, <b>{stats['outbox_failed']}</b> не доставлено
+🖥 Активных серверов: <b>{stats['servers_active']}</b>""",
+        parse_mode="HTML",
+    )
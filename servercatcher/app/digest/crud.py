@@ -0,0 +1,18 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.core.models.user import User, Chat
+
+
+async def toggle_digest(session: AsyncSession, chat_id: int, is_private: bool) -> bool | None:
+    """Переключает режим сводки для чата. None — чат не зарегистрирован"""
+    model, key = (User, User.telegram_id) if is_private else (Chat, Chat.chat_id)
+    result = await session.execute(
+        update(model)
+        .where(key == chat_id)
+        .values(digest=~model.digest)
+        .returning(model.digest)
+    )
+    enabled = result.scalar_one_or_none()
+    await session.commit()
+    return enabled
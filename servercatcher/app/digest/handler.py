@@ -0,0 +1,30 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from servercatcher.core.models import db_helper
+from servercatcher.app.notification.subscribers import subscribers
+from .crud import toggle_digest
+
+router = Router()
+
+
+@router.message(Command("digest"))
+async def cmd_digest(message: Message):
+    """Переключает сводку за цикл опроса вместо сообщения на каждое событие"""
+    async with db_helper.session_factory() as session:
+        enabled = await toggle_digest(
+            session, message.chat.id, is_private=message.chat.type == "private"
+        )
+
+    if enabled is None:
+        await message.answer("Чат еще не подписан на уведомления. Отправьте /start.")
+        return
+
+    subscribers.set_digest(message.chat.id, enabled)
+    if enabled:
+        await message.answer(
+            "🗞 Режим сводки включен: все изменения за один опрос придут одним сообщением."
+        )
+    else:
+        await message.answer("🔔 Режим сводки выключен: каждое изменение придет отдельным сообщением.")
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Iterator
+
+from servercatcher.app.notification.records import ParsedSnapshot, SnapshotBuilder
+from servercatcher.app.notification.streaming import ServersStreamParser
+from servercatcher.core import metrics
+
+# Тело до этого размера копится в памяти, больше — во временном файле
+SPOOL_MEMORY = 1024 * 1024
+COMPRESS_LEVEL = 6
+READ_CHUNK = 64 * 1024
+
+
+class PayloadArchive:
+    """Архив ответов источников с адресацией по содержимому.
+
+    Каждое новое тело хранится один раз в objects/<xx>/<sha256>.json.gz,
+    а observations.jsonl — журнал циклов: когда и какой хеш вернул каждый
+    источник. По нему benchmarks.replay воспроизводит опрос без сети.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.log_path = self.root / "observations.jsonl"
+
+    def path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.json.gz"
+
+    def has(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def spool(self) -> IO[bytes]:
+        """Буфер для сырого тела, пока его хеш еще не известен"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY, dir=self.root)
+
+    async def store(self, digest: str, spool: IO[bytes], source: str) -> bool:
+        """Сжимает тело в архив, если такого хеша там еще нет. Спул закрывается"""
+        try:
+            if self.has(digest):
+                return False
+            # Сжатие десятков мегабайт не должно останавливать event loop
+            await asyncio.to_thread(self._compress, digest, spool)
+        finally:
+            spool.close()
+        metrics.archive_payloads_stored.inc(source=source)
+        return True
+
+    def _compress(self, digest: str, spool: IO[bytes]) -> None:
+        path = self.path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        spool.seek(0)
+        try:
+            with gzip.open(tmp, "wb", compresslevel=COMPRESS_LEVEL) as out:
+                shutil.copyfileobj(spool, out, READ_CHUNK)
+            # Переименование атомарно: читатель не увидит недописанный объект
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def observe(self, at: datetime, digests: dict[str, str | None], errors: list[str]) -> None:
+        """Записывает один цикл загрузки.
+
+        digests — имя источника -> хеш данных, с которыми работал опрос
+        (None, если данных нет вовсе); errors — источники, которые в этом
+        цикле не ответили и были заменены прошлыми данными.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(
+            {"at": at.isoformat(), "sources": digests, "errors": errors}, ensure_ascii=False
+        )
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            log.write(line + "\n")
+
+    def observations(self) -> Iterator[tuple[datetime, dict[str, str | None]]]:
+        """Циклы журнала по порядку: (время, имя источника -> хеш)"""
+        with open(self.log_path, encoding="utf-8") as log:
+            for line in log:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                yield datetime.fromisoformat(entry["at"]), entry["sources"]
+
+    def load(
+        self, digest: str, source: str | None = None, previous: ParsedSnapshot | None = None
+    ) -> ParsedSnapshot:
+        """Разбирает сохраненное тело тем же потоковым разбором, что и опрос"""
+        parser = ServersStreamParser()
+        builder = SnapshotBuilder(source, previous=previous)
+        with gzip.open(self.path(digest), "rb") as payload:
+            while chunk := payload.read(READ_CHUNK):
+                for item in parser.feed(chunk):
+                    builder.add(item)
+        for item in parser.close():
+            builder.add(item)
+        return builder.build()
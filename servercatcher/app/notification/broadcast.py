@@ -0,0 +1,214 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramRetryAfter,
+)
+
+from servercatcher.core import metrics
+
+# Лимиты Telegram Bot API: ~30 сообщений в секунду на бота,
+# не чаще 1 сообщения в секунду в личный чат и 20 в минуту в группу
+GLOBAL_RATE = 30
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+MAX_CONCURRENCY = 30
+MAX_RETRY_AFTER_ATTEMPTS = 3
+MAX_CHAT_BUCKETS = 10_000
+
+# Классы ошибок отправки
+SEND_UNREACHABLE = "unreachable"  # чат недоступен боту: повторять бессмысленно
+SEND_REJECTED = "rejected"  # Telegram отверг само сообщение
+SEND_TRANSIENT = "transient"  # сеть, 5xx, flood control — можно повторить
+SEND_MIGRATED = "migrated"  # группа стала супергруппой: чат доступен по новому id
+
+# Описания 400 Bad Request, означающие, что писать в чат нельзя
+UNREACHABLE_DESCRIPTIONS = (
+    "chat not found",
+    "user not found",
+    "user is deactivated",
+    "have no rights to send a message",
+    "need administrator rights",
+    "chat_write_forbidden",
+    "peer_id_invalid",
+)
+
+
+def classify_send_error(error: Exception) -> str:
+    if isinstance(error, TelegramMigrateToChat):
+        return SEND_MIGRATED
+    if isinstance(error, TelegramForbiddenError):
+        # Заблокирован, исключен из группы, аккаунт удален
+        return SEND_UNREACHABLE
+    if isinstance(error, TelegramBadRequest):
+        description = error.message.lower()
+        if any(marker in description for marker in UNREACHABLE_DESCRIPTIONS):
+            return SEND_UNREACHABLE
+        return SEND_REJECTED
+    return SEND_TRANSIENT
+
+
+class TokenBucket:
+    """Token bucket: не более rate токенов в секунду, всплеск до capacity"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        # Лок выстраивает ожидающих в очередь, чтобы никто не голодал
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class BroadcastReport:
+    event: str
+    total: int
+    sent: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    last_delivery: float = 0.0
+    # индекс сообщения -> ошибка отправки
+    errors: dict[int, Exception] = field(default_factory=dict)
+    # старый id группы -> id супергруппы, на который сообщение отправлено повторно
+    migrated: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+class Broadcaster:
+    """Конкурентная рассылка с соблюдением лимитов Telegram"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = GLOBAL_RATE,
+        private_rate: float = PRIVATE_CHAT_RATE,
+        group_rate: float = GROUP_CHAT_RATE,
+        concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.bot = bot
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.concurrency = concurrency
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Полные корзины ничем не отличаются от новых — их можно выбросить
+                self.chat_buckets = {
+                    k: v for k, v in self.chat_buckets.items() if not v.is_full
+                }
+            # Отрицательные id у групп, супергрупп и каналов
+            rate = self.group_rate if chat_id < 0 else self.private_rate
+            bucket = TokenBucket(rate, capacity=1)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _wait_flood_control(self) -> None:
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, chat_id: int, text: str, report: BroadcastReport) -> None:
+        original_chat_id = chat_id
+        attempt = 0
+        while True:
+            await self._chat_bucket(chat_id).acquire()
+            await self._wait_flood_control()
+            await self.global_bucket.acquire()
+            try:
+                with metrics.send_seconds.time(event=report.event):
+                    await self.bot.send_message(chat_id, text, parse_mode="HTML")
+                return
+            except TelegramMigrateToChat as e:
+                # Группа стала супергруппой: то же сообщение уходит по новому id, один раз
+                if chat_id != original_chat_id:
+                    raise
+                chat_id = e.migrate_to_chat_id
+                report.migrated[original_chat_id] = chat_id
+            except TelegramRetryAfter as e:
+                metrics.send_retry_after.inc(event=report.event)
+                # Flood control действует на весь бот, поэтому ставим на паузу всех
+                if attempt == MAX_RETRY_AFTER_ATTEMPTS:
+                    raise
+                attempt += 1
+                report.retries += 1
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + e.retry_after
+                )
+
+    async def deliver(
+        self, messages: list[tuple[int, str]], event: str = ""
+    ) -> BroadcastReport:
+        """Отправляет пары (chat_id, текст) и возвращает отчет о доставке"""
+        report = BroadcastReport(event=event, total=len(messages))
+        if not messages:
+            return report
+
+        started = time.monotonic()
+        queue = iter(enumerate(messages))
+
+        async def worker():
+            for idx, (chat_id, text) in queue:
+                try:
+                    await self._send(chat_id, text, report)
+                except Exception as e:
+                    report.errors[idx] = e
+                else:
+                    report.sent += 1
+                    report.last_delivery = time.monotonic() - started
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.concurrency, len(messages))))
+        )
+        report.elapsed = time.monotonic() - started
+        metrics.send_messages.inc(report.sent, event=event, result="sent")
+        for error in report.errors.values():
+            metrics.send_messages.inc(event=event, result=classify_send_error(error))
+        print(
+            f"[broadcast] {event}: {report.sent}/{report.total} отправлено, "
+            f"ошибок {report.failed}, retry_after {report.retries}, "
+            f"{report.rate:.1f} msg/s, последняя доставка через {report.last_delivery:.2f}с"
+        )
+        return report
+
+    async def broadcast(
+        self, chat_ids: Iterable[int], text: str, event: str = ""
+    ) -> BroadcastReport:
+        return await self.deliver([(chat_id, text) for chat_id in chat_ids], event)
@@ -0,0 +1,322 @@
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import select, insert, update, delete, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.core.models.server import Server, ServerHistory, ServerStats
+from servercatcher.core.models.user import User, Chat
+from servercatcher.core.models.subscription import SubscriptionFilter
+from servercatcher.core.models.poller import PollerCheckpoint, PollerServerState
+
+# SQLite и asyncpg ограничивают число параметров в запросе, IN режем на куски
+CHUNK_SIZE = 5000
+
+
+def dialect_insert(session: AsyncSession, model):
+    """INSERT с поддержкой on_conflict_do_nothing для текущей БД"""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def chunked(items: Iterable, size: int = CHUNK_SIZE) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def load_server_states(session: AsyncSession, ips: Iterable[str]) -> dict[str, dict]:
+    """Загружает все активные сервера и сервера с указанными IP одним проходом"""
+    columns = (
+        Server.id, Server.ip_adress, Server.text, Server.is_active, Server.start, Server.end, Server.source
+    )
+    states: dict[str, dict] = {}
+
+    result = await session.execute(select(*columns).where(Server.is_active == True))
+    for row in result:
+        states[row.ip_adress] = row._asdict()
+
+    missing = [ip for ip in ips if ip not in states]
+    for chunk in chunked(missing):
+        result = await session.execute(select(*columns).where(Server.ip_adress.in_(chunk)))
+        for row in result:
+            states.setdefault(row.ip_adress, row._asdict())
+    return states
+
+
+async def load_open_history(session: AsyncSession, ips: Iterable[str]) -> dict[str, int]:
+    """IP -> id незакрытого периода истории"""
+    open_rows: dict[str, int] = {}
+    for chunk in chunked(ips):
+        result = await session.execute(
+            select(ServerHistory.server_ip, ServerHistory.id)
+            .where(ServerHistory.server_ip.in_(chunk), ServerHistory.end == None)
+            .order_by(ServerHistory.id)
+        )
+        for ip, row_id in result:
+            open_rows.setdefault(ip, row_id)
+    return open_rows
+
+
+async def get_all_chats(session: AsyncSession):
+    """Получает список всех чатов (пользователей и групп) для отправки уведомлений"""
+    chats = set()
+
+    # Получаем пользователей из базы
+    result = await session.execute(select(User.telegram_id).where(User.is_active == True))
+    users = result.scalars().all()
+    chats.update(users)
+
+    # Получаем группы/каналы из базы
+    result = await session.execute(select(Chat.chat_id).where(Chat.is_active == True))
+    groups = result.scalars().all()
+    chats.update(groups)
+
+    return list(chats)
+
+
+async def get_digest_chats(session: AsyncSession) -> list[int]:
+    """Чаты, выбравшие одну сводку за цикл вместо отдельных сообщений"""
+    users = await session.execute(select(User.telegram_id).where(User.digest == True))
+    groups = await session.execute(select(Chat.chat_id).where(Chat.digest == True))
+    return [*users.scalars().all(), *groups.scalars().all()]
+
+
+async def record_unreachable(
+    session: AsyncSession, chat_ids: Iterable[int], threshold: int, now: datetime
+) -> list[int]:
+    """Увеличивает счетчик неудач и выключает чаты, достигшие порога.
+    Возвращает выключенные сейчас чаты"""
+    chat_ids = list(chat_ids)
+    pruned: list[int] = []
+    if not chat_ids:
+        return pruned
+    for model, key in ((User, User.telegram_id), (Chat, Chat.chat_id)):
+        await session.execute(
+            update(model)
+            .where(key.in_(chat_ids), model.is_active == True)
+            .values(send_failures=model.send_failures + 1)
+        )
+        result = await session.execute(
+            update(model)
+            .where(key.in_(chat_ids), model.is_active == True, model.send_failures >= threshold)
+            .values(is_active=False, deactivated_at=now)
+            .returning(key)
+        )
+        pruned.extend(result.scalars().all())
+    return pruned
+
+
+async def migrate_chats(session: AsyncSession, migrations: dict[int, int]) -> None:
+    """Переносит группы, ставшие супергруппами, на новый chat_id вместе с фильтрами"""
+    for old_chat_id, new_chat_id in migrations.items():
+        existing = await session.scalar(select(Chat.id).where(Chat.chat_id == new_chat_id))
+        if existing is None:
+            await session.execute(
+                update(Chat)
+                .where(Chat.chat_id == old_chat_id)
+                .values(chat_id=new_chat_id, chat_type="supergroup", send_failures=0)
+            )
+        else:
+            # Супергруппу уже записал my_chat_member, старая запись не нужна
+            await session.execute(delete(Chat).where(Chat.chat_id == old_chat_id))
+
+        filters = await session.execute(
+            select(SubscriptionFilter.kind, SubscriptionFilter.value, SubscriptionFilter.created_at)
+            .where(SubscriptionFilter.chat_id == old_chat_id)
+        )
+        rows = [{"chat_id": new_chat_id, **row._asdict()} for row in filters]
+        if rows:
+            await session.execute(
+                dialect_insert(session, SubscriptionFilter).on_conflict_do_nothing(
+                    index_elements=["chat_id", "kind", "value"]
+                ),
+                rows,
+            )
+            await session.execute(
+                delete(SubscriptionFilter).where(SubscriptionFilter.chat_id == old_chat_id)
+            )
+
+
+async def reset_send_failures(session: AsyncSession, chat_ids: Iterable[int]) -> None:
+    """Успешная доставка обнуляет счетчик: выключаем только чаты, недоступные подряд"""
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return
+    for model, key in ((User, User.telegram_id), (Chat, Chat.chat_id)):
+        await session.execute(
+            update(model)
+            .where(key.in_(chat_ids), model.send_failures > 0)
+            .values(send_failures=0)
+        )
+
+
+async def insert_servers(session: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await session.execute(insert(Server), rows)
+
+
+async def insert_history(session: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await session.execute(insert(ServerHistory), rows)
+
+
+async def close_history(session: AsyncSession, rows: list[dict]) -> None:
+    """Проставляет end незакрытым периодам по первичному ключу (executemany)"""
+    if rows:
+        await session.execute(update(ServerHistory), rows)
+
+
+async def get_subscription_filters(session: AsyncSession) -> list[tuple[int, str, str]]:
+    """Все фильтры рассылки: (chat_id, kind, value)"""
+    result = await session.execute(
+        select(SubscriptionFilter.chat_id, SubscriptionFilter.kind, SubscriptionFilter.value)
+    )
+    return [tuple(row) for row in result]
+
+
+async def update_servers(session: AsyncSession, rows: list[dict]) -> None:
+    """Массовое обновление по первичному ключу (executemany)"""
+    if rows:
+        await session.execute(update(Server), rows)
+
+
+async def load_stats(session: AsyncSession, ips: Iterable[str]) -> dict[str, dict]:
+    """Строки server_stats по IP в виде словарей для пакетного обновления"""
+    stats: dict[str, dict] = {}
+    for chunk in chunked(ips):
+        result = await session.execute(
+            select(
+                ServerStats.id,
+                ServerStats.ip_adress,
+                ServerStats.placements,
+                ServerStats.total_seconds,
+                ServerStats.first_seen,
+                ServerStats.last_seen,
+                ServerStats.current_start,
+                ServerStats.is_active,
+                ServerStats.rank_key,
+            ).where(ServerStats.ip_adress.in_(chunk))
+        )
+        for row in result.mappings():
+            stats[row["ip_adress"]] = dict(row)
+    return stats
+
+
+async def insert_stats(session: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await session.execute(insert(ServerStats), rows)
+
+
+async def update_stats(session: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await session.execute(update(ServerStats), rows)
+
+
+async def load_closed_history(session: AsyncSession, before: datetime, limit: int) -> list:
+    """Самые старые закрытые периоды, закончившиеся раньше before"""
+    result = await session.execute(
+        select(ServerHistory.id, ServerHistory.server_ip, ServerHistory.start, ServerHistory.end)
+        .where(ServerHistory.end != None, ServerHistory.end < before)
+        .order_by(ServerHistory.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def load_rollups(session: AsyncSession, ips: Iterable[str]) -> dict[str, dict]:
+    """Счетчики свернутых периодов server_stats по IP"""
+    rollups: dict[str, dict] = {}
+    for chunk in chunked(ips):
+        result = await session.execute(
+            select(
+                ServerStats.id,
+                ServerStats.ip_adress,
+                ServerStats.rolled_placements,
+                ServerStats.rolled_seconds,
+                ServerStats.rolled_until,
+            ).where(ServerStats.ip_adress.in_(chunk))
+        )
+        for row in result.mappings():
+            rollups[row["ip_adress"]] = dict(row)
+    return rollups
+
+
+async def delete_history(session: AsyncSession, ids: list[int]) -> None:
+    for chunk in chunked(ids):
+        await session.execute(delete(ServerHistory).where(ServerHistory.id.in_(chunk)))
+
+
+async def load_active_ips(session: AsyncSession) -> set[str]:
+    result = await session.execute(select(Server.ip_adress).where(Server.is_active == True))
+    return set(result.scalars())
+
+
+async def load_checkpoint(session: AsyncSession, name: str):
+    """(digest, cycle_day, last_cycle_at, next_boundary) или None, если чекпоинта еще нет"""
+    result = await session.execute(
+        select(
+            PollerCheckpoint.digest,
+            PollerCheckpoint.cycle_day,
+            PollerCheckpoint.last_cycle_at,
+            PollerCheckpoint.next_boundary,
+        ).where(PollerCheckpoint.name == name)
+    )
+    return result.first()
+
+
+async def load_checkpoint_servers(session: AsyncSession) -> list:
+    """(ip, start_raw, end_raw, listed) из последнего записанного списка"""
+    result = await session.execute(
+        select(
+            PollerServerState.ip_adress,
+            PollerServerState.start_raw,
+            PollerServerState.end_raw,
+            PollerServerState.listed,
+        )
+    )
+    return result.all()
+
+
+async def save_checkpoint(session: AsyncSession, name: str, values: dict) -> None:
+    stmt = dialect_insert(session, PollerCheckpoint).values(name=name, **values)
+    await session.execute(
+        stmt.on_conflict_do_update(index_elements=[PollerCheckpoint.name], set_=values)
+    )
+
+
+async def insert_checkpoint_servers(session: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await session.execute(insert(PollerServerState), rows)
+
+
+async def update_checkpoint_servers(session: AsyncSession, rows: list[dict]) -> None:
+    """Обновление по IP (executemany), строки с ключами b_ip, b_start_raw, b_end_raw, b_listed"""
+    if rows:
+        table = PollerServerState.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.ip_adress == bindparam("b_ip"))
+            .values(
+                start_raw=bindparam("b_start_raw"),
+                end_raw=bindparam("b_end_raw"),
+                listed=bindparam("b_listed"),
+            ),
+            rows,
+        )
+
+
+async def delete_checkpoint_servers(session: AsyncSession, ips: Iterable[str]) -> None:
+    for chunk in chunked(ips):
+        await session.execute(delete(PollerServerState).where(PollerServerState.ip_adress.in_(chunk)))
+
+
+async def clear_checkpoint_servers(session: AsyncSession) -> None:
+    await session.execute(delete(PollerServerState))
@@ -0,0 +1,218 @@
+import ipaddress
+import re
+from typing import Iterable, NamedTuple
+
+FILTER_IP = "ip"
+FILTER_HOST = "host"
+FILTER_KEYWORD = "keyword"
+FILTER_EVENT = "event"
+FILTER_KINDS = (FILTER_IP, FILTER_HOST, FILTER_KEYWORD, FILTER_EVENT)
+
+EVENT_ADDED = "added"
+EVENT_REMOVED = "removed"
+EVENT_EXPIRED = "expired"
+EVENT_KINDS = (EVENT_ADDED, EVENT_REMOVED, EVENT_EXPIRED)
+
+KEYWORD_MIN = 2
+KEYWORD_MAX = 64
+HOST_RE = re.compile(r"^[\w-]+(\.[\w-]+)*$")
+
+
+class ServerEvent(NamedTuple):
+    """Событие цикла опроса: ключ идемпотентности, текст и поля для фильтров"""
+
+    key: str
+    text: str
+    kind: str
+    ip: str
+    name: str | None = None
+
+
+def normalize_filter(kind: str, value: str) -> str:
+    """Приводит значение фильтра к каноническому виду, ValueError — если оно некорректно"""
+    value = value.strip()
+    if kind == FILTER_IP:
+        return str(ipaddress.ip_network(value, strict=False))
+    if kind == FILTER_HOST:
+        host = value.lower().removeprefix("*.").strip(".")
+        if not HOST_RE.match(host):
+            raise ValueError(f"Некорректное имя хоста: {value}")
+        return host
+    if kind == FILTER_KEYWORD:
+        keyword = value.lower()
+        if not KEYWORD_MIN <= len(keyword) <= KEYWORD_MAX:
+            raise ValueError(f"Ключевое слово должно быть от {KEYWORD_MIN} до {KEYWORD_MAX} символов")
+        return keyword
+    if kind == FILTER_EVENT:
+        event = value.lower()
+        if event not in EVENT_KINDS:
+            raise ValueError(f"Тип события должен быть одним из: {', '.join(EVENT_KINDS)}")
+        return event
+    raise ValueError(f"Неизвестный тип фильтра: {kind}")
+
+
+def split_address(address: str) -> tuple[ipaddress.IPv4Address | ipaddress.IPv6Address | None, str]:
+    """IP-адрес сервера (если это IP) и имя хоста без порта"""
+    host = address.strip()
+    if host.startswith("["):
+        # [2001:db8::1]:27015
+        host = host[1:].split("]", 1)[0]
+    elif host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    host = host.lower().rstrip(".")
+    try:
+        return ipaddress.ip_address(host), host
+    except ValueError:
+        return None, host
+
+
+class IpTrie:
+    """Двоичное префиксное дерево сетей: поиск всех сетей, содержащих адрес,
+    за число шагов, равное длине адреса, независимо от числа фильтров"""
+
+    def __init__(self):
+        # Узел: [потомок по 0, потомок по 1, чаты сети, оканчивающейся здесь]
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+
+    def add(self, network: ipaddress.IPv4Network | ipaddress.IPv6Network, chat_id: int) -> None:
+        node = self._roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+        for i in range(network.prefixlen):
+            bit = (bits >> (width - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            node[2] = set()
+        node[2].add(chat_id)
+
+    def match(self, address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> set[int]:
+        node = self._roots[address.version]
+        bits = int(address)
+        width = address.max_prefixlen
+        found: set[int] = set()
+        for i in range(width + 1):
+            if node[2]:
+                found |= node[2]
+            if i == width:
+                break
+            node = node[(bits >> (width - 1 - i)) & 1]
+            if node is None:
+                break
+        return found
+
+
+class KeywordAutomaton:
+    """Ахо-Корасик: все ключевые слова, входящие в текст, за один проход по нему"""
+
+    def __init__(self, keywords: dict[str, set[int]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[frozenset[int]] = [frozenset()]
+        outputs: list[set[int]] = [set()]
+        for keyword, chats in keywords.items():
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = nxt
+            outputs[state] |= chats
+
+        # Суффиксные ссылки обходом в ширину; выход узла включает выходы по ссылке
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                outputs[nxt] |= outputs[self._fail[nxt]]
+                queue.append(nxt)
+        self._out = [frozenset(chats) for chats in outputs]
+
+    def match(self, text: str) -> set[int]:
+        found: set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class FilterIndex:
+    """Фильтры всех чатов, собранные в индексы.
+
+    У чата без фильтров — все события. Фильтры по событию ограничивают
+    типы событий, фильтры по IP/хосту/слову — сервера: событие проходит,
+    если подходит хотя бы один из них. Для события проверяются только
+    чаты, чьи фильтры с ним совпали, а не все подписчики.
+    """
+
+    def __init__(self, filters: Iterable[tuple[int, str, str]] = ()):
+        self.filtered: set[int] = set()
+        self._ips = IpTrie()
+        self._hosts: dict[str, set[int]] = {}
+        keywords: dict[str, set[int]] = {}
+        # Чаты с фильтром по типу события -> разрешенные типы
+        self._events: dict[int, set[str]] = {}
+        targeted: set[int] = set()
+
+        for chat_id, kind, value in filters:
+            self.filtered.add(chat_id)
+            if kind == FILTER_EVENT:
+                self._events.setdefault(chat_id, set()).add(value)
+                continue
+            targeted.add(chat_id)
+            if kind == FILTER_IP:
+                self._ips.add(ipaddress.ip_network(value, strict=False), chat_id)
+            elif kind == FILTER_HOST:
+                self._hosts.setdefault(value, set()).add(chat_id)
+            elif kind == FILTER_KEYWORD:
+                keywords.setdefault(value, set()).add(chat_id)
+
+        self._keywords = KeywordAutomaton(keywords) if keywords else None
+        # Чаты только с фильтром по типу события получают все сервера этого типа
+        self._by_event_only: dict[str, frozenset[int]] = {
+            event: frozenset(
+                chat_id for chat_id, events in self._events.items()
+                if event in events and chat_id not in targeted
+            )
+            for event in EVENT_KINDS
+        }
+
+    def __len__(self) -> int:
+        return len(self.filtered)
+
+    def _targets(self, event: ServerEvent) -> set[int]:
+        address, host = split_address(event.ip)
+        found: set[int] = set()
+        if address is not None:
+            found |= self._ips.match(address)
+        elif self._hosts:
+            # example.net совпадает с example.net и *.example.net
+            labels = host.split(".")
+            for i in range(len(labels)):
+                chats = self._hosts.get(".".join(labels[i:]))
+                if chats:
+                    found |= chats
+        if self._keywords is not None and event.name:
+            found |= self._keywords.match(event.name)
+        return found
+
+    def matching(self, event: ServerEvent) -> set[int]:
+        """Чаты с фильтрами, которым подходит событие"""
+        found = self._by_event_only.get(event.kind, frozenset()) | {
+            chat_id for chat_id in self._targets(event)
+            if chat_id not in self._events or event.kind in self._events[chat_id]
+        }
+        return found
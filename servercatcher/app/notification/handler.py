@@ -1,344 +1,493 @@
-import json
-
-import aiohttp
 import asyncio
-from datetime import datetime, timezone, timedelta
 import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone, timedelta
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from servercatcher.core import metrics
 from servercatcher.core.models import db_helper
-from servercatcher.core.models.server import Server, ServerHistory
-from servercatcher.core.models.user import User, Chat
-from servercatcher.core.config import bot
+from servercatcher.app.notification.crud import (
+    load_server_states,
+    load_open_history,
+    insert_servers,
+    insert_history,
+    close_history,
+    update_servers,
+    load_active_ips,
+    load_checkpoint,
+    load_checkpoint_servers,
+    save_checkpoint,
+    insert_checkpoint_servers,
+    update_checkpoint_servers,
+    delete_checkpoint_servers,
+    clear_checkpoint_servers,
+)
+from servercatcher.app.notification.leader import fence
+from servercatcher.app.notification.outbox import enqueue_routed
+from servercatcher.app.notification.filters import (
+    EVENT_ADDED,
+    EVENT_EXPIRED,
+    EVENT_REMOVED,
+    ServerEvent,
+)
+from servercatcher.app.notification.records import ParsedSnapshot, ServerRecord, as_msk
+from servercatcher.app.notification.stats import record_placements
+from servercatcher.app.notification.scheduler import CircuitBreaker, PollScheduler
+from servercatcher.app.notification.source import MergedFetch, get_sources
+from servercatcher.app.notification.subscribers import subscribers
+from servercatcher.app.notification.snapshot import snapshot_cache, SourceSnapshot
 
 MSK = timezone(timedelta(hours=3))
-CHECK_INTERVAL = 3
-PASTEBIN_URL = "https://pastebin.com/raw/DnHHkrxx"
-# PASTEBIN_URL = "http://127.0.0.1:8000"
-
-
-async def fetch_servers_from_link() -> list[dict]:
-    url = f"{PASTEBIN_URL}?nocache={int(time.time())}"
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers={"Cache-Control": "no-cache"}) as resp:
-                text = await resp.text()
-                data = json.loads(text)
-                return data.get("servers", [])
-    except Exception as e:
+# Лимит длины одного сообщения Telegram
+MESSAGE_LIMIT = 4096
+# Старше этого снимок считается устаревшим, и команды обновляют его сами
+SNAPSHOT_MAX_AGE = timedelta(seconds=30)
+# После неудачной загрузки команды не ходят в источник столько времени
+SNAPSHOT_RETRY_AFTER = timedelta(seconds=30)
+# Имя чекпоинта состояния опроса, как у lease
+CHECKPOINT_NAME = "poller"
+
+_snapshot_refresh_lock = asyncio.Lock()
+# Предохранитель опроса в этом процессе: пока он разомкнут, команды тоже не ходят в источник
+poll_breaker: CircuitBreaker | None = None
+
+
+def added_message(ip: str, name: str, now: datetime) -> str:
+    return f"""✅ <b>ДОБАВЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n📝 Текст: <code>{name}</code>\n\n⏰ Дата добавления <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
+
+
+def removed_message(ip: str, start: datetime | None, now: datetime) -> str:
+    start = as_msk(start)
+    days = abs((now - start).days) if start else "?"
+    return f"""❌ <b>УДАЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n⏳ Срок рекламы: <b>{days} день</b>\n\n🗑 Дата удаления: <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
+
+
+def expired_message(ip: str, start: datetime | None, now: datetime, end_dt: datetime) -> str:
+    start = as_msk(start)
+    days = abs((now - start).days) if start else "?"
+    return f"""❌ <b>УДАЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n⏳ Срок рекламы: <b>{days} день</b>\n\n🗑 Дата окончания рекламы: <b>{end_dt.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
+
+
+def digest_messages(texts: list[str], now: datetime) -> list[str]:
+    """Сводка событий цикла: события целиком, сообщения не длиннее MESSAGE_LIMIT"""
+    header = f"🗞 <b>Изменения на {now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b> ({len(texts)})"
+    separator = "\n\n➖➖➖\n\n"
+    parts: list[str] = []
+    current = header
+    for text in texts:
+        # Событие длиннее лимита режем как есть — в отдельном сообщении оно бы тоже не влезло
+        chunks = [text[i:i + MESSAGE_LIMIT] for i in range(0, len(text), MESSAGE_LIMIT)] or [""]
+        for chunk in chunks:
+            if len(current) + len(separator) + len(chunk) <= MESSAGE_LIMIT:
+                current += separator + chunk
+            else:
+                parts.append(current)
+                current = chunk
+    parts.append(current)
+    return parts
+
+
+@dataclass
+class CycleChanges:
+    """Изменения одного цикла опроса, которые применяются к БД пачкой"""
+
+    states: dict[str, dict]
+    now: datetime
+    # IP -> id незакрытого периода истории
+    open_history: dict[str, int] = field(default_factory=dict)
+    new_servers: list[dict] = field(default_factory=list)
+    history: list[dict] = field(default_factory=list)
+    # {"id", "end"} периодов, которые закрываются в этом цикле
+    history_closes: list[dict] = field(default_factory=list)
+    dirty: set[str] = field(default_factory=set)
+    events: list[ServerEvent] = field(default_factory=list)
+    # ("open" | "close", ip, время) в порядке применения — для server_stats
+    placements: list[tuple[str, str, datetime]] = field(default_factory=list)
+
+    def open(self, ip: str, start: datetime, source: str | None) -> None:
+        state = self.states[ip]
+        state.update(is_active=True, start=start, end=None, source=source)
+        self.dirty.add(ip)
+        self.placements.append(("open", ip, start))
+        self.history.append({"server_ip": ip, "start": start, "end": None, "source": source})
+
+    def close(self, ip: str, end: datetime) -> None:
+        state = self.states[ip]
+        row_id = self.open_history.pop(ip, None)
+        if row_id is not None:
+            self.history_closes.append({"id": row_id, "end": end})
+        else:
+            # Открытой строки нет (история потеряна) — пишем период целиком.
+            # Без известного начала период сводится к моменту закрытия
+            self.history.append(
+                {"server_ip": ip, "start": state["start"] or end, "end": end, "source": state["source"]}
+            )
+        state.update(is_active=False, end=end)
+        self.dirty.add(ip)
+        self.placements.append(("close", ip, end))
+
+
+def add_new_servers_to_db(changes: CycleChanges, current: dict[str, ServerRecord]) -> list[str]:
+    """Добавляет новые и реактивирует неактивные сервера, возвращает IP созданных"""
+    created_ips = []
+    for ip, record in current.items():
+        # Без даты старта в источнике считаем, что сервер появился сейчас
+        start = record.start or changes.now
+        state = changes.states.get(ip)
+        if state is None:
+            # Новый сервер
+            changes.new_servers.append(
+                {
+                    "ip_adress": ip,
+                    "text": record.name,
+                    "is_active": True,
+                    "start": start,
+                    "source": record.source,
+                }
+            )
+            changes.history.append(
+                {"server_ip": ip, "start": start, "end": None, "source": record.source}
+            )
+            changes.placements.append(("open", ip, start))
+            changes.events.append(ServerEvent(
+                f"added:{ip}:{changes.now.isoformat()}",
+                added_message(ip, record.name, changes.now),
+                EVENT_ADDED,
+                ip,
+                record.name,
+            ))
+            created_ips.append(ip)
+        elif not state["is_active"]:
+            # Новый период активности, старт берем из данных источника
+            changes.open(ip, start, record.source)
+        elif ip not in changes.open_history:
+            changes.history.append(
+                {"server_ip": ip, "start": start, "end": None, "source": record.source}
+            )
+            changes.placements.append(("open", ip, start))
+    return created_ips
 
-        return []
 
+def notify_users_about_new_ips(
+    changes: CycleChanges, new_ips: list[str], current: dict[str, ServerRecord]
+):
+    for ip in new_ips:
+        changes.events.append(ServerEvent(
+            f"added:{ip}:{changes.now.isoformat()}",
+            added_message(ip, current[ip].name, changes.now),
+            EVENT_ADDED,
+            ip,
+            current[ip].name,
+        ))
 
-async def add_new_servers_to_db(
-    session: AsyncSession, servers_data: list[dict]
-) -> list[Server]:
-    new_servers = []
 
-    for srv in servers_data:
-        ip = srv.get("ip")
-        if not ip:
+def check_closed_servers(
+    changes: CycleChanges, current_server_ips: set[str], frozen_sources: frozenset[str]
+):
+    now = changes.now
+    for ip, state in changes.states.items():
+        # По недоступному источнику нельзя понять, удален ли сервер.
+        # Сервера без источника (записанные до его появления) тоже не трогаем
+        if frozen_sources and (state["source"] is None or state["source"] in frozen_sources):
             continue
-
-        result = await session.execute(select(Server).where(Server.ip_adress == ip))
-        server = result.scalars().first()
-        start_str = srv.get("start", "")
-        start = (
-            datetime.strptime(start_str, "%d/%m/%Y").replace(tzinfo=MSK)
-            if start_str
-            else datetime.now(MSK)
+        if state["is_active"] and ip not in current_server_ips:
+            changes.events.append(ServerEvent(
+                f"removed:{ip}:{now.isoformat()}",
+                removed_message(ip, state["start"], now),
+                EVENT_REMOVED,
+                ip,
+                state["text"],
+            ))
+            # Закрываем историю
+            changes.close(ip, now)
+
+
+async def process_servers(
+    session: AsyncSession,
+    snapshot: ParsedSnapshot,
+    now: datetime,
+    previous_server_ips: set[str],
+    previous_server_dates: dict[str, tuple[str | None, str | None]],
+    frozen_sources: frozenset[str] = frozenset(),
+) -> tuple[dict[str, ServerRecord], dict[str, tuple[str | None, str | None]], datetime | None]:
+    """Один цикл сравнения: все чтения и записи — несколькими пакетными запросами.
+    Транзакцию фиксирует вызывающий, вместе с чекпоинтом состояния"""
+    with metrics.cycle_phase_seconds.time(phase="split"):
+        current, expired, next_boundary = snapshot.split(now)
+
+        # Отслеживаем изменения дат start/end для IP в текущем списке
+        current_dates_map: dict[str, tuple[str | None, str | None]] = {}
+        changed_date_ips: list[str] = []
+        for record in snapshot.records:
+            current_dates_map[record.ip] = record.dates
+            previous = previous_server_dates.get(record.ip)
+            if previous is not None and previous != record.dates:
+                changed_date_ips.append(record.ip)
+
+    with metrics.cycle_phase_seconds.time(phase="load"):
+        states = await load_server_states(session, snapshot.by_ip.keys())
+        # Закрываются и проверяются только периоды активных серверов
+        open_history = await load_open_history(
+            session, [ip for ip, state in states.items() if state["is_active"]]
         )
 
-        if server:
-            if not server.is_active:
+    diff_started = time.perf_counter()
+    changes = CycleChanges(states=states, now=now, open_history=open_history)
 
-                server.is_active = True
-                server.end = None
-                # Обновляем старт текущего периода активности по данным источника
-                server.start = start
-                # Новый период активности
-                history = ServerHistory(server_ip=ip, start=start, end=None)
-                session.add(history)
-            else:
-                pass
-            # Проверяем, есть ли незавершённая история
-            hist_result = await session.execute(
-                select(ServerHistory).where(
-                    ServerHistory.server_ip == ip, ServerHistory.end == None
-                )
-            )
-            open_history = hist_result.scalars().first()
-            if not open_history:
-                # Новый период активности
-                history = ServerHistory(server_ip=ip, start=start, end=None)
-                session.add(history)
+    # Если у IP изменились даты, завершаем старый период как "удаление"
+    for ip in changed_date_ips:
+        state = states.get(ip)
+        if not state or not state["is_active"]:
             continue
-        # Новый сервер
-
-        new_server = Server(
-            ip_adress=ip,
-            text=srv.get("name", "Новый сервер"),
-            is_active=True,
-            start=start,
+        changes.events.append(ServerEvent(
+            f"removed:{ip}:{now.isoformat()}",
+            removed_message(ip, state["start"], now),
+            EVENT_REMOVED,
+            ip,
+            state["text"],
+        ))
+        changes.close(ip, now)
+
+    # Сервера, у которых наступила дата окончания (end)
+    for record in expired:
+        ip, end_dt = record.ip, record.end
+        state = states.get(ip)
+        if not state or not state["is_active"]:
+            continue
+        changes.events.append(ServerEvent(
+            f"expired:{ip}:{end_dt.isoformat()}",
+            expired_message(ip, state["start"], now, end_dt),
+            EVENT_EXPIRED,
+            ip,
+            state["text"],
+        ))
+        changes.close(ip, end_dt)
+
+    # Добавляем новые сервера
+    created_ips = set(add_new_servers_to_db(changes, current))
+
+    # Уведомляем только о реактивациях (исключаем реально новые сервера, о которых уже сообщили)
+    reactivated_ips = [
+        ip for ip in current if ip not in previous_server_ips and ip not in created_ips
+    ]
+    notify_users_about_new_ips(changes, reactivated_ips, current)
+
+    # Проверяем сервера, которые исчезли из списка
+    check_closed_servers(changes, current.keys(), frozen_sources)
+    metrics.cycle_phase_seconds.observe(time.perf_counter() - diff_started, phase="diff")
+
+    with metrics.cycle_phase_seconds.time(phase="write"):
+        await insert_servers(session, changes.new_servers)
+        await insert_history(session, changes.history)
+        await close_history(session, changes.history_closes)
+        await update_servers(
+            session,
+            [
+                {
+                    "id": states[ip]["id"],
+                    "is_active": states[ip]["is_active"],
+                    "start": states[ip]["start"],
+                    "end": states[ip]["end"],
+                    "source": states[ip]["source"],
+                }
+                for ip in changes.dirty
+            ],
         )
-        session.add(new_server)
-        history = ServerHistory(server_ip=ip, start=start, end=None)
-        session.add(history)
-        new_servers.append(new_server)
-
-    if new_servers:
-        await session.commit()
-    else:
-        await session.commit()  # commit для реактивации
-    return new_servers
-
-
-async def get_all_chats(session: AsyncSession):
-    """Получает список всех чатов (пользователей и групп) для отправки уведомлений"""
-    chats = set()
-
-    # Получаем пользователей из базы
-    result = await session.execute(select(User.telegram_id))
-    users = result.scalars().all()
-    chats.update(users)
-
-    # Получаем группы/каналы из базы
-    result = await session.execute(select(Chat.chat_id))
-    groups = result.scalars().all()
-    chats.update(groups)
+        await record_placements(session, changes.placements)
+    if changes.events:
+        with metrics.cycle_phase_seconds.time(phase="enqueue"):
+            if not subscribers.loaded:
+                await subscribers.load(session)
+            routed, digests = subscribers.route(changes.events)
+            deliveries = [(event.key, event.text, chats) for event, chats in routed if chats]
+            for chats, events in digests:
+                if not events:
+                    continue
+                digest = digest_messages([event.text for event in events], now)
+                # Ключ уникален в паре с chat_id, группы чатов не пересекаются
+                deliveries.extend(
+                    (f"digest:{now.isoformat()}:{i}", text, chats) for i, text in enumerate(digest)
+                )
+            await enqueue_routed(session, deliveries)
 
-    return list(chats)
+    return current, current_dates_map, next_boundary
 
 
-async def notify_users_about_new_servers(session: AsyncSession, servers: list[Server]):
-    if not servers:
-        return
+def snapshot_backoff(now: datetime) -> bool:
+    """Источник недавно не ответил — команды обходятся последним снимком"""
+    if poll_breaker is not None and poll_breaker.is_open:
+        return True
+    failed_at = snapshot_cache.failed_at
+    return failed_at is not None and now - failed_at < SNAPSHOT_RETRY_AFTER
 
-    chats = await get_all_chats(session)
 
-    for server in servers:
+async def get_snapshot() -> SourceSnapshot | None:
+    """Снимок для команд: берется из опроса, сам источник запрашивается,
+    только если опрос в этом процессе давно не публиковал данных.
+    Пока источник недоступен, возвращается последний снимок с stale=True"""
+    snapshot = snapshot_cache.current
+    now = datetime.now(MSK)
+    if snapshot is not None and now - snapshot.fetched_at < SNAPSHOT_MAX_AGE:
+        return snapshot
+    if snapshot_backoff(now):
+        return snapshot
+
+    # Одновременные команды ждут один запрос к источнику
+    async with _snapshot_refresh_lock:
+        snapshot = snapshot_cache.current
         now = datetime.now(MSK)
-        message = f"""✅ <b>ДОБАВЛЕН СЕРВЕР!</b>
-
-🖥 IP-адрес: <code>{server.ip_adress}</code>
-📝 Текст: <code>{server.text}</code>
-
-⏰ Дата добавления <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
-        for chat_id in chats:
-            try:
-                await bot.send_message(chat_id, message, parse_mode="HTML")
-            except Exception as e:
-                pass
-
-
-async def notify_users_about_new_ips(
-    session: AsyncSession, new_ips: list[str], servers_data: list[dict]
-):
-    if not new_ips:
-        return
-
-    chats = await get_all_chats(session)
-
-    for ip in new_ips:
-        srv = next((s for s in servers_data if s.get("ip") == ip), None)
-        if not srv:
-            continue
-        name = srv.get("name", "Новый сервер")
+        if snapshot is not None and now - snapshot.fetched_at < SNAPSHOT_MAX_AGE:
+            return snapshot
+        # Ожидавшие в очереди не повторяют только что упавший запрос
+        if snapshot_backoff(now):
+            return snapshot
+        try:
+            fetched = await get_sources().fetch()
+        except Exception as e:
+            print(f"[snapshot] Источник недоступен, команды используют прошлый снимок: {e!r}")
+            return snapshot_cache.fail(datetime.now(MSK))
         now = datetime.now(MSK)
-        message = f"""✅ <b>ДОБАВЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n📝 Текст: <code>{name}</code>\n\n⏰ Дата добавления <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
-        for chat_id in chats:
-            try:
-                await bot.send_message(chat_id, message, parse_mode="HTML")
-            except Exception as e:
-                pass
-
-
-async def check_closed_servers(session: AsyncSession, current_server_ips: list[str]):
-    now = datetime.now(MSK)
-    # Получаем все активные сервера
-    result = await session.execute(select(Server).where(Server.is_active == True))
-    active_servers = result.scalars().all()
-
-    if not active_servers:
-        return
-
-    chats = await get_all_chats(session)
-
-    for server in active_servers:
-        if server.ip_adress not in current_server_ips:
-            # days считаем по start и now, приводим start к MSK если нужно
-            start = server.start
-            if start and start.tzinfo is None:
-                start = start.replace(tzinfo=MSK)
-            days = abs((now - start).days) if start else "?"
-            message = f"""❌ <b>УДАЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{server.ip_adress}</code>\n⏳ Срок рекламы: <b>{days} день</b>\n\n🗑 Дата удаления: <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
-
-            for chat_id in chats:
-                try:
-                    await bot.send_message(chat_id, message, parse_mode="HTML")
-
-                except Exception as e:
-                    pass
-            # Закрываем историю
-            history = ServerHistory(server_ip=server.ip_adress, start=None, end=now)
-            session.add(history)
-            server.is_active = False
-            server.end = now
-    await session.commit()
-    # Повторно выводим список активных серверов
-    result = await session.execute(select(Server).where(Server.is_active == True))
-    active_servers = result.scalars().all()
-
-
-async def check_and_update_servers():
-    previous_server_ips = set()
-    previous_server_dates: dict[str, tuple[str | None, str | None]] = {}
-
-    while True:
-        async with db_helper.session_factory() as session:
-            servers_data = await fetch_servers_from_link()
-            now = datetime.now(MSK)
-
-            # Фильтруем сервера: учитываем только те, у которых дата старта уже наступила
-            filtered_servers_data = []
-            for srv in servers_data:
-                ip = srv.get("ip")
-                if not ip:
-                    continue
-                start_str = srv.get("start") or None
-                if start_str:
-                    try:
-                        start_dt = datetime.strptime(start_str, "%d/%m/%Y").replace(
-                            tzinfo=MSK
-                        )
-                    except Exception:
-                        start_dt = now
-                else:
-                    start_dt = now
-                if start_dt <= now:
-                    filtered_servers_data.append(srv)
-
-            current_server_ips = set(
-                srv.get("ip") for srv in filtered_servers_data if srv.get("ip")
+        current, _, _ = fetched.snapshot.split(now)
+        return snapshot_cache.publish(list(current.values()), now)
+
+
+@dataclass
+class PollState:
+    """Состояние сравнения между циклами опроса"""
+
+    server_ips: set[str] = field(default_factory=set)
+    server_dates: dict[str, tuple[str | None, str | None]] = field(default_factory=dict)
+    # (хеш списка, день по МСК) последнего обработанного цикла
+    cycle_key: tuple[str, date] | None = None
+    next_boundary: datetime | None = None
+    last_cycle_at: datetime | None = None
+
+
+async def load_poll_state(session: AsyncSession) -> PollState:
+    """Состояние последнего записанного цикла. Без чекпоинта (первый запуск
+    после обновления) прошлым списком считаются активные сервера из БД,
+    чтобы первый цикл не принял их все за вернувшиеся"""
+    checkpoint = await load_checkpoint(session, CHECKPOINT_NAME)
+    if checkpoint is None:
+        return PollState(server_ips=await load_active_ips(session))
+
+    state = PollState(
+        cycle_key=(checkpoint.digest, checkpoint.cycle_day),
+        next_boundary=as_msk(checkpoint.next_boundary),
+        last_cycle_at=as_msk(checkpoint.last_cycle_at),
+    )
+    for ip, start_raw, end_raw, listed in await load_checkpoint_servers(session):
+        state.server_dates[ip] = (start_raw, end_raw)
+        if listed:
+            state.server_ips.add(ip)
+    return state
+
+
+async def save_poll_state(
+    session: AsyncSession,
+    previous: PollState,
+    server_ips: set[str],
+    server_dates: dict[str, tuple[str | None, str | None]],
+    cycle_key: tuple[str, date],
+    next_boundary: datetime | None,
+    now: datetime,
+) -> None:
+    """Пишет чекпоинт в транзакции цикла: по IP — только разницу с прошлым циклом"""
+    if previous.cycle_key is None:
+        # Прошлое состояние не из чекпоинта — строки IP переписываются целиком
+        await clear_checkpoint_servers(session)
+        previous = PollState()
+    inserted, updated = [], []
+    for ip, dates in server_dates.items():
+        listed = ip in server_ips
+        before = previous.server_dates.get(ip)
+        if before is None:
+            inserted.append(
+                {"ip_adress": ip, "start_raw": dates[0], "end_raw": dates[1], "listed": listed}
             )
-
-            # Отслеживаем изменения дат start/end для IP в текущем списке
-            changed_date_ips: list[str] = []
-            current_dates_map: dict[str, tuple[str | None, str | None]] = {}
-            for srv in servers_data:
-                ip = srv.get("ip")
-                if not ip:
-                    continue
-                start_str = srv.get("start") or None
-                end_str = srv.get("end") or None
-                current_dates_map[ip] = (start_str, end_str)
-                if ip in previous_server_dates:
-                    prev_start, prev_end = previous_server_dates[ip]
-                    if prev_start != start_str or prev_end != end_str:
-                        changed_date_ips.append(ip)
-
-            # Новые IP, которых не было в предыдущем опросе
-            new_ips = list(current_server_ips - previous_server_ips)
-
-            # Если у IP изменились даты, завершаем старый период как "удаление"
-            if changed_date_ips:
-                now = datetime.now(MSK)
-                chats = await get_all_chats(session)
-                for ip in changed_date_ips:
-                    result = await session.execute(
-                        select(Server).where(Server.ip_adress == ip)
-                    )
-                    server = result.scalars().first()
-                    if not server or not server.is_active:
-                        continue
-                    start = server.start
-                    if start and start.tzinfo is None:
-                        start = start.replace(tzinfo=MSK)
-                    days = abs((now - start).days) if start else "?"
-                    message = f"""❌ <b>УДАЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n⏳ Срок рекламы: <b>{days} день</b>\n\n🗑 Дата удаления: <b>{now.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
-                    for chat_id in chats:
-                        try:
-                            await bot.send_message(chat_id, message, parse_mode="HTML")
-                        except Exception:
-                            pass
-                    # Закрываем текущую историю и деактивируем
-                    history = ServerHistory(server_ip=ip, start=None, end=now)
-                    session.add(history)
-                    server.is_active = False
-                    server.end = now
-                await session.commit()
-
-            # Проверка серверов, у которых наступила дата окончания (end)
-            # Проверка серверов, у которых наступила дата окончания (end)
-            expired_ips: list[tuple[str, datetime]] = []
-            for srv in servers_data:
-                ip = srv.get("ip")
-                if not ip:
-                    continue
-                end_str = srv.get("end") or None
-                if not end_str:
-                    continue
-                try:
-                    # парсим только дату, время ставим в конец дня
-                    end_dt = datetime.strptime(end_str, "%d/%m/%Y").replace(
-                        hour=23, minute=59, second=59, tzinfo=MSK
-                    )
-                except Exception:
-                    continue
-
-                if end_dt <= now:
-                    # проверяем один раз: если сервер ещё активен, то добавляем в список
-                    result = await session.execute(
-                        select(Server).where(Server.ip_adress == ip)
-                    )
-                    server = result.scalars().first()
-                    if server and server.is_active:  # только если активен
-                        expired_ips.append((ip, end_dt))
-
-            if expired_ips:
-                chats = await get_all_chats(session)
-                for ip, end_dt in expired_ips:
-                    result = await session.execute(
-                        select(Server).where(Server.ip_adress == ip)
-                    )
-                    server = result.scalars().first()
-                    if not server or not server.is_active:
-                        continue
-                    start = server.start
-                    if start and start.tzinfo is None:
-                        start = start.replace(tzinfo=MSK)
-                    days = abs((now - start).days) if start else "?"
-                    message = f"""❌ <b>УДАЛЕН СЕРВЕР!</b>\n\n🖥 IP-адрес: <code>{ip}</code>\n⏳ Срок рекламы: <b>{days} день</b>\n\n🗑 Дата окончания рекламы: <b>{end_dt.strftime('%d.%m.%Y %H:%M:%S')} МСК</b>"""
-                    for chat_id in chats:
-                        try:
-                            await bot.send_message(chat_id, message, parse_mode="HTML")
-                        except Exception:
-                            pass
-                    # Закрываем историю и деактивируем
-                    history = ServerHistory(server_ip=ip, start=None, end=end_dt)
-                    session.add(history)
-                    server.is_active = False
-                    server.end = end_dt
-                await session.commit()
-
-            # Добавляем новые сервера
-            new_servers = await add_new_servers_to_db(session, filtered_servers_data)
-            await notify_users_about_new_servers(session, new_servers)
-
-            # Уведомляем только о реактивациях (исключаем реально новые сервера, о которых уже сообщили)
-            created_ips = {server.ip_adress for server in new_servers}
-            reactivated_ips = [ip for ip in new_ips if ip not in created_ips]
-            await notify_users_about_new_ips(
-                session, reactivated_ips, filtered_servers_data
+        elif before != dates or listed != (ip in previous.server_ips):
+            updated.append(
+                {"b_ip": ip, "b_start_raw": dates[0], "b_end_raw": dates[1], "b_listed": listed}
             )
+    await delete_checkpoint_servers(
+        session, [ip for ip in previous.server_dates if ip not in server_dates]
+    )
+    await insert_checkpoint_servers(session, inserted)
+    await update_checkpoint_servers(session, updated)
+    await save_checkpoint(
+        session,
+        CHECKPOINT_NAME,
+        {
+            "digest": cycle_key[0],
+            "cycle_day": cycle_key[1],
+            "last_cycle_at": now,
+            "next_boundary": next_boundary,
+        },
+    )
+
+
+async def poll_once(state: PollState) -> datetime | None:
+    """Один цикл опроса. Ошибка загрузки источника пробрасывается наружу:
+    пустой список из-за сбоя нельзя путать с удалением всех серверов"""
+    with metrics.cycle_phase_seconds.time(phase="fetch"):
+        fetched = await get_sources().fetch()
+    return await apply_fetch(state, fetched, datetime.now(MSK))
+
+
+async def apply_fetch(state: PollState, fetched: MergedFetch, now: datetime) -> datetime | None:
+    """Сравнение загруженного списка с БД на момент now. Отдельно от загрузки,
+    чтобы benchmarks.replay мог подать записанные ответы и их время"""
+    # Даты в списке с точностью до дня: если ни список, ни день не сменились,
+    # результат сравнения будет тем же, и всю работу с БД можно пропустить
+    cycle_key = (fetched.digest, now.date())
+    if cycle_key == state.cycle_key:
+        if snapshot_cache.current is None:
+            # Первый цикл после перезапуска с тем же списком: БД уже в нужном состоянии
+            current, _, _ = fetched.snapshot.split(now)
+            snapshot_cache.publish(list(current.values()), now)
+        else:
+            snapshot_cache.touch(now)
+        return state.next_boundary
+
+    async with db_helper.session_factory() as session:
+        current, server_dates, next_boundary = await process_servers(
+            session,
+            fetched.snapshot,
+            now,
+            state.server_ips,
+            state.server_dates,
+            frozen_sources=fetched.failed,
+        )
+        server_ips = set(current)
+        with metrics.cycle_phase_seconds.time(phase="checkpoint"):
+            await save_poll_state(session, state, server_ips, server_dates, cycle_key, next_boundary, now)
+        with metrics.cycle_phase_seconds.time(phase="commit"):
+            # Аренду могли перехватить, пока шел цикл: тогда его результат не пишем
+            await fence(session)
+            await session.commit()
+
+    state.server_ips = server_ips
+    state.server_dates = server_dates
+    state.next_boundary = next_boundary
+    state.cycle_key = cycle_key
+    state.last_cycle_at = now
+    metrics.active_servers.set(len(state.server_ips))
+    snapshot_cache.publish(list(current.values()), now)
+    return state.next_boundary
 
-            # Проверяем сервера, которые исчезли из списка
-            await check_closed_servers(session, list(current_server_ips))
-
-            # Обновляем состояние для следующей итерации
-            previous_server_ips = current_server_ips
-            previous_server_dates = current_dates_map
 
-        await asyncio.sleep(CHECK_INTERVAL)
+async def check_and_update_servers():
+    # Состояние переживает перезапуск и смену лидера: продолжаем с последнего цикла
+    async with db_helper.session_factory() as session:
+        state = await load_poll_state(session)
+    if state.last_cycle_at is not None:
+        print(
+            f"[poller] Продолжаем с цикла {state.last_cycle_at.strftime('%d.%m.%Y %H:%M:%S')} МСК, "
+            f"серверов в списке: {len(state.server_ips)}"
+        )
+    metrics.active_servers.set(len(state.server_ips))
+    global poll_breaker
+    scheduler = PollScheduler.from_settings()
+    poll_breaker = scheduler.breaker
+    await scheduler.run(lambda: poll_once(state))
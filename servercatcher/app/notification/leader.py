@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import case, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.notification.crud import dialect_insert
+from servercatcher.core.models import db_helper
+from servercatcher.core.models.lease import Lease
+
+
+class LeaseLostError(RuntimeError):
+    """Аренду перехватила другая реплика: запись бывшего лидера отменяется"""
+
+
+class LeaderLease:
+    """Аренда роли в БД: лидер тот, чья запись не истекла.
+
+    Захват и продление — один условный UPDATE (или INSERT для первой
+    записи), поэтому работает и на SQLite, и на Postgres без advisory locks.
+    Каждый захват другим держателем увеличивает token, а записи лидера
+    проверяют его в своей транзакции (fence): лидер, чья аренда истекла
+    посреди цикла, не перезапишет работу нового.
+    """
+
+    def __init__(self, name: str, ttl: float, holder: str | None = None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Token последнего успешного захвата или продления, None — не лидер
+        self.token: int | None = None
+
+    async def try_acquire(self) -> bool:
+        """Захватывает или продлевает аренду, возвращает True, если мы лидер"""
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.ttl)
+        async with db_helper.session_factory() as session:
+            result = await session.execute(
+                update(Lease)
+                .where(
+                    Lease.name == self.name,
+                    or_(Lease.holder == self.holder, Lease.expires_at < now),
+                )
+                .values(
+                    holder=self.holder,
+                    expires_at=expires_at,
+                    # SET видит старого держателя: захват чужой аренды — новый token
+                    token=case((Lease.holder == self.holder, Lease.token), else_=Lease.token + 1),
+                )
+                .returning(Lease.token)
+            )
+            token = result.scalar_one_or_none()
+            if token is None:
+                result = await session.execute(
+                    dialect_insert(session, Lease)
+                    .values(name=self.name, holder=self.holder, expires_at=expires_at, token=1)
+                    .on_conflict_do_nothing(index_elements=["name"])
+                    .returning(Lease.token)
+                )
+                token = result.scalar_one_or_none()
+            await session.commit()
+        self.token = token
+        return token is not None
+
+    async def fence(self, session: AsyncSession) -> None:
+        """Проверка перед commit записи лидера, в той же транзакции.
+
+        Условный UPDATE, а не SELECT: он берет блокировку записи (строки
+        в Postgres, всей БД в SQLite), поэтому перехват аренды дождется
+        нашего commit, и между проверкой и commit token не сменится.
+        """
+        if self.token is not None:
+            result = await session.execute(
+                update(Lease)
+                .where(Lease.name == self.name, Lease.holder == self.holder, Lease.token == self.token)
+                .values(token=Lease.token)
+            )
+            if result.rowcount == 1:
+                return
+            self.token = None
+        raise LeaseLostError(f"{self.holder} больше не держит аренду {self.name}")
+
+    async def release(self) -> None:
+        """Отдает аренду сразу, чтобы другая реплика не ждала истечения ttl"""
+        async with db_helper.session_factory() as session:
+            await session.execute(
+                update(Lease)
+                .where(Lease.name == self.name, Lease.holder == self.holder)
+                .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await session.commit()
+
+    async def run_while_leader(self, work: Callable[[], Awaitable]):
+        """Запускает work, пока держим аренду, и останавливает при ее потере.
+
+        Продление идет каждые ttl/3, с тем же шагом остальные реплики
+        пытаются захватить освободившуюся аренду.
+        """
+        global current_lease
+        current_lease = self
+        task: asyncio.Task | None = None
+        try:
+            while True:
+                try:
+                    leader = await self.try_acquire()
+                except Exception as e:
+                    # Не смогли продлить — не можем и гарантировать, что лидер один
+                    print(f"[leader] Ошибка продления аренды {self.name}: {e}")
+                    leader = False
+
+                if task is not None and task.done():
+                    if not task.cancelled() and task.exception() is not None:
+                        print(f"[leader] {self.name} завершился с ошибкой: {task.exception()!r}")
+                    task = None
+
+                if leader and task is None:
+                    print(f"[leader] {self.holder} ведет {self.name}")
+                    task = asyncio.create_task(work())
+                elif not leader and task is not None:
+                    print(f"[leader] {self.holder} потерял аренду {self.name}")
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    task = None
+
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            self.token = None
+            try:
+                await self.release()
+            except Exception:
+                pass
+
+
+# Аренда, под которой этот процесс ведет работу лидера; None — процесс не
+# выбирает лидера (админские команды, benchmarks.replay) и пишет без проверки
+current_lease: LeaderLease | None = None
+
+
+async def fence(session: AsyncSession) -> None:
+    """Проверка аренды в транзакции записи лидера, LeaseLostError — если ее перехватили"""
+    if current_lease is not None:
+        await current_lease.fence(session)
@@ -0,0 +1,244 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import select, update, delete, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.notification.crud import (
+    dialect_insert,
+    migrate_chats,
+    record_unreachable,
+    reset_send_failures,
+)
+from servercatcher.core import metrics
+from servercatcher.core.config import get_bot, settings
+from servercatcher.app.notification.leader import fence
+from servercatcher.app.notification.subscribers import subscribers
+from servercatcher.core.models import db_helper
+from servercatcher.core.models.server import NotificationOutbox
+
+if TYPE_CHECKING:
+    from servercatcher.app.notification.broadcast import Broadcaster
+
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_INTERVAL = 1
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_BASE = 2
+OUTBOX_BACKOFF_MAX = 600
+OUTBOX_RETENTION = timedelta(days=1)
+OUTBOX_CLEANUP_EVERY = 600  # итераций воркера
+
+# Создается при первой рассылке; бенчмарки подставляют свой
+broadcaster: "Broadcaster | None" = None
+
+
+def get_broadcaster() -> "Broadcaster":
+    global broadcaster
+    if broadcaster is None:
+        # aiogram нужен только для отправки: сравнение и запись в outbox обходятся без него
+        from servercatcher.app.notification.broadcast import Broadcaster
+
+        broadcaster = Broadcaster(get_bot())
+    return broadcaster
+
+
+def event_kind(event_key: str) -> str:
+    """Тип события из ключа вида added:<ip>:<время> или digest:<время>:<n>"""
+    return event_key.split(":", 1)[0]
+
+
+async def enqueue(
+    session: AsyncSession, chat_ids: Iterable[int], text: str, event_key: str
+) -> None:
+    """Ставит уведомление в очередь в рамках текущей транзакции опроса"""
+    await enqueue_events(session, chat_ids, [(event_key, text)])
+
+
+async def enqueue_events(
+    session: AsyncSession, chat_ids: Iterable[int], events: list[tuple[str, str]]
+) -> None:
+    """Ставит в очередь пачку событий (ключ, текст) одним запросом"""
+    chat_ids = list(chat_ids)
+    await enqueue_routed(session, [(event_key, text, chat_ids) for event_key, text in events])
+
+
+async def enqueue_routed(
+    session: AsyncSession, deliveries: Iterable[tuple[str, str, Iterable[int]]]
+) -> None:
+    """Ставит в очередь события (ключ, текст, чаты) — у каждого свои получатели"""
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "idempotency_key": f"{event_key}:{chat_id}",
+            "event": event_kind(event_key),
+            "chat_id": chat_id,
+            "text": text,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+        }
+        for event_key, text, chat_ids in deliveries
+        for chat_id in chat_ids
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(session, NotificationOutbox).on_conflict_do_nothing(
+        index_elements=["idempotency_key"]
+    )
+    await session.execute(stmt, rows)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_BACKOFF_BASE ** attempts, OUTBOX_BACKOFF_MAX))
+
+
+async def drain_outbox_batch() -> int:
+    """Отправляет одну пачку готовых уведомлений, возвращает размер пачки"""
+    from servercatcher.app.notification.broadcast import (
+        classify_send_error,
+        SEND_MIGRATED,
+        SEND_TRANSIENT,
+        SEND_UNREACHABLE,
+    )
+
+    # Читаем пачку и сразу закрываем транзакцию, чтобы не держать БД во время отправки
+    async with db_helper.session_factory() as session:
+        result = await session.execute(
+            select(NotificationOutbox)
+            .where(
+                NotificationOutbox.status == "pending",
+                NotificationOutbox.next_attempt_at <= datetime.now(timezone.utc),
+            )
+            .order_by(NotificationOutbox.id)
+            .limit(OUTBOX_BATCH_SIZE)
+        )
+        rows = result.scalars().all()
+
+    if not rows:
+        return 0
+
+    # Отчет и метки метрик — по типу события, а не по пачке целиком
+    groups: dict[str, list[int]] = {}
+    for idx, row in enumerate(rows):
+        groups.setdefault(row.event or "outbox", []).append(idx)
+    errors: dict[int, Exception] = {}
+    migrations: dict[int, int] = {}
+    for event, indexes in groups.items():
+        report = await get_broadcaster().deliver(
+            [(rows[idx].chat_id, rows[idx].text) for idx in indexes], event=event
+        )
+        errors.update((indexes[pos], error) for pos, error in report.errors.items())
+        migrations.update(report.migrated)
+
+    now = datetime.now(timezone.utc)
+    sent_ids = []
+    delivered_chats = set()
+    unreachable_chats = set()
+    retries = []
+    for idx, row in enumerate(rows):
+        # Группа, ставшая супергруппой, дальше учитывается по новому id
+        chat_id = migrations.get(row.chat_id, row.chat_id)
+        error = errors.get(idx)
+        if error is None:
+            sent_ids.append(row.id)
+            delivered_chats.add(chat_id)
+            continue
+        attempts = row.attempts + 1
+        kind = classify_send_error(error)
+        if kind == SEND_UNREACHABLE:
+            unreachable_chats.add(chat_id)
+        # Повторяем только временные ошибки, недоступный чат или плохое сообщение не исправятся.
+        # Миграция — не недоступность: повтор уйдет на новый id
+        retry = kind in (SEND_TRANSIENT, SEND_MIGRATED) and attempts < OUTBOX_MAX_ATTEMPTS
+        retries.append(
+            {
+                "b_id": row.id,
+                "b_status": "pending" if retry else "failed",
+                "b_attempts": attempts,
+                "b_last_error": str(error)[:500],
+                "b_next_attempt_at": now + _backoff(attempts),
+            }
+        )
+
+    table = NotificationOutbox.__table__
+    async with db_helper.session_factory() as session:
+        if migrations:
+            await migrate_chats(session, migrations)
+            # Еще не отправленные сообщения старой группе уходят супергруппе
+            await session.execute(
+                update(table)
+                .where(table.c.chat_id == bindparam("b_old"), table.c.status == "pending")
+                .values(chat_id=bindparam("b_new")),
+                [{"b_old": old, "b_new": new} for old, new in migrations.items()],
+            )
+        if sent_ids:
+            await session.execute(
+                update(table)
+                .where(table.c.id.in_(sent_ids))
+                .values(status="sent", sent_at=now, attempts=table.c.attempts + 1)
+            )
+        if retries:
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    status=bindparam("b_status"),
+                    attempts=bindparam("b_attempts"),
+                    last_error=bindparam("b_last_error"),
+                    next_attempt_at=bindparam("b_next_attempt_at"),
+                ),
+                retries,
+            )
+        await reset_send_failures(session, delivered_chats - unreachable_chats)
+        pruned = await record_unreachable(
+            session, unreachable_chats, settings.prune_failure_threshold, now
+        )
+        if pruned:
+            # Остальные сообщения выключенным чатам уже не отправятся
+            await session.execute(
+                update(table)
+                .where(table.c.chat_id.in_(pruned), table.c.status == "pending")
+                .values(status="failed", last_error="chat pruned")
+            )
+        await fence(session)
+        await session.commit()
+
+    for old_chat_id, new_chat_id in migrations.items():
+        subscribers.migrate(old_chat_id, new_chat_id)
+        print(f"[outbox] Группа {old_chat_id} стала супергруппой {new_chat_id}")
+    for chat_id in pruned:
+        subscribers.discard(chat_id)
+    if pruned:
+        metrics.pruned_chats.inc(len(pruned))
+        print(f"[outbox] Выключено недоступных чатов: {len(pruned)}")
+    return len(rows)
+
+
+async def cleanup_outbox() -> None:
+    """Удаляет давно доставленные уведомления, чтобы таблица не росла"""
+    async with db_helper.session_factory() as session:
+        await session.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status == "sent",
+                NotificationOutbox.sent_at < datetime.now(timezone.utc) - OUTBOX_RETENTION,
+            )
+        )
+        await session.commit()
+
+
+async def run_outbox_worker():
+    iteration = 0
+    while True:
+        try:
+            processed = await drain_outbox_batch()
+            iteration += 1
+            if iteration % OUTBOX_CLEANUP_EVERY == 0:
+                await cleanup_outbox()
+        except Exception as e:
+            print(f"[outbox] Ошибка доставки: {e}")
+            processed = 0
+
+        if processed < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Iterable
+
+MSK = timezone(timedelta(hours=3))
+DEFAULT_NAME = "Новый сервер"
+
+
+def parse_source_date(value: str | None, end_of_day: bool = False) -> datetime | None:
+    """Разбирает дату источника вида 31/12/2025 в MSK"""
+    if not value:
+        return None
+    dt = datetime.strptime(value, "%d/%m/%Y")
+    if end_of_day:
+        dt = dt.replace(hour=23, minute=59, second=59)
+    return dt.replace(tzinfo=MSK)
+
+
+def as_msk(dt: datetime | None) -> datetime | None:
+    # SQLite возвращает даты без tzinfo, храним их в МСК
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=MSK)
+    return dt
+
+
+def _safe_date(value: str | None, end_of_day: bool = False) -> datetime | None:
+    try:
+        return parse_source_date(value, end_of_day)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class ServerRecord:
+    """Проверенная запись источника с уже разобранными датами"""
+
+    ip: str
+    name: str
+    source: str | None
+    # Даты как в источнике — по ним опрос замечает изменение дат
+    start_raw: str | None
+    end_raw: str | None
+    # None, если даты нет или она не разбирается
+    start: datetime | None
+    end: datetime | None
+
+    @staticmethod
+    def fields(raw: dict) -> tuple[str, str, str | None, str | None] | None:
+        """(ip, name, start, end) из элемента JSON источника, None — если нет IP"""
+        if not isinstance(raw, dict):
+            return None
+        ip = raw.get("ip")
+        if not isinstance(ip, str) or not ip.strip():
+            return None
+        name = raw.get("name")
+        start_raw = raw.get("start") or None
+        end_raw = raw.get("end") or None
+        return (
+            ip.strip(),
+            name if isinstance(name, str) and name else DEFAULT_NAME,
+            start_raw if isinstance(start_raw, str) else None,
+            end_raw if isinstance(end_raw, str) else None,
+        )
+
+    @classmethod
+    def parse(cls, raw: dict, source: str | None = None) -> "ServerRecord | None":
+        """Запись из элемента JSON источника, None — если в ней нет IP"""
+        fields = cls.fields(raw)
+        if fields is None:
+            return None
+        ip, name, start_raw, end_raw = fields
+        return cls(
+            ip=ip,
+            name=name,
+            source=source,
+            start_raw=start_raw,
+            end_raw=end_raw,
+            start=_safe_date(start_raw),
+            end=_safe_date(end_raw, end_of_day=True),
+        )
+
+    @property
+    def dates(self) -> tuple[str | None, str | None]:
+        return self.start_raw, self.end_raw
+
+
+class ParsedSnapshot:
+    """Список источника, разобранный один раз на каждый новый ответ.
+
+    Записи без дублей IP в порядке источника и индекс IP -> запись.
+    Зависящее от времени деление на текущие и истекшие делает split().
+    """
+
+    __slots__ = ("records", "by_ip", "skipped")
+
+    def __init__(self, records: Iterable[ServerRecord], skipped: int = 0):
+        self.by_ip: dict[str, ServerRecord] = {}
+        for record in records:
+            # Первая запись с IP выигрывает
+            self.by_ip.setdefault(record.ip, record)
+        self.records: tuple[ServerRecord, ...] = tuple(self.by_ip.values())
+        # Отброшенные при разборе записи без IP
+        self.skipped = skipped
+
+    @classmethod
+    def from_raw(cls, servers: Iterable[dict], source: str | None = None) -> "ParsedSnapshot":
+        builder = SnapshotBuilder(source)
+        for raw in servers:
+            builder.add(raw)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def split(
+        self, now: datetime
+    ) -> tuple[dict[str, ServerRecord], list[ServerRecord], datetime | None]:
+        """Текущие сервера (старт наступил, окончание — нет), истекшие
+        и ближайшая будущая дата старта или окончания"""
+        current: dict[str, ServerRecord] = {}
+        expired: list[ServerRecord] = []
+        next_boundary: datetime | None = None
+        for record in self.records:
+            end = record.end
+            if end is not None and end <= now:
+                expired.append(record)
+                continue
+            start = record.start
+            if start is None or start <= now:
+                current[record.ip] = record
+            for boundary in (start, end):
+                if boundary is not None and boundary > now and (
+                    next_boundary is None or boundary < next_boundary
+                ):
+                    next_boundary = boundary
+        return current, expired, next_boundary
+
+
+class SnapshotBuilder:
+    """Собирает снимок по одной записи, пока тело источника еще читается.
+
+    Неизменившиеся записи берутся из прошлого снимка без разбора дат,
+    так что полный ответ без ETag стоит только сравнения строк.
+    """
+
+    def __init__(self, source: str | None = None, previous: ParsedSnapshot | None = None):
+        self.source = source
+        self._previous = previous.by_ip if previous is not None else {}
+        self._records: list[ServerRecord] = []
+        self.skipped = 0
+
+    def add(self, raw: dict) -> None:
+        fields = ServerRecord.fields(raw)
+        if fields is None:
+            self.skipped += 1
+            return
+        ip, name, start_raw, end_raw = fields
+        record = self._previous.get(ip)
+        if record is None or (record.name, record.start_raw, record.end_raw, record.source) != (
+            name, start_raw, end_raw, self.source
+        ):
+            record = ServerRecord.parse(raw, self.source)
+        self._records.append(record)
+
+    def __len__(self) -> int:
+        return len(self._records) + self.skipped
+
+    def build(self) -> ParsedSnapshot:
+        return ParsedSnapshot(self._records, self.skipped)
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable
+
+from servercatcher.core import metrics
+from servercatcher.core.config import settings
+
+MSK = timezone(timedelta(hours=3))
+
+
+class CircuitBreaker:
+    """После threshold ошибок подряд размыкается на cooldown секунд,
+    затем пропускает одну пробную попытку"""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def remaining(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        return self.remaining() == 0
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            print("[poller] Источник снова доступен, сравнение возобновлено")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                print(f"[poller] Источник недоступен {self.failures} раз подряд, сравнение заморожено")
+            self.opened_at = time.monotonic()
+
+
+class PollScheduler:
+    """Запуск цикла опроса с фиксированной частотой.
+
+    Период не зависит от длительности цикла, к каждому тику добавляется
+    случайный сдвиг, при ошибках интервал растет экспоненциально,
+    а вблизи известных границ (старт/окончание рекламы) — сокращается.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        jitter: float = 0.0,
+        backoff_max: float = 300,
+        breaker: CircuitBreaker | None = None,
+        boundary_window: float = 0.0,
+        boundary_interval: float | None = None,
+    ):
+        self.interval = interval
+        self.jitter = jitter
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(threshold=3, cooldown=60)
+        self.boundary_window = boundary_window
+        self.boundary_interval = boundary_interval or interval
+        self.next_boundary: datetime | None = None
+
+    @classmethod
+    def from_settings(cls) -> "PollScheduler":
+        return cls(
+            interval=settings.poll_interval,
+            jitter=settings.poll_jitter,
+            backoff_max=settings.poll_backoff_max,
+            breaker=CircuitBreaker(
+                threshold=settings.poll_breaker_threshold,
+                cooldown=settings.poll_breaker_cooldown,
+            ),
+            boundary_window=settings.poll_boundary_window,
+            boundary_interval=settings.poll_boundary_interval,
+        )
+
+    def next_period(self) -> float:
+        if self.breaker.is_open:
+            return max(self.breaker.remaining(), self.interval)
+        if self.breaker.failures:
+            return min(self.interval * 2 ** self.breaker.failures, self.backoff_max)
+        if self.next_boundary is not None:
+            until = (self.next_boundary - datetime.now(MSK)).total_seconds()
+            if -self.boundary_window <= until <= self.boundary_window:
+                return min(self.boundary_interval, self.interval)
+        return self.interval
+
+    async def run(self, cycle: Callable[[], Awaitable[datetime | None]]):
+        """cycle возвращает ближайшую известную границу или бросает исключение"""
+        anchor = time.monotonic()
+        while True:
+            if self.breaker.allow():
+                started = time.monotonic()
+                try:
+                    self.next_boundary = await cycle()
+                except Exception as e:
+                    metrics.cycle_errors.inc()
+                    self.breaker.record_failure()
+                    print(f"[poller] Ошибка цикла опроса ({self.breaker.failures} подряд): {e!r}")
+                else:
+                    self.breaker.record_success()
+                metrics.cycle_seconds.observe(time.monotonic() - started)
+
+            # Якорь двигается ровно на период, сдвиг к нему не накапливается
+            anchor += self.next_period()
+            now = time.monotonic()
+            if anchor < now:
+                metrics.cycle_overruns.inc()
+                print(f"[poller] Цикл опроса не уложился в период, отставание {now - anchor:.2f}с")
+                anchor = now
+            delay = anchor - now + random.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(max(0.0, delay))
@@ -0,0 +1,55 @@
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from servercatcher.app.notification.records import ServerRecord
+
+
+@dataclass(frozen=True)
+class SourceSnapshot:
+    """Отфильтрованный список серверов источника на момент fetched_at"""
+
+    # Только сервера, у которых дата старта уже наступила, в порядке источника
+    servers: tuple[ServerRecord, ...]
+    fetched_at: datetime
+    # Меняется только при изменении содержимого, по нему кешируется отрисовка
+    version: int
+    # Источник не ответил на последний запрос: это последние успешные данные
+    stale: bool = False
+
+
+class SnapshotCache:
+    """Последний снимок, опубликованный опросом, общий для всех команд"""
+
+    def __init__(self):
+        self._current: SourceSnapshot | None = None
+        self._version = 0
+        # Время последней неудачной загрузки по запросу команды
+        self.failed_at: datetime | None = None
+
+    @property
+    def current(self) -> SourceSnapshot | None:
+        return self._current
+
+    def publish(self, servers: list[ServerRecord], fetched_at: datetime) -> SourceSnapshot:
+        self._version += 1
+        self.failed_at = None
+        self._current = SourceSnapshot(
+            servers=tuple(servers), fetched_at=fetched_at, version=self._version
+        )
+        return self._current
+
+    def touch(self, fetched_at: datetime) -> None:
+        """Источник не изменился: обновляем только время проверки"""
+        self.failed_at = None
+        if self._current is not None:
+            self._current = replace(self._current, fetched_at=fetched_at, stale=False)
+
+    def fail(self, failed_at: datetime) -> SourceSnapshot | None:
+        """Источник не ответил: запоминаем время, последний снимок помечается устаревшим"""
+        self.failed_at = failed_at
+        if self._current is not None and not self._current.stale:
+            self._current = replace(self._current, stale=True)
+        return self._current
+
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+
+import aiohttp
+
+from servercatcher.app.notification.archive import PayloadArchive
+from servercatcher.app.notification.records import MSK, ParsedSnapshot, SnapshotBuilder
+from servercatcher.app.notification.streaming import ServersStreamParser, StreamFormatError
+from servercatcher.core import metrics
+from servercatcher.core.config import settings
+
+FETCH_TIMEOUT = 10
+POOL_LIMIT = 10
+KEEPALIVE_TIMEOUT = 60
+CHUNK_SIZE = 64 * 1024
+
+
+class SourceLimitError(Exception):
+    """Ответ источника превысил допустимый размер или число записей"""
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    # Записи разбираются один раз — при получении нового тела
+    snapshot: ParsedSnapshot
+    # sha256 тела ответа, по нему опрос понимает, что список не менялся
+    digest: str
+
+
+@dataclass(frozen=True)
+class MergedFetch:
+    """Объединенный список всех источников без дублей IP"""
+
+    # У каждой записи заполнен source — имя источника, откуда она взята
+    snapshot: ParsedSnapshot
+    digest: str
+    # Источники, по которым нет ни свежих, ни прошлых данных
+    failed: frozenset[str]
+
+
+def merge_fetches(
+    parts: list[tuple[str, FetchResult]], failed: set[str], previous: MergedFetch | None = None
+) -> MergedFetch:
+    """Сводит ответы источников в один список. Если ни один хеш не
+    изменился, возвращает previous без повторной сборки"""
+    digest = hashlib.sha256(
+        "|".join(f"{name}:{result.digest}" for name, result in parts).encode()
+        + "|".join(sorted(failed)).encode()
+    ).hexdigest()
+    if previous is not None and previous.digest == digest:
+        return previous
+
+    # Первый источник в порядке настроек выигрывает при совпадении IP
+    if len(parts) == 1:
+        snapshot = parts[0][1].snapshot
+    else:
+        snapshot = ParsedSnapshot(
+            record for _, result in parts for record in result.snapshot.records
+        )
+    return MergedFetch(snapshot=snapshot, digest=digest, failed=frozenset(failed))
+
+
+class HttpPool:
+    """Общий пул соединений для всех запросов к источникам"""
+
+    def __init__(self, timeout: float = FETCH_TIMEOUT):
+        self.timeout = timeout
+        self._session: aiohttp.ClientSession | None = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=POOL_LIMIT,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class SourceClient:
+    """Клиент одного источника со списком серверов.
+
+    Делает условные GET по ETag/Last-Modified, если источник их отдает,
+    и помнит последний успешный ответ.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        pool: HttpPool,
+        max_bytes: int | None = None,
+        max_entries: int | None = None,
+        archive: PayloadArchive | None = None,
+    ):
+        self.name = name
+        self.url = url
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.archive = archive
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.last: FetchResult | None = None
+
+    async def fetch(self) -> FetchResult:
+        # no-cache не отключает кеш, а требует ревалидации — вместе с валидаторами это дает 304
+        headers = {"Cache-Control": "no-cache"}
+        if self.last is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        with metrics.source_fetch_seconds.time(source=self.name):
+            async with self.pool.get_session().get(self.url, headers=headers) as resp:
+                if resp.status == 304 and self.last is not None:
+                    metrics.source_not_modified.inc(source=self.name)
+                    return self.last
+                resp.raise_for_status()
+                if (
+                    self.max_bytes is not None
+                    and resp.content_length is not None
+                    and resp.content_length > self.max_bytes
+                ):
+                    raise SourceLimitError(
+                        f"{self.name}: Content-Length {resp.content_length} больше {self.max_bytes}"
+                    )
+                digest, builder = await self._read(resp)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+
+        # Валидаторы запоминаем только для полностью разобранного ответа
+        self.etag = etag
+        self.last_modified = last_modified
+        if self.last is not None and self.last.digest == digest:
+            metrics.source_not_modified.inc(source=self.name)
+            return self.last
+
+        snapshot = builder.build()
+        if snapshot.skipped:
+            print(f"[source] {self.name}: пропущено записей без IP: {snapshot.skipped}")
+        self.last = FetchResult(snapshot=snapshot, digest=digest)
+        return self.last
+
+    async def _read(self, resp: aiohttp.ClientResponse) -> tuple[str, SnapshotBuilder]:
+        """Читает тело кусками: хеширует, разбирает и собирает записи на лету.
+
+        При превышении лимитов бросает SourceLimitError: прошлый снимок
+        остается в силе, а частично прочитанный список отбрасывается.
+        """
+        hasher = hashlib.sha256()
+        parser = ServersStreamParser()
+        builder = SnapshotBuilder(self.name, previous=self.last.snapshot if self.last else None)
+        size = 0
+        # Хеш известен только в конце, поэтому тело для архива копится рядом
+        spool = self.archive.spool() if self.archive is not None else None
+
+        def add_items(items: list) -> None:
+            for item in items:
+                builder.add(item)
+            if self.max_entries is not None and len(builder) > self.max_entries:
+                raise SourceLimitError(f"{self.name}: записей больше {self.max_entries}")
+
+        try:
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if self.max_bytes is not None and size > self.max_bytes:
+                    raise SourceLimitError(f"{self.name}: ответ больше {self.max_bytes} байт")
+                hasher.update(chunk)
+                if spool is not None:
+                    spool.write(chunk)
+                add_items(parser.feed(chunk))
+            add_items(parser.close())
+            if not parser.found:
+                # Без списка нельзя отличить сбой источника от удаления всех серверов
+                raise StreamFormatError(f"{self.name}: в ответе нет поля servers")
+        except BaseException:
+            if spool is not None:
+                spool.close()
+            raise
+
+        metrics.source_payload_bytes.observe(size, source=self.name)
+        digest = hasher.hexdigest()
+        if spool is not None:
+            try:
+                await self.archive.store(digest, spool, self.name)
+            except OSError as e:
+                # Архив вспомогательный: без места на диске опрос продолжается
+                print(f"[archive] {self.name}: не удалось сохранить ответ: {e}")
+        return digest, builder
+
+
+class SourceSet:
+    """Все настроенные источники, опрашиваемые параллельно"""
+
+    def __init__(
+        self,
+        sources: dict[str, str],
+        timeout: float = FETCH_TIMEOUT,
+        max_bytes: int | None = None,
+        max_entries: int | None = None,
+        archive: PayloadArchive | None = None,
+    ):
+        self.pool = HttpPool(timeout)
+        self.archive = archive
+        self.clients = [
+            SourceClient(name, url, self.pool, max_bytes, max_entries, archive)
+            for name, url in sources.items()
+        ]
+        self.last: MergedFetch | None = None
+
+    async def fetch(self) -> MergedFetch:
+        """Загружает источники параллельно. Упавший источник не задерживает
+        остальные: вместо него берутся его последние успешные данные.
+        Если не ответил ни один источник — бросает исключение."""
+        results = await asyncio.gather(
+            *(client.fetch() for client in self.clients), return_exceptions=True
+        )
+
+        parts: list[tuple[str, FetchResult]] = []
+        failed = set()
+        errors = []
+        errored = []
+        for client, result in zip(self.clients, results):
+            if isinstance(result, BaseException):
+                errors.append(result)
+                errored.append(client.name)
+                metrics.source_fetch_errors.inc(source=client.name)
+                print(f"[source] {client.name}: ошибка загрузки: {type(result).__name__}: {result}")
+                result = client.last
+            if result is None:
+                failed.add(client.name)
+                continue
+            parts.append((client.name, result))
+
+        if len(errors) == len(self.clients):
+            raise errors[0]
+
+        if self.archive is not None:
+            self._observe(parts, errored)
+        self.last = merge_fetches(parts, failed, self.last)
+        return self.last
+
+    def _observe(self, parts: list[tuple[str, FetchResult]], errored: list[str]) -> None:
+        digests: dict[str, str | None] = {client.name: None for client in self.clients}
+        digests.update((name, result.digest) for name, result in parts)
+        try:
+            self.archive.observe(datetime.now(MSK), digests, errored)
+        except OSError as e:
+            print(f"[archive] не удалось записать журнал: {e}")
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+_sources: SourceSet | None = None
+
+
+def get_sources() -> SourceSet:
+    """Источники из настроек, создаются при первом опросе"""
+    global _sources
+    if _sources is None:
+        _sources = SourceSet(
+            settings.sources,
+            max_bytes=settings.source_max_bytes,
+            max_entries=settings.source_max_entries,
+            archive=PayloadArchive(settings.archive_dir) if settings.archive_dir else None,
+        )
+    return _sources
+
+
+async def close_sources() -> None:
+    if _sources is not None:
+        await _sources.close()
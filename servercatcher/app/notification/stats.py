@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.notification.crud import (
+    load_stats,
+    insert_stats,
+    update_stats,
+    load_closed_history,
+    load_rollups,
+    delete_history,
+)
+from servercatcher.app.notification.leader import fence
+from servercatcher.app.notification.records import MSK, as_msk
+from servercatcher.core.models import db_helper
+
+ROLLUP_BATCH_SIZE = 1000
+
+
+def empty_stats(ip: str) -> dict:
+    return {
+        "ip_adress": ip,
+        "placements": 0,
+        "total_seconds": 0.0,
+        "first_seen": None,
+        "last_seen": None,
+        "current_start": None,
+        "is_active": False,
+        "rank_key": 0.0,
+    }
+
+
+def apply_placement(row: dict, op: str, at: datetime) -> None:
+    """Применяет открытие или закрытие размещения к строке server_stats"""
+    at = as_msk(at)
+    first_seen = as_msk(row["first_seen"])
+    last_seen = as_msk(row["last_seen"])
+    if first_seen is None or at < first_seen:
+        row["first_seen"] = at
+    if last_seen is None or at > last_seen:
+        row["last_seen"] = at
+
+    if op == "open":
+        if row["is_active"]:
+            # Повторное открытие без закрытия: текущее размещение продолжается
+            return
+        # Источник может вернуть старую дату старта: время до прошлого
+        # закрытия уже учтено в total_seconds
+        if last_seen is not None and at < last_seen:
+            at = last_seen
+        row["placements"] += 1
+        row["is_active"] = True
+        row["current_start"] = at
+        row["rank_key"] = row["total_seconds"] - at.timestamp()
+    elif row["is_active"]:
+        start = as_msk(row["current_start"])
+        row["total_seconds"] += max(0.0, (at - start).total_seconds())
+        row["is_active"] = False
+        row["current_start"] = None
+        row["rank_key"] = row["total_seconds"]
+
+
+def stats_totals(row, now: datetime) -> tuple[float, float]:
+    """(общее время размещения, длительность текущего размещения) в секундах"""
+    streak = 0.0
+    if row.is_active and row.current_start is not None:
+        streak = max(0.0, (now - as_msk(row.current_start)).total_seconds())
+    return row.total_seconds + streak, streak
+
+
+async def record_placements(
+    session: AsyncSession, placements: list[tuple[str, str, datetime]]
+) -> None:
+    """Переносит открытия/закрытия цикла в server_stats тремя запросами"""
+    if not placements:
+        return
+    existing = await load_stats(session, {ip for _, ip, _ in placements})
+    created: dict[str, dict] = {}
+    touched: set[str] = set()
+    for op, ip, at in placements:
+        row = existing.get(ip)
+        if row is None:
+            row = created.get(ip)
+            if row is None:
+                row = created[ip] = empty_stats(ip)
+        else:
+            touched.add(ip)
+        apply_placement(row, op, at)
+
+    await insert_stats(session, list(created.values()))
+    await update_stats(session, [existing[ip] for ip in touched])
+
+
+async def rollup_history(session: AsyncSession, before: datetime, limit: int = ROLLUP_BATCH_SIZE) -> int:
+    """Сворачивает до limit закрытых периодов старше before в счетчики
+    server_stats и удаляет их из истории. Возвращает число периодов"""
+    rows = await load_closed_history(session, before, limit)
+    if not rows:
+        return 0
+
+    rollups = await load_rollups(session, {row.server_ip for row in rows})
+    created: dict[str, dict] = {}
+    for row in rows:
+        rollup = rollups.get(row.server_ip)
+        if rollup is None:
+            # Периода нет в сводке (история старше server_stats) — учитываем его и там
+            rollup = created.get(row.server_ip)
+            if rollup is None:
+                rollup = created[row.server_ip] = {
+                    **empty_stats(row.server_ip),
+                    "rolled_placements": 0,
+                    "rolled_seconds": 0.0,
+                    "rolled_until": None,
+                }
+            if row.start is not None:
+                apply_placement(rollup, "open", row.start)
+            apply_placement(rollup, "close", row.end)
+
+        end = as_msk(row.end)
+        rollup["rolled_placements"] += 1
+        if row.start is not None:
+            rollup["rolled_seconds"] += max(0.0, (end - as_msk(row.start)).total_seconds())
+        rolled_until = as_msk(rollup["rolled_until"])
+        if rolled_until is None or end > rolled_until:
+            rollup["rolled_until"] = end
+
+    await insert_stats(session, list(created.values()))
+    await update_stats(session, list(rollups.values()))
+    await delete_history(session, [row.id for row in rows])
+    return len(rows)
+
+
+async def rollup_expired_history(retention_days: float) -> int:
+    """Сворачивает всю историю старше retention_days, возвращает число периодов"""
+    total = 0
+    before = datetime.now(MSK) - timedelta(days=retention_days)
+    while True:
+        # Каждая пачка — своя короткая транзакция, чтобы не держать блокировку
+        async with db_helper.session_factory() as session:
+            rolled = await rollup_history(session, before)
+            await fence(session)
+            await session.commit()
+        total += rolled
+        if rolled < ROLLUP_BATCH_SIZE:
+            return total
+
+
+async def run_history_retention(retention_days: float, interval: float):
+    """Периодически сворачивает историю старше retention_days"""
+    while True:
+        try:
+            total = await rollup_expired_history(retention_days)
+            if total:
+                print(f"[history] Свернуто периодов старше {retention_days} дн.: {total}")
+        except Exception as e:
+            print(f"[history] Ошибка сворачивания истории: {e}")
+        await asyncio.sleep(interval)
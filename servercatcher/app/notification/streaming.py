@@ -0,0 +1,229 @@
+import codecs
+import json
+import re
+
+WHITESPACE = " \t\n\r"
+# Конец скаляра (числа, true/false/null) виден только по следующему символу
+SCALAR_END = re.compile(r"[ \t\n\r,\]}]")
+# Внутри строки значимы только кавычка и экранирование, вне — кавычка и скобки
+STRING_SPECIAL = re.compile(r'["\\]')
+STRUCTURE = re.compile(r'["{}\[\]]')
+
+
+class StreamFormatError(ValueError):
+    """Тело источника не похоже на {"servers": [...]}"""
+
+
+class ServersStreamParser:
+    """Инкрементальный разбор ответа вида {"servers": [{...}, ...], ...}.
+
+    Куски тела подаются в feed() по мере чтения, элементы массива servers
+    возвращаются сразу, как только получен их конец. В памяти держится
+    только еще не разобранный хвост, а не весь ответ.
+    """
+
+    def __init__(self, key: str = "servers"):
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._current_key: str | None = None
+        # Сколько уже просмотрено незаконченного элемента: хвост не сканируется заново
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self.found = False
+
+    def feed(self, data: bytes) -> list:
+        self._buf += self._utf8.decode(data)
+        return self._parse(eof=False)
+
+    def close(self) -> list:
+        """Конец тела: все должно быть разобрано"""
+        self._buf += self._utf8.decode(b"", final=True)
+        items = self._parse(eof=True)
+        if self._state != "done":
+            raise StreamFormatError(f"Ответ источника оборвался (состояние {self._state})")
+        return items
+
+    def _skip(self, chars: str) -> bool:
+        """Пропускает символы chars, False — если буфер кончился"""
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+        self._pos = pos
+        return pos < len(buf)
+
+    def _element_end(self, eof: bool) -> int | None:
+        """Конец JSON-элемента с текущей позиции или None, если он еще не пришел.
+
+        Строки и вложенность отслеживаются по мере поступления данных, поэтому
+        каждый символ просматривается один раз, сколько бы кусков ни занял элемент.
+        """
+        buf, size = self._buf, len(self._buf)
+        i = self._pos + self._scanned
+        if buf[self._pos] not in '"{[':
+            match = SCALAR_END.search(buf, i)
+            if match is not None:
+                return self._element_done(match.start())
+            if eof:
+                return self._element_done(size)
+            self._scanned = size - self._pos
+            return None
+
+        depth, in_string = self._depth, self._in_string
+        while i < size:
+            if in_string:
+                match = STRING_SPECIAL.search(buf, i)
+                if match is None:
+                    i = size
+                    break
+                if match.group() == "\\":
+                    if match.end() == size:
+                        # Экранируемый символ еще не пришел: дочитаем escape со следующим куском
+                        i = match.start()
+                        break
+                    i = match.end() + 1
+                    continue
+                in_string = False
+                i = match.end()
+                if depth == 0:
+                    return self._element_done(i)
+                continue
+            match = STRUCTURE.search(buf, i)
+            if match is None:
+                i = size
+                break
+            i = match.end()
+            char = match.group()
+            if char == '"':
+                in_string = True
+            elif char in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return self._element_done(i)
+        if eof:
+            raise StreamFormatError("Ответ источника оборвался посреди элемента")
+        self._scanned = i - self._pos
+        self._depth, self._in_string = depth, in_string
+        return None
+
+    def _element_done(self, end: int) -> int:
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        return end
+
+    def _decode(self, eof: bool):
+        """Один JSON-элемент с текущей позиции или None, если данных мало"""
+        end = self._element_end(eof)
+        if end is None:
+            return None
+        # Элемент получен целиком: raw_decode вызывается для него ровно один раз
+        try:
+            value, decoded_end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            raise StreamFormatError("Некорректный JSON в ответе источника")
+        if decoded_end != end:
+            raise StreamFormatError("Некорректный JSON в ответе источника")
+        return value, end
+
+    def _parse(self, eof: bool) -> list:
+        items = []
+        while True:
+            if self._state == "start":
+                if not self._skip(WHITESPACE):
+                    break
+                if self._buf[self._pos] != "{":
+                    raise StreamFormatError("Ответ источника должен быть JSON-объектом")
+                self._pos += 1
+                self._state = "first_key"
+
+            elif self._state in ("first_key", "key"):
+                if not self._skip(WHITESPACE):
+                    break
+                # "}" допустима только сразу после "{": запятая перед ней — ошибка
+                if self._state == "first_key" and self._buf[self._pos] == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                if self._buf[self._pos] != '"':
+                    raise StreamFormatError("Ожидался ключ объекта")
+                decoded = self._decode(eof)
+                if decoded is None:
+                    break
+                self._current_key, self._pos = decoded
+                self._state = "colon"
+
+            elif self._state == "colon":
+                if not self._skip(WHITESPACE):
+                    break
+                if self._buf[self._pos] != ":":
+                    raise StreamFormatError("Ожидалось ':' после ключа")
+                self._pos += 1
+                self._state = "value"
+
+            elif self._state == "value":
+                if not self._skip(WHITESPACE):
+                    break
+                if self._current_key == self.key and self._buf[self._pos] == "[":
+                    self.found = True
+                    self._pos += 1
+                    self._state = "first_item"
+                    continue
+                # Остальные поля верхнего уровня не нужны, только пропускаем
+                decoded = self._decode(eof)
+                if decoded is None:
+                    break
+                self._pos = decoded[1]
+                self._state = "after_value"
+
+            elif self._state == "after_value":
+                # После значения — ровно одна запятая или конец объекта
+                if not self._skip(WHITESPACE):
+                    break
+                char = self._buf[self._pos]
+                if char not in ",}":
+                    raise StreamFormatError("Ожидалось ',' или '}' после значения")
+                self._pos += 1
+                self._state = "key" if char == "," else "done"
+
+            elif self._state in ("first_item", "item"):
+                if not self._skip(WHITESPACE):
+                    break
+                if self._state == "first_item" and self._buf[self._pos] == "]":
+                    self._pos += 1
+                    self._state = "after_value"
+                    continue
+                if self._buf[self._pos] in ",]":
+                    raise StreamFormatError("Пропущен элемент массива servers")
+                decoded = self._decode(eof)
+                if decoded is None:
+                    break
+                items.append(decoded[0])
+                self._pos = decoded[1]
+                self._state = "after_item"
+
+            elif self._state == "after_item":
+                if not self._skip(WHITESPACE):
+                    break
+                char = self._buf[self._pos]
+                if char not in ",]":
+                    raise StreamFormatError("Ожидалось ',' или ']' после элемента")
+                self._pos += 1
+                self._state = "item" if char == "," else "after_value"
+
+            elif self._state == "done":
+                if self._skip(WHITESPACE):
+                    raise StreamFormatError("Лишние данные после JSON-объекта")
+                break
+
+        # Разобранное начало отрезаем: в буфере остается только незаконченный элемент
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        return items
@@ -0,0 +1,164 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.notification.crud import (
+    get_all_chats,
+    get_digest_chats,
+    get_subscription_filters,
+)
+from servercatcher.app.notification.filters import FilterIndex, ServerEvent
+from servercatcher.core import metrics
+from servercatcher.core.models import db_helper
+
+
+class SubscriberRegistry:
+    """Список чатов для рассылки в памяти процесса.
+
+    Загружается из БД один раз при старте, дальше поддерживается
+    обработчиками /start и my_chat_member и ошибками отправки.
+    """
+
+    def __init__(self):
+        self._chats: set[int] = set()
+        # Подмножество _chats, получающее сводку за цикл
+        self._digest: set[int] = set()
+        # chat_id -> {(kind, value)}; чата без фильтров здесь нет
+        self._filters: dict[int, set[tuple[str, str]]] = {}
+        self._snapshot: frozenset[int] | None = frozenset()
+        self._groups: tuple[frozenset[int], frozenset[int]] | None = None
+        self._index: FilterIndex | None = None
+        self.loaded = False
+
+    async def load(self, session: AsyncSession) -> None:
+        self._chats = set(await get_all_chats(session))
+        self._digest = set(await get_digest_chats(session)) & self._chats
+        self._filters = {}
+        for chat_id, kind, value in await get_subscription_filters(session):
+            self._filters.setdefault(chat_id, set()).add((kind, value))
+        self._invalidate()
+        self._index = None
+        self.loaded = True
+        print(f"[subscribers] Загружено подписчиков: {len(self._chats)}, с фильтрами: {len(self._filters)}")
+
+    def _invalidate(self) -> None:
+        self._snapshot = None
+        self._groups = None
+
+    def add(self, chat_id: int) -> None:
+        if chat_id not in self._chats:
+            self._chats.add(chat_id)
+            self._invalidate()
+
+    def discard(self, chat_id: int) -> None:
+        if chat_id in self._chats:
+            self._chats.discard(chat_id)
+            self._digest.discard(chat_id)
+            self._invalidate()
+
+    def migrate(self, old_chat_id: int, new_chat_id: int) -> None:
+        """Группа стала супергруппой: подписка, сводка и фильтры переходят на новый id"""
+        if old_chat_id in self._chats:
+            self._chats.discard(old_chat_id)
+            self._chats.add(new_chat_id)
+        if old_chat_id in self._digest:
+            self._digest.discard(old_chat_id)
+            self._digest.add(new_chat_id)
+        filters = self._filters.pop(old_chat_id, None)
+        if filters:
+            self._filters.setdefault(new_chat_id, set()).update(filters)
+            self._index = None
+        self._invalidate()
+
+    def set_digest(self, chat_id: int, enabled: bool) -> None:
+        if enabled and chat_id in self._chats:
+            self._digest.add(chat_id)
+        else:
+            self._digest.discard(chat_id)
+        self._invalidate()
+
+    def set_filters(self, chat_id: int, filters: set[tuple[str, str]]) -> None:
+        if filters:
+            self._filters[chat_id] = set(filters)
+        else:
+            self._filters.pop(chat_id, None)
+        # Индекс пересобирается при следующей рассылке, а не на каждую команду
+        self._index = None
+
+    def filter_index(self) -> FilterIndex:
+        if self._index is None:
+            self._index = FilterIndex(
+                (chat_id, kind, value)
+                for chat_id, filters in self._filters.items()
+                for kind, value in filters
+            )
+        return self._index
+
+    def chats(self) -> frozenset[int]:
+        # Неизменяемый снимок: рассылка может идти, пока список меняется.
+        # Пересобирается только после изменений, между ними чтение O(1)
+        if self._snapshot is None:
+            self._snapshot = frozenset(self._chats)
+        return self._snapshot
+
+    def delivery_groups(self) -> tuple[frozenset[int], frozenset[int]]:
+        """(чаты с отдельными сообщениями, чаты со сводкой)"""
+        if self._groups is None:
+            digest = frozenset(self._digest)
+            self._groups = (self.chats() - digest, digest)
+        return self._groups
+
+    def route(
+        self, events: list[ServerEvent]
+    ) -> tuple[list[tuple[ServerEvent, frozenset[int]]], list[tuple[frozenset[int], list[ServerEvent]]]]:
+        """Получатели событий цикла с учетом фильтров.
+
+        Возвращает (событие, чаты с отдельными сообщениями) и
+        (чаты со сводкой, события для их сводки) — чаты с одинаковым
+        набором событий получают одну и ту же сводку.
+        """
+        per_event_chats, digest_chats = self.delivery_groups()
+        index = self.filter_index()
+        if not index.filtered:
+            return (
+                [(event, per_event_chats) for event in events],
+                [(digest_chats, list(events))] if digest_chats else [],
+            )
+
+        plain = per_event_chats - index.filtered
+        plain_digest = digest_chats - index.filtered
+        routed = []
+        digest_events: dict[int, list[int]] = {}
+        for i, event in enumerate(events):
+            matched = index.matching(event)
+            routed.append((event, plain | (matched & per_event_chats)))
+            for chat_id in matched & digest_chats:
+                digest_events.setdefault(chat_id, []).append(i)
+
+        digest_groups: dict[tuple[int, ...], set[int]] = {}
+        if plain_digest:
+            digest_groups[tuple(range(len(events)))] = set(plain_digest)
+        for chat_id, indices in digest_events.items():
+            digest_groups.setdefault(tuple(indices), set()).add(chat_id)
+        return routed, [
+            (frozenset(chats), [events[i] for i in indices])
+            for indices, chats in digest_groups.items()
+        ]
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+
+subscribers = SubscriberRegistry()
+metrics.subscribers_count.set_function(lambda: len(subscribers))
+
+
+async def run_subscriber_refresh(interval: float):
+    """Периодически перечитывает подписчиков: /start мог прийти на другую реплику"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with db_helper.session_factory() as session:
+                await subscribers.load(session)
+        except Exception as e:
+            print(f"[subscribers] Ошибка обновления списка: {e}")
@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import tuple_
 from sqlalchemy.future import select
 from datetime import datetime, timezone, timedelta
-from servercatcher.core.models.server import Server
+from servercatcher.core.models.server import Server, ServerHistory, ServerStats
 
 MSK = timezone(timedelta(hours=3))
 
@@ -16,4 +17,80 @@ async def get_active_servers(session: AsyncSession) -> list[Server]:
 
 async def get_all_servers(session: AsyncSession):
     result = await session.execute(select(Server).order_by(Server.start))
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
+
+HISTORY_PAGE_SIZE = 15
+
+
+def history_page_query(ip: str, cursor: int | None, forward: bool, limit: int):
+    """Периоды IP после/до курсора по ключу (start, id).
+
+    Ключ совпадает с индексом (server_ip, start, id): страница читается
+    диапазоном индекса, без сортировки всей истории IP.
+    """
+    h = ServerHistory
+    query = select(h.id, h.start, h.end).where(h.server_ip == ip)
+
+    if cursor is not None:
+        anchor = tuple_(
+            select(h.start).where(h.id == cursor).scalar_subquery(), cursor
+        )
+        key = tuple_(h.start, h.id)
+        query = query.where(key > anchor if forward else key < anchor)
+
+    if forward:
+        query = query.order_by(h.start, h.id)
+    else:
+        query = query.order_by(h.start.desc(), h.id.desc())
+    return query.limit(limit + 1)
+
+
+async def get_history_page(
+    session: AsyncSession,
+    ip: str,
+    cursor: int | None = None,
+    forward: bool = True,
+    limit: int = HISTORY_PAGE_SIZE,
+):
+    """Страница истории по ключу (start, id) после/до курсора.
+
+    Возвращает строки в хронологическом порядке и признак,
+    что в направлении листания есть еще записи.
+    """
+    result = await session.execute(history_page_query(ip, cursor, forward, limit))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+    return rows, has_more
+
+
+TOP_SIZE = 10
+
+
+async def get_server_stats(session: AsyncSession, ip: str) -> ServerStats | None:
+    result = await session.execute(select(ServerStats).where(ServerStats.ip_adress == ip))
+    return result.scalars().first()
+
+
+async def get_top_servers(session: AsyncSession, now: datetime, limit: int = TOP_SIZE) -> list[ServerStats]:
+    """IP с наибольшим общим временем размещения.
+
+    Два чтения по индексу (is_active, rank_key): у неактивных итог равен
+    rank_key, у активных rank_key + now. Лучшие limit из каждой группы
+    сливаются, поэтому время не зависит от размера таблицы.
+    """
+    candidates = []
+    for active in (True, False):
+        result = await session.execute(
+            select(ServerStats)
+            .where(ServerStats.is_active == active)
+            .order_by(ServerStats.rank_key.desc())
+            .limit(limit)
+        )
+        candidates.extend(result.scalars().all())
+
+    now_ts = now.timestamp()
+    candidates.sort(key=lambda row: row.rank_key + now_ts if row.is_active else row.rank_key, reverse=True)
+    return candidates[:limit]
@@ -1,53 +1,113 @@
+import html
+
 from aiogram import Router
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import datetime, timezone, timedelta
 from servercatcher.core.models import db_helper
-from servercatcher.core.models.server import ServerHistory
-from sqlalchemy import select
-from servercatcher.app.server.crud import get_active_servers, get_all_servers
-from servercatcher.app.notification.handler import fetch_servers_from_link
+from servercatcher.app.server.crud import (
+    get_active_servers,
+    get_all_servers,
+    get_history_page,
+    get_server_stats,
+    get_top_servers,
+)
+from servercatcher.app.notification.stats import stats_totals
+from servercatcher.app.notification.handler import get_snapshot
+from servercatcher.app.notification.records import as_msk
+from servercatcher.app.notification.snapshot import SourceSnapshot
 
 MSK = timezone(timedelta(hours=3))
 router = Router()
 
+# Отрисованный список серверов для версии снимка
+_main_body_cache: dict[int, str] = {}
+
+
+def render_server_list(snapshot: SourceSnapshot) -> str:
+    body = _main_body_cache.get(snapshot.version)
+    if body is None:
+        body = "\n".join(
+            f"<b>{idx+1}</b>. {record.ip}" for idx, record in enumerate(snapshot.servers)
+        )
+        _main_body_cache.clear()
+        _main_body_cache[snapshot.version] = body
+    return body
+
+
 @router.message(Command("main"))
 async def cmd_main(message: Message):
-    servers_data = await fetch_servers_from_link()
-    now_dt = datetime.now(MSK)
-    now = now_dt.strftime("%d.%m.%Y %H:%M:%S")
-
-    # Оставляем только те, у которых ip не пустой и дата старта уже наступила
-    filtered_servers = []
-    for srv in servers_data:
-        ip = srv.get('ip')
-        if not ip:
-            continue
-        start_str = srv.get('start') or None
-        if start_str:
-            try:
-                start_dt = datetime.strptime(start_str, "%d/%m/%Y").replace(tzinfo=MSK)
-            except Exception:
-                start_dt = now_dt
-        else:
-            start_dt = now_dt
-        if start_dt <= now_dt:
-            filtered_servers.append(srv)
+    snapshot = await get_snapshot()
 
-    if not filtered_servers:
+    if snapshot is None or not snapshot.servers:
+        now = (snapshot.fetched_at if snapshot else datetime.now(MSK)).strftime("%d.%m.%Y %H:%M:%S")
         await message.answer(f"Сейчас нет активных серверов.\nОтчет сформирован: {now}")
         return
 
-    ip_list = "\n".join(f"<b>{idx+1}</b>. {srv.get('ip')}" for idx, srv in enumerate(filtered_servers))
+    ip_list = render_server_list(snapshot)
+    now = snapshot.fetched_at.strftime("%d.%m.%Y %H:%M:%S")
     text = f"""
 📌Рекламируемые серверы на главной:
 {ip_list}
 
 ⏰Отчет сформирован: <b>{now} МСК</b>"""
+    if snapshot.stale:
+        text += "\n⚠️ Источник сейчас недоступен, показан последний полученный список."
 
     await message.answer(text, parse_mode="HTML")
 
 
+class HistoryPage(CallbackData, prefix="hist", sep="|"):
+    ip: str
+    cursor: int
+    forward: bool
+
+
+def format_days(seconds: float) -> str:
+    return f"{seconds / 86400:.1f}"
+
+
+def render_history_page(ip: str, rows, stats=None) -> str:
+    """stats передается для первой страницы: свернутые по сроку хранения
+    периоды показываются одной строкой перед остальными"""
+    lines = [f"📜История для IP {ip}:"]
+    if stats is not None and stats.rolled_placements:
+        lines.append(
+            f"🗄 До {as_msk(stats.rolled_until).strftime('%d.%m.%Y')}: "
+            f"размещений {stats.rolled_placements}, {format_days(stats.rolled_seconds)} дн."
+        )
+    for rec in rows:
+        start_dt = as_msk(rec.start)
+        end_dt = as_msk(rec.end)
+        if start_dt == end_dt:
+            # Старая запись об удалении без пары: начало неизвестно
+            start_dt = None
+        if start_dt is not None:
+            lines.append(f"➕Добавлен: {start_dt.strftime('%d.%m.%Y')}")
+        if end_dt is not None and start_dt is not None:
+            days_active = abs((end_dt - start_dt).days)
+            lines.append(f"➖ Удален: {end_dt.strftime('%d.%m.%Y')} (размещен {days_active} дней)")
+        elif end_dt is not None:
+            lines.append(f"➖ Удален: {end_dt.strftime('%d.%m.%Y')}")
+    return "\n".join(lines)
+
+
+def history_keyboard(ip: str, rows, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=HistoryPage(ip=ip, cursor=rows[0].id, forward=False).pack(),
+        ))
+    if has_next:
+        buttons.append(InlineKeyboardButton(
+            text="Вперед ➡️",
+            callback_data=HistoryPage(ip=ip, cursor=rows[-1].id, forward=True).pack(),
+        ))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+
 @router.message(Command("history"))
 async def cmd_history(message: Message):
     args = message.text.split()
@@ -56,55 +116,89 @@ async def cmd_history(message: Message):
         return
     ip_filter = args[1]
     async with db_helper.session_factory() as session:
-        query = select(ServerHistory).where(ServerHistory.server_ip == ip_filter)
-        result = await session.execute(query)
-        histories = result.scalars().all()
+        rows, has_next = await get_history_page(session, ip_filter)
+        stats = await get_server_stats(session, ip_filter)
 
-    if not histories:
+    if not rows and (stats is None or not stats.rolled_placements):
         await message.answer(f"История для {ip_filter} пуста.")
         return
 
-    # Готовим списки событий и пары добавление-удаление
-    both_records = [h for h in histories if h.start is not None and h.end is not None]
-    start_only = [h for h in histories if h.start is not None and h.end is None]
-    end_only = [h for h in histories if h.start is None and h.end is not None]
-
-    both_records.sort(key=lambda h: (h.start, h.end))
-    start_only.sort(key=lambda h: h.start)
-    end_only.sort(key=lambda h: h.end)
-
-    lines = [f"📜История для IP {ip_filter}:"]
-
-    # Сначала выводим пары, которые уже содержатся в одной записи
-    for rec in both_records:
-        start_dt = rec.start.astimezone(MSK)
-        end_dt = rec.end.astimezone(MSK)
-        days_active = abs((end_dt - start_dt).days)
-        lines.append(f"➕Добавлен: {start_dt.strftime('%d.%m.%Y')}")
-        lines.append(f"➖ Удален: {end_dt.strftime('%d.%m.%Y')} (размещен {days_active} дней)")
-
-    # Затем попарно связываем раздельные start/end записи и чередуем
-    pair_count = min(len(start_only), len(end_only))
-    for i in range(pair_count):
-        s = start_only[i]
-        e = end_only[i]
-        start_dt = s.start.astimezone(MSK)
-        end_dt = e.end.astimezone(MSK)
-        days_active = abs((end_dt - start_dt).days)
-        lines.append(f"➕Добавлен: {start_dt.strftime('%d.%m.%Y')}")
-        lines.append(f"➖ Удален: {end_dt.strftime('%d.%m.%Y')} (размещен {days_active} дней)")
-
-    # Если остались незакрытые добавления — выводим их
-    for s in start_only[pair_count:]:
-        start_dt = s.start.astimezone(MSK)
-        lines.append(f"➕Добавлен: {start_dt.strftime('%d.%m.%Y')}")
-
-    # Если остались удаления без пары — выводим их без длительности
-    for e in end_only[pair_count:]:
-        end_dt = e.end.astimezone(MSK)
-        lines.append(f"➖ Удален: {end_dt.strftime('%d.%m.%Y')}")
-
-    text = "\n".join(lines)
-    chunk_size = 4000
-    for i in range(0, len(text), chunk_size):
-        await message.answer(text[i:i+chunk_size])
\ No newline at end of file
+    try:
+        keyboard = history_keyboard(ip_filter, rows, has_prev=False, has_next=has_next)
+    except ValueError:
+        # IP не помещается в callback_data — показываем только первую страницу
+        keyboard = None
+    await message.answer(render_history_page(ip_filter, rows, stats), reply_markup=keyboard)
+
+
+@router.callback_query(HistoryPage.filter())
+async def on_history_page(callback: CallbackQuery, callback_data: HistoryPage):
+    async with db_helper.session_factory() as session:
+        rows, has_more = await get_history_page(
+            session, callback_data.ip, callback_data.cursor, callback_data.forward
+        )
+        if callback_data.forward:
+            has_prev, has_next = True, has_more
+        else:
+            has_prev, has_next = has_more, True
+        stats = await get_server_stats(session, callback_data.ip) if rows and not has_prev else None
+
+    if not rows:
+        await callback.answer("Больше записей нет.")
+        return
+
+    await callback.message.edit_text(
+        render_history_page(callback_data.ip, rows, stats),
+        reply_markup=history_keyboard(callback_data.ip, rows, has_prev, has_next),
+    )
+    await callback.answer()
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    args = message.text.split()
+    if len(args) == 1:
+        await message.answer("Пожалуйста, укажите IP-адрес после команды.")
+        return
+    ip = args[1]
+    async with db_helper.session_factory() as session:
+        stats = await get_server_stats(session, ip)
+
+    if stats is None:
+        await message.answer(f"Статистика для {ip} пуста.")
+        return
+
+    now = datetime.now(MSK)
+    total, streak = stats_totals(stats, now)
+    last_seen = "сейчас" if stats.is_active else as_msk(stats.last_seen).strftime("%d.%m.%Y %H:%M")
+    lines = [
+        f"📊 Статистика для IP <code>{html.escape(ip)}</code>:",
+        f"🔁 Размещений: <b>{stats.placements}</b>",
+        f"⏳ Всего в рекламе: <b>{format_days(total)}</b> дн.",
+        f"🆕 Впервые: <b>{as_msk(stats.first_seen).strftime('%d.%m.%Y %H:%M')}</b>",
+        f"👁 Последний раз: <b>{last_seen}</b>",
+    ]
+    if stats.is_active:
+        lines.append(f"🔥 Текущее размещение: <b>{format_days(streak)}</b> дн.")
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("top"))
+async def cmd_top(message: Message):
+    now = datetime.now(MSK)
+    async with db_helper.session_factory() as session:
+        top = await get_top_servers(session, now)
+
+    if not top:
+        await message.answer("Статистика пока пуста.")
+        return
+
+    lines = ["🏆 Дольше всех в рекламе:"]
+    for idx, stats in enumerate(top):
+        total, _ = stats_totals(stats, now)
+        mark = " 🟢" if stats.is_active else ""
+        lines.append(
+            f"<b>{idx + 1}</b>. <code>{html.escape(stats.ip_adress)}</code> — {format_days(total)} дн., "
+            f"размещений {stats.placements}{mark}"
+        )
+    await message.answer("\n".join(lines), parse_mode="HTML")
@@ -8,6 +8,12 @@ async def add_user(telegram_id: int, username: str | None, session: AsyncSession
     user = result.scalars().first()
 
     if user:
+        if not user.is_active:
+            # Пользователь вернулся после того, как чат выключили за ошибки доставки
+            user.is_active = True
+            user.send_failures = 0
+            user.deactivated_at = None
+            await session.commit()
         return user
 
     user = User(telegram_id=telegram_id, username=username)
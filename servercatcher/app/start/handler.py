@@ -4,12 +4,11 @@ from aiogram.types import Message, ChatMemberUpdated
 from sqlalchemy import select
 from servercatcher.core.models import db_helper
 from servercatcher.core.models.user import Chat
+from servercatcher.app.notification.subscribers import subscribers
 from .crud import add_user
 
 router = Router()
 
-print(f"[DEBUG] Start router created: {router}")
-
 @router.message(Command("start"))
 async def cmd_start(message: Message):
     print(f"[DEBUG] /start command received from user {message.from_user.id}")
@@ -19,6 +18,7 @@ async def cmd_start(message: Message):
             username=message.from_user.username,
             session=session,
         )
+    subscribers.add(message.from_user.id)
 
     await message.answer("Привет! Я бот для отслеживания серверов.")
 
@@ -42,6 +42,7 @@ async def on_chat_member_update(event: ChatMemberUpdated):
         async with db_helper.session_factory() as session:
             if event.new_chat_member.status in ["member", "administrator"]:
                 # Бот добавлен в группу/канал
+                subscribers.add(chat_id)
                 result = await session.execute(select(Chat).where(Chat.chat_id == chat_id))
                 existing_chat = result.scalars().first()
                 
@@ -55,11 +56,17 @@ async def on_chat_member_update(event: ChatMemberUpdated):
                     session.add(new_chat)
                     await session.commit()
                     print(f"[DEBUG] Бот добавлен в {chat_type}: {title} (ID: {chat_id})")
+                elif not existing_chat.is_active:
+                    existing_chat.is_active = True
+                    existing_chat.send_failures = 0
+                    existing_chat.deactivated_at = None
+                    await session.commit()
                 else:
                     print(f"[DEBUG] Бот уже есть в базе для {chat_type}: {title}")
                     
             elif event.new_chat_member.status in ["left", "kicked"]:
                 # Бот удален из группы/канала
+                subscribers.discard(chat_id)
                 result = await session.execute(select(Chat).where(Chat.chat_id == chat_id))
                 existing_chat = result.scalars().first()
                 
@@ -71,5 +78,3 @@ async def on_chat_member_update(event: ChatMemberUpdated):
                     print(f"[DEBUG] Запись о чате не найдена для удаления: {chat_id}")
     else:
         print(f"[DEBUG] Not a bot update, user ID: {event.new_chat_member.user.id}")
-
-print(f"[DEBUG] Start router handlers registered: {len(router.message.handlers)} message handlers, {len(router.chat_member.handlers)} chat_member handlers")
\ No newline at end of file
@@ -0,0 +1,44 @@
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from servercatcher.app.notification.crud import dialect_insert
+from servercatcher.core.models.subscription import SubscriptionFilter
+
+MAX_FILTERS_PER_CHAT = 50
+
+
+async def get_chat_filters(session: AsyncSession, chat_id: int) -> set[tuple[str, str]]:
+    result = await session.execute(
+        select(SubscriptionFilter.kind, SubscriptionFilter.value).where(
+            SubscriptionFilter.chat_id == chat_id
+        )
+    )
+    return {(kind, value) for kind, value in result}
+
+
+async def add_filter(session: AsyncSession, chat_id: int, kind: str, value: str) -> set[tuple[str, str]] | None:
+    """Добавляет фильтр и возвращает все фильтры чата. None — превышен лимит"""
+    filters = await get_chat_filters(session, chat_id)
+    if (kind, value) in filters:
+        return filters
+    if len(filters) >= MAX_FILTERS_PER_CHAT:
+        return None
+    await session.execute(
+        dialect_insert(session, SubscriptionFilter)
+        .values(chat_id=chat_id, kind=kind, value=value)
+        .on_conflict_do_nothing(index_elements=["chat_id", "kind", "value"])
+    )
+    await session.commit()
+    return filters | {(kind, value)}
+
+
+async def remove_filter(
+    session: AsyncSession, chat_id: int, kind: str | None = None, value: str | None = None
+) -> set[tuple[str, str]]:
+    """Удаляет фильтр (без kind — все фильтры чата), возвращает оставшиеся"""
+    stmt = delete(SubscriptionFilter).where(SubscriptionFilter.chat_id == chat_id)
+    if kind is not None:
+        stmt = stmt.where(SubscriptionFilter.kind == kind, SubscriptionFilter.value == value)
+    await session.execute(stmt)
+    await session.commit()
+    return await get_chat_filters(session, chat_id)
@@ -0,0 +1,97 @@
+import html
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from servercatcher.core.models import db_helper
+from servercatcher.app.notification.filters import FILTER_KINDS, normalize_filter
+from servercatcher.app.notification.subscribers import subscribers
+from .crud import MAX_FILTERS_PER_CHAT, add_filter, get_chat_filters, remove_filter
+
+router = Router()
+
+KIND_TITLES = {
+    "ip": "IP или подсеть",
+    "host": "домен",
+    "keyword": "слово в названии",
+    "event": "тип события",
+}
+
+USAGE = """Фильтры рассылки:
+/subscribe ip 1.2.3.4 или 1.2.3.0/24
+/subscribe host example.net — сам домен и все поддомены
+/subscribe keyword minecraft — слово в названии сервера
+/subscribe event added|removed|expired — только эти события
+/unsubscribe <тип> <значение> — убрать фильтр, /unsubscribe all — убрать все
+
+Без фильтров приходят все события. Фильтры по событию ограничивают типы,
+по IP, домену и слову — сервера: достаточно совпадения с любым из них."""
+
+
+def render_filters(filters: set[tuple[str, str]]) -> str:
+    if not filters:
+        return "🔔 Фильтров нет: приходят все события."
+    lines = ["🔎 Фильтры чата:"]
+    for kind, value in sorted(filters):
+        lines.append(f"• {KIND_TITLES.get(kind, kind)}: <code>{html.escape(value)}</code>")
+    return "\n".join(lines)
+
+
+def usage(error: Exception | None = None) -> str:
+    """Справка для HTML-ответа; в ошибке может быть значение, введенное пользователем"""
+    text = html.escape(USAGE)
+    return f"{html.escape(str(error))}\n\n{text}" if error is not None else text
+
+
+def parse_filter(command: CommandObject) -> tuple[str, str]:
+    """(kind, value) из аргументов команды, ValueError — если они некорректны"""
+    kind, _, value = (command.args or "").strip().partition(" ")
+    kind = kind.lower()
+    if kind not in FILTER_KINDS or not value.strip():
+        raise ValueError("Укажите тип фильтра и значение.")
+    return kind, normalize_filter(kind, value)
+
+
+@router.message(Command("subscribe"))
+async def cmd_subscribe(message: Message, command: CommandObject):
+    chat_id = message.chat.id
+    if not command.args:
+        async with db_helper.session_factory() as session:
+            filters = await get_chat_filters(session, chat_id)
+        await message.answer(f"{render_filters(filters)}\n\n{usage()}", parse_mode="HTML")
+        return
+
+    try:
+        kind, value = parse_filter(command)
+    except ValueError as e:
+        await message.answer(usage(e), parse_mode="HTML")
+        return
+
+    async with db_helper.session_factory() as session:
+        filters = await add_filter(session, chat_id, kind, value)
+    if filters is None:
+        await message.answer(f"Достигнут лимит фильтров чата: {MAX_FILTERS_PER_CHAT}.")
+        return
+
+    subscribers.set_filters(chat_id, filters)
+    await message.answer(render_filters(filters), parse_mode="HTML")
+
+
+@router.message(Command("unsubscribe"))
+async def cmd_unsubscribe(message: Message, command: CommandObject):
+    chat_id = message.chat.id
+    if (command.args or "").strip().lower() == "all":
+        kind = value = None
+    else:
+        try:
+            kind, value = parse_filter(command)
+        except ValueError as e:
+            await message.answer(usage(e), parse_mode="HTML")
+            return
+
+    async with db_helper.session_factory() as session:
+        filters = await remove_filter(session, chat_id, kind, value)
+
+    subscribers.set_filters(chat_id, filters)
+    await message.answer(render_filters(filters), parse_mode="HTML")
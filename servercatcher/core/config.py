@@ -1,27 +1,142 @@
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from pydantic_settings import BaseSettings
+from functools import lru_cache
 from pathlib import Path
-from aiogram import Bot
+from typing import TYPE_CHECKING, Literal
+
 from dotenv import load_dotenv
-import os
+from pydantic import AliasChoices, Field, field_validator, model_validator
+from pydantic_settings import BaseSettings
 
-load_dotenv()
+if TYPE_CHECKING:
+    from aiogram import Bot
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Допустимые значения проверяются при загрузке настроек:
+# sqlite_synchronous подставляется в PRAGMA как есть
+DbProfile = Literal["auto", "sqlite", "server"]
+SqliteSynchronous = Literal["OFF", "NORMAL", "FULL", "EXTRA"]
+BotMode = Literal["polling", "webhook"]
+
 
 class Settings(BaseSettings):
-    db_url: str = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./db.sqlite3")
+    db_url: str = Field(
+        "sqlite+aiosqlite:///./db.sqlite3", validation_alias=AliasChoices("DATABASE_URL", "DB_URL")
+    )
     db_echo: bool = False
+    # Профиль хранилища: "sqlite", "server" (Postgres и т.п.) или "auto" — по db_url
+    db_profile: DbProfile = "auto"
+    # sqlite: WAL, ожидание блокировки вместо "database is locked", кеш и mmap
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: SqliteSynchronous = "NORMAL"
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # server: пул соединений и кеш подготовленных запросов
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 500
+
+    # Нужны только процессам, которые говорят с Telegram: миграциям и CLI — нет
+    TOKEN: str | None = Field(None, validation_alias=AliasChoices("TELEGRAM_TOKEN", "TOKEN"))
+    BOT_USERNAME: str | None = None
+    # Свой сервер Bot API (локальный telegram-bot-api или заглушка бенчмарка)
+    telegram_api_base: str | None = None
+
+    # Получение обновлений: "polling" (по умолчанию) или "webhook"
+    bot_mode: BotMode = "polling"
+    # Публичный адрес, на который Telegram шлет обновления, например https://bot.example.com
+    webhook_base_url: str | None = None
+    webhook_path: str = "/telegram/webhook"
+    # Обязателен в режиме webhook: без него endpoint принял бы поддельные обновления.
+    # Telegram допускает 1-256 символов A-Z, a-z, 0-9, _ и -
+    webhook_secret: str | None = Field(None, pattern=r"^[A-Za-z0-9_-]{1,256}$")
+    web_host: str = "0.0.0.0"
+    web_port: int = 8080
+    # В режиме polling /metrics поднимается отдельным сервером на web_host:web_port
+    metrics_enabled: bool = True
+
+    # Источники списков серверов: имя -> URL (в env — JSON-объект SOURCES)
+    sources: dict[str, str] = {"pastebin": "https://pastebin.com/raw/DnHHkrxx"}
+    # sources: dict[str, str] = {"local": "http://127.0.0.1:8000"}
+    # Ответ больше лимита отбрасывается целиком, в силе остается прошлый список
+    source_max_bytes: int = 32 * 1024 * 1024
+    source_max_entries: int = 200_000
+    # Каталог архива ответов источников (для benchmarks.replay), None — не архивировать
+    archive_dir: str | None = None
+
+    # Опрос источника: базовый период, случайный сдвиг и backoff при ошибках (секунды)
+    poll_interval: float = 3
+    poll_jitter: float = 0.5
+    poll_backoff_max: float = 300
+    # Сколько ошибок подряд размыкают circuit breaker и на сколько
+    poll_breaker_threshold: int = 3
+    poll_breaker_cooldown: float = 60
+    # Около известных дат старта/окончания опрашиваем чаще
+    poll_boundary_window: float = 120
+    poll_boundary_interval: float = 1
+
+    # Telegram id администраторов бота (команда /admin), в env — JSON-список ADMIN_IDS
+    admin_ids: list[int] = []
+    # После стольких рассылок подряд с ошибкой "чат недоступен" чат выключается
+    prune_failure_threshold: int = 3
+
+    # Опрос источника и рассылку ведет только держатель аренды в БД (секунды)
+    leader_lease_ttl: float = 15
+    # Как часто лидер перечитывает подписчиков, добавленных другими репликами
+    subscribers_refresh_interval: float = 60
+    # Закрытые периоды истории старше срока сворачиваются в server_stats, None — хранить все
+    history_retention_days: float | None = None
+    history_retention_interval: float = 3600
+
+    @field_validator("sqlite_synchronous", mode="before")
+    @classmethod
+    def upper_sqlite_synchronous(cls, value):
+        # SQLite принимает режим в любом регистре: normal из env тоже годится
+        return value.upper() if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def check_webhook_secret(self) -> "Settings":
+        if self.bot_mode == "webhook" and not self.webhook_secret:
+            raise ValueError("BOT_MODE=webhook требует WEBHOOK_SECRET")
+        return self
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Настройки читаются из окружения и .env при первом обращении, а не при импорте"""
+    load_dotenv()
+    return Settings()
+
+
+class LazySettings:
+    """Прокси для settings.<поле>: импорт модуля ничего не читает и не проверяет"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
 
-    TOKEN: str = os.environ["TELEGRAM_TOKEN"]
-    BOT_USERNAME: str = os.environ["BOT_USERNAME"]
+settings: Settings = LazySettings()  # type: ignore[assignment]
 
 
-settings = Settings()
+@lru_cache
+def get_bot() -> "Bot":
+    """Бот создается при первом использовании: aiogram импортируется только здесь"""
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.enums import ParseMode
 
-bot = Bot(
-    token=settings.TOKEN,
-    default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
-)
+    config = get_settings()
+    if not config.TOKEN:
+        raise RuntimeError("TELEGRAM_TOKEN не задан")
+    return Bot(
+        token=config.TOKEN,
+        session=(
+            AiohttpSession(api=TelegramAPIServer.from_base(config.telegram_api_base))
+            if config.telegram_api_base
+            else None
+        ),
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
+    )
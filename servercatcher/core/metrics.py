@@ -0,0 +1,240 @@
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from sqlalchemy import event
+
+# Границы гистограмм по умолчанию (секунды), как в prometheus_client
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Значение задается явно или вычисляется функцией в момент выдачи"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> list[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # ключ меток -> (счетчики по корзинам, сумма, количество)
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (text/plain; version=0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+# Источник
+source_fetch_seconds = registry.register(Histogram(
+    "servercatcher_source_fetch_seconds", "Время загрузки источника", ("source",)
+))
+source_payload_bytes = registry.register(Histogram(
+    "servercatcher_source_payload_bytes", "Размер тела ответа источника", ("source",),
+    buckets=SIZE_BUCKETS,
+))
+source_fetch_errors = registry.register(Counter(
+    "servercatcher_source_fetch_errors_total", "Ошибки загрузки источника", ("source",)
+))
+source_not_modified = registry.register(Counter(
+    "servercatcher_source_not_modified_total", "Ответы источника без изменений (304 или тот же хеш)", ("source",)
+))
+archive_payloads_stored = registry.register(Counter(
+    "servercatcher_archive_payloads_stored_total", "Новые тела источника, сохраненные в архив", ("source",)
+))
+
+# Цикл опроса
+cycle_seconds = registry.register(Histogram(
+    "servercatcher_cycle_seconds", "Полное время цикла опроса"
+))
+cycle_phase_seconds = registry.register(Histogram(
+    "servercatcher_cycle_phase_seconds", "Время фаз цикла опроса", ("phase",)
+))
+cycle_overruns = registry.register(Counter(
+    "servercatcher_cycle_overruns_total", "Циклы, не уложившиеся в период опроса"
+))
+cycle_errors = registry.register(Counter(
+    "servercatcher_cycle_errors_total", "Циклы опроса, завершившиеся ошибкой"
+))
+active_servers = registry.register(Gauge(
+    "servercatcher_active_servers", "Активные сервера после последнего цикла"
+))
+
+# База данных
+db_statements = registry.register(Counter(
+    "servercatcher_db_statements_total", "Выполненные SQL-запросы", ("verb",)
+))
+db_statement_seconds = registry.register(Histogram(
+    "servercatcher_db_statement_seconds", "Время выполнения SQL-запросов", ("verb",)
+))
+
+# Рассылка
+send_seconds = registry.register(Histogram(
+    "servercatcher_send_seconds", "Время вызова sendMessage", ("event",)
+))
+send_messages = registry.register(Counter(
+    "servercatcher_send_messages_total", "Результаты отправки сообщений", ("event", "result")
+))
+send_retry_after = registry.register(Counter(
+    "servercatcher_send_retry_after_total", "Ответы 429 (retry_after) от Telegram", ("event",)
+))
+pruned_chats = registry.register(Counter(
+    "servercatcher_pruned_chats_total", "Чаты, выключенные из рассылки после ошибок доставки"
+))
+subscribers_count = registry.register(Gauge(
+    "servercatcher_subscribers", "Чаты в списке рассылки"
+))
+
+
+def instrument_engine(engine) -> None:
+    """Считает запросы и их время через события sync-движка SQLAlchemy"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_statements.inc(verb=verb)
+        db_statement_seconds.observe(time.perf_counter() - started, verb=verb)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+        db_statements.inc(verb="ERROR")
@@ -2,7 +2,14 @@ __all__ = [
     "Base",
     "User",
     "Server",
+    "ServerHistory",
+    "ServerStats",
+    "NotificationOutbox",
     "Chat",
+    "Lease",
+    "SubscriptionFilter",
+    "PollerCheckpoint",
+    "PollerServerState",
     "db_helper",
     "DatabaseHelper",
 ]
@@ -10,4 +17,7 @@ __all__ = [
 from .base import Base
 from .db_helper import DatabaseHelper, db_helper
 from .user import User, Chat
-from .server import Server
+from .server import Server, ServerHistory, ServerStats, NotificationOutbox
+from .lease import Lease
+from .subscription import SubscriptionFilter
+from .poller import PollerCheckpoint, PollerServerState
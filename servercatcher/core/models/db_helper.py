@@ -2,25 +2,128 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     async_scoped_session,
+    AsyncEngine,
     AsyncSession,
 )
 from asyncio import current_task
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url, URL
 from servercatcher.core.config import settings
+from servercatcher.core.metrics import instrument_engine
+
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+
+
+def resolve_profile(url: URL, profile: str) -> str:
+    if profile != "auto":
+        return profile
+    return "sqlite" if url.get_backend_name() == "sqlite" else "server"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Настройки SQLite живут в соединении, поэтому ставятся на каждое новое"""
+    cursor = dbapi_connection.cursor()
+    # WAL: читатели не ждут писателя, /start не блокируется записью цикла опроса
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    # В режиме WAL NORMAL не теряет целостность, а fsync идет только на checkpoint
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    # Отрицательное значение — размер в килобайтах, а не в страницах
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
 
 
 class DatabaseHelper:
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(
-            url=url,
-            echo=echo,
+    """Движок и фабрика сессий. Создаются при первом обращении к engine или
+    session_factory, поэтому импорт моделей не открывает БД и не читает
+    настройки. Без url берется settings.db_url на момент создания"""
+
+    def __init__(self, url: str | None = None, echo: bool | None = None, profile: str | None = None):
+        self._url = url
+        self._echo = echo
+        self._profile = profile
+        self._engine: AsyncEngine | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._create()
+        return self._engine
+
+    @property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        if self._session_factory is None:
+            self._create()
+        return self._session_factory
+
+    @property
+    def profile(self) -> str:
+        return resolve_profile(
+            make_url(self._url or settings.db_url),
+            self._profile if self._profile is not None else settings.db_profile,
         )
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
+
+    def _create(self) -> None:
+        url = make_url(self._url or settings.db_url)
+        echo = self._echo if self._echo is not None else settings.db_echo
+        if self.profile == "sqlite":
+            engine = create_async_engine(url=url, echo=echo)
+            event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+        else:
+            if url.get_driver_name() == "asyncpg":
+                url = url.update_query_dict(
+                    {"prepared_statement_cache_size": str(settings.db_statement_cache_size)}
+                )
+            engine = create_async_engine(
+                url=url,
+                echo=echo,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,
+                # Соединение, порванное сервером или балансировщиком, заменяется до выдачи
+                pool_pre_ping=True,
+                query_cache_size=settings.db_statement_cache_size,
+            )
+        instrument_engine(engine.sync_engine)
+        self._engine = engine
+        self._session_factory = async_sessionmaker(
+            bind=engine,
             expire_on_commit=False,
             autocommit=False,
             autoflush=False,
         )
 
+    async def dispose(self) -> None:
+        """Закрывает пул, если движок уже создан; следующее обращение создаст новый"""
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._session_factory = None
+
+    async def describe(self) -> str:
+        """Фактические настройки хранилища — для проверки при старте"""
+        if self.profile == "sqlite":
+            async with self.engine.connect() as conn:
+                values = [
+                    f"{name}={(await conn.execute(text(f'PRAGMA {name}'))).scalar()}"
+                    for name in SQLITE_PRAGMAS
+                ]
+        else:
+            pool = self.engine.pool
+            values = [
+                f"pool={type(pool).__name__}",
+                f"pool_size={pool.size()}" if hasattr(pool, "size") else "",
+                f"max_overflow={settings.db_max_overflow}",
+                "pre_ping=on",
+                f"statement_cache={settings.db_statement_cache_size}",
+            ]
+        return f"{self.profile} ({self.engine.url.render_as_string(hide_password=True)}): " + ", ".join(
+            v for v in values if v
+        )
+
     def get_scoped_session(self):
         session = async_scoped_session(
             session_factory=self.session_factory,
@@ -40,4 +143,4 @@ class DatabaseHelper:
         await session.close()
 
 
-db_helper = DatabaseHelper(url=settings.db_url, echo=settings.db_echo)
+db_helper = DatabaseHelper()
@@ -0,0 +1,15 @@
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from .base import Base
+
+
+class Lease(Base):
+    __tablename__ = "lease"
+
+    # Имя роли, за которую идет выборы, например 'poller'
+    name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    holder: Mapped[str] = mapped_column(String, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Fencing token: растет при каждой смене держателя, продление его не меняет
+    token: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
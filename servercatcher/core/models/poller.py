@@ -0,0 +1,33 @@
+from sqlalchemy import Date, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date, datetime
+from .base import Base
+
+
+class PollerCheckpoint(Base):
+    """Состояние сравнения после последнего записанного цикла опроса.
+    Пишется в транзакции цикла, так что всегда соответствует данным в БД"""
+
+    __tablename__ = "poller_checkpoint"
+
+    # Имя роли, как в lease: 'poller'
+    name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    # Хеш списка и день по МСК — ключ, по которому цикл без изменений пропускается
+    digest: Mapped[str] = mapped_column(String, nullable=False)
+    cycle_day: Mapped[date] = mapped_column(Date, nullable=False)
+    last_cycle_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    next_boundary: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class PollerServerState(Base):
+    """Даты IP из последнего записанного списка. Цикл переписывает только
+    изменившиеся строки, а не весь список"""
+
+    __tablename__ = "poller_server_state"
+
+    ip_adress: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    # Даты как в источнике (ServerRecord.dates)
+    start_raw: Mapped[str | None] = mapped_column(String, nullable=True)
+    end_raw: Mapped[str | None] = mapped_column(String, nullable=True)
+    # IP был в списке неистекших серверов (PollState.server_ips)
+    listed: Mapped[bool] = mapped_column(default=False, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, String, ForeignKey, Integer
+from sqlalchemy import DateTime, String, ForeignKey, Integer, BigInteger, Float, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone, timedelta
 from .base import Base
@@ -8,7 +8,7 @@ MSK = timezone(timedelta(hours=3))
 class Server(Base):
     __tablename__ = "server"  # <- исправлено
 
-    ip_adress: Mapped[str] = mapped_column(String, nullable=False)  # <- FK требует PK или unique
+    ip_adress: Mapped[str] = mapped_column(String, nullable=False)
     text: Mapped[str] = mapped_column(String, nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
@@ -30,13 +30,100 @@ class Server(Base):
     )
 
     is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
+    # Имя источника из настроек, в котором сервер был найден последним
+    source: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        # FK из server_history требует уникальности ip_adress
+        UniqueConstraint("ip_adress", name="uq_server_ip_adress"),
+    )
+
+
+# Частичный индекс: опрос и /main читают только активные сервера
+Index(
+    "ix_server_active_ip_adress",
+    Server.ip_adress,
+    sqlite_where=Server.is_active == True,
+    postgresql_where=Server.is_active == True,
+)
+
 
 class ServerHistory(Base):
+    """Период размещения IP: строка создается при старте, end
+    заполняется в ней же при окончании (None — размещение идет).
+    start задан всегда: у старых записей об удалении без пары он равен end"""
+
     __tablename__ = "server_history"  # <- исправлено
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     server_ip: Mapped[str] = mapped_column(String, ForeignKey("server.ip_adress"), nullable=False)
-    start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     end: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    source: Mapped[str | None] = mapped_column(String, nullable=True)
 
     server = relationship("Server", backref="history")
+
+    __table_args__ = (
+        # Поиск незакрытого периода фильтрует по (server_ip, end)
+        Index("ix_server_history_server_ip_end", "server_ip", "end"),
+        # /history листает периоды IP по ключу (start, id) без сортировки
+        Index("ix_server_history_server_ip_start_id", "server_ip", "start", "id"),
+    )
+
+
+class ServerStats(Base):
+    """Сводка размещений IP, обновляется в транзакции цикла опроса"""
+
+    __tablename__ = "server_stats"
+
+    ip_adress: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    placements: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Длительность завершенных размещений; текущее добавляется при чтении
+    total_seconds: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    first_seen: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_seen: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Начало текущего размещения, None — сервер сейчас не рекламируется
+    current_start: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    is_active: Mapped[bool] = mapped_column(default=False, nullable=False)
+    # Ключ /top: у активных total_seconds - current_start (в unix-секундах),
+    # так что полное время = rank_key + now и порядок внутри группы не зависит от now
+    rank_key: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    # Периоды, удаленные из server_history по сроку хранения (уже учтены выше)
+    rolled_placements: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rolled_seconds: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    rolled_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_server_stats_is_active_rank_key", "is_active", "rank_key"),
+    )
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    # Ключ идемпотентности: событие + чат, повторная постановка игнорируется
+    idempotency_key: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    # Тип события (added, removed, expired, digest) — начало ключа; по нему группируется отчет рассылки
+    event: Mapped[str] = mapped_column(String, default="", server_default="", nullable=False)
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(String, nullable=False)
+
+    status: Mapped[str] = mapped_column(String, default="pending", nullable=False)  # 'pending', 'sent', 'failed'
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, DateTime, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime, timezone
+from .base import Base
+
+
+class SubscriptionFilter(Base):
+    """Фильтр рассылки чата: kind — ip, host, keyword или event.
+    Чат без фильтров получает все события"""
+
+    __tablename__ = "subscription_filter"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    value: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        # Уникальность заодно дает индекс по chat_id для /subscribe
+        UniqueConstraint("chat_id", "kind", "value", name="uq_subscription_filter_chat_kind_value"),
+    )
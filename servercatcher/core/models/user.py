@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, String
+from sqlalchemy import Boolean, DateTime, Integer, String, false, true
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, timezone
 from .base import Base
@@ -10,6 +10,13 @@ class User(Base):
 
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
     username: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Одна сводка за цикл опроса вместо сообщения на каждое событие
+    digest: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
+    # Недоступный чат (бот заблокирован, аккаунт удален) после send_failures
+    # неудачных рассылок подряд выключается и не попадает в рассылку
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true(), nullable=False)
+    send_failures: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -25,6 +32,10 @@ class Chat(Base):
     chat_type: Mapped[str] = mapped_column(String, nullable=False)  # 'group', 'supergroup', 'channel'
     title: Mapped[str | None] = mapped_column(String, nullable=True)
     username: Mapped[str | None] = mapped_column(String, nullable=True)
+    digest: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true(), nullable=False)
+    send_failures: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
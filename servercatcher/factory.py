@@ -0,0 +1,122 @@
+"""Сборка приложения под роль процесса.
+
+Модули пакета при импорте ничего не создают: настройки, движок БД, бот
+и источники появляются при первом обращении. Здесь они связываются для
+роли процесса — прием обновлений (bot), опрос и рассылка (poller) или
+обе сразу. Тяжелые зависимости (aiogram, FastAPI, uvicorn) импортируются
+только той ролью, которой они нужны.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Iterable
+
+from servercatcher.core.config import get_bot, settings
+from servercatcher.core.models import db_helper
+
+if TYPE_CHECKING:
+    from aiogram import Dispatcher
+
+ROLE_BOT = "bot"
+ROLE_POLLER = "poller"
+ROLES = (ROLE_BOT, ROLE_POLLER)
+
+ALLOWED_UPDATES = ["message", "callback_query", "chat_member", "my_chat_member"]
+
+
+def create_dispatcher() -> "Dispatcher":
+    from aiogram import Dispatcher
+
+    from servercatcher.app.start.handler import router as start
+    from servercatcher.app.server.handler import router as server
+    from servercatcher.app.digest.handler import router as digest
+    from servercatcher.app.admin.handler import router as admin
+    from servercatcher.app.subscription.handler import router as subscription
+
+    dp = Dispatcher()
+    for router in (start, server, digest, admin, subscription):
+        dp.include_router(router)
+    return dp
+
+
+async def check_storage() -> list[str]:
+    """Печатает профиль БД и возвращает полные сканы в горячих запросах"""
+    from servercatcher.app.admin.diagnostics import find_full_scans
+
+    print(f"[db] Профиль хранилища: {await db_helper.describe()}")
+    # Горячие запросы должны идти по индексам из миграций
+    async with db_helper.session_factory() as session:
+        problems = await find_full_scans(session)
+    for problem in problems:
+        print(f"[WARNING] Полный скан таблицы: {problem}. Выполните alembic upgrade head")
+    return problems
+
+
+async def run_poller():
+    """Опрос источника и доставка уведомлений — только на реплике-лидере"""
+    from servercatcher.app.notification.handler import check_and_update_servers
+    from servercatcher.app.notification.outbox import run_outbox_worker
+    from servercatcher.app.notification.stats import run_history_retention
+    from servercatcher.app.notification.subscribers import subscribers, run_subscriber_refresh
+
+    async with db_helper.session_factory() as session:
+        await subscribers.load(session)
+    tasks = [
+        check_and_update_servers(),
+        run_outbox_worker(),
+        run_subscriber_refresh(settings.subscribers_refresh_interval),
+    ]
+    if settings.history_retention_days is not None:
+        tasks.append(
+            run_history_retention(settings.history_retention_days, settings.history_retention_interval)
+        )
+    await asyncio.gather(*tasks)
+
+
+def serve(app) -> asyncio.Future:
+    import uvicorn
+
+    return uvicorn.Server(uvicorn.Config(app, host=settings.web_host, port=settings.web_port)).serve()
+
+
+async def run(roles: Iterable[str] = ROLES) -> None:
+    roles = set(roles)
+    unknown = roles - set(ROLES)
+    if unknown:
+        raise ValueError(f"Неизвестные роли: {', '.join(sorted(unknown))}")
+
+    from servercatcher.app.notification.leader import LeaderLease
+    from servercatcher.app.notification.source import close_sources
+    from servercatcher.webhook import create_metrics_app, create_webhook_app
+
+    # Без токена падаем сразу, а не после проверки БД: рассылке poller бот тоже нужен
+    bot = get_bot()
+    await check_storage()
+
+    services = []
+    metrics_served = False
+    if ROLE_BOT in roles:
+        dp = create_dispatcher()
+        if settings.bot_mode == "webhook":
+            # Обновления принимает ASGI-приложение, опрос Telegram не нужен; /metrics — там же
+            print(f"Starting webhook server on {settings.web_host}:{settings.web_port}...")
+            services.append(serve(create_webhook_app(dp, bot, ALLOWED_UPDATES)))
+            metrics_served = True
+        else:
+            print("Starting polling with chat_member updates...")
+            services.append(
+                dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES, drop_pending_updates=True)
+            )
+
+    if ROLE_POLLER in roles:
+        services.append(LeaderLease("poller", settings.leader_lease_ttl).run_while_leader(run_poller))
+        # Метрики цикла и рассылки живут в процессе опроса
+        if settings.metrics_enabled and not metrics_served:
+            print(f"Serving metrics on {settings.web_host}:{settings.web_port}/metrics")
+            services.append(serve(create_metrics_app()))
+
+    try:
+        await asyncio.gather(*services)
+    finally:
+        await close_sources()
+        await bot.session.close()
+        await db_helper.dispose()
@@ -1,5 +1,6 @@
 import asyncio
-from aiogram import Dispatcher
+from typing import Iterable
+
 from aiogram.exceptions import (
     TelegramNetworkError,
     TelegramAPIError,
@@ -9,42 +10,13 @@ from aiogram.exceptions import (
     TelegramBadRequest,
 )
 
-from servercatcher.core.config import bot
-from servercatcher.app.start.handler import router as start
-from servercatcher.app.server.handler import router as server
-from servercatcher.app.notification.handler import check_and_update_servers
-
-
-dp = Dispatcher()
-
-
-async def main():
-    print("Starting bot...")
-    
-    # Включаем роутеры
-    dp.include_router(start)
-    dp.include_router(server)
-    
-    print("Routers included:")
-    print(f"- Start router: {start}")
-    print(f"- Server router: {server}")
-    
-    # Запускаем бота с поддержкой всех типов обновлений
-    print("Starting polling with chat_member updates...")
-    await asyncio.gather(
-        dp.start_polling(
-            bot, 
-            allowed_updates=["message", "chat_member", "my_chat_member"],
-            drop_pending_updates=True
-        ),
-        check_and_update_servers()
-    )
+from servercatcher.factory import ROLES, run
 
 
-if __name__ == "__main__":
-    print("Starting...")
+def main(roles: Iterable[str] = ROLES) -> None:
+    print(f"Starting: {', '.join(sorted(roles))}...")
     try:
-        asyncio.run(main())
+        asyncio.run(run(roles))
     except TelegramNetworkError:
         print("No internet connection")
     except TelegramUnauthorizedError:
@@ -59,3 +31,7 @@ if __name__ == "__main__":
         print("No API connection")
     except KeyboardInterrupt:
         print("Exit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response
+
+from servercatcher.core.config import settings
+from servercatcher.core.metrics import registry
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics")
+async def metrics_endpoint() -> Response:
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def create_metrics_app() -> FastAPI:
+    """Отдельное приложение только с /metrics — для режима polling"""
+    app = FastAPI()
+    app.include_router(metrics_router)
+    return app
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, allowed_updates: list[str]) -> FastAPI:
+    """ASGI-приложение, принимающее обновления Telegram через webhook.
+
+    Обновление сразу передается диспетчеру в отдельной задаче, а Telegram
+    получает 200 без ожидания обработчиков, поэтому несколько реплик
+    можно поставить за балансировщиком.
+    """
+    if not settings.webhook_secret:
+        raise RuntimeError("webhook без WEBHOOK_SECRET принимал бы поддельные обновления")
+    tasks: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if settings.webhook_base_url:
+            # Повторная установка того же адреса безопасна, ее делает каждая реплика
+            await bot.set_webhook(
+                url=settings.webhook_base_url.rstrip("/") + settings.webhook_path,
+                secret_token=settings.webhook_secret,
+                allowed_updates=allowed_updates,
+            )
+            print(f"Webhook set to {settings.webhook_base_url}{settings.webhook_path}")
+        yield
+        # Даем обработчикам закончить, webhook не удаляем — его используют другие реплики
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(metrics_router)
+
+    @app.post(settings.webhook_path)
+    async def telegram_webhook(request: Request) -> Response:
+        secret = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(secret, settings.webhook_secret.encode()):
+            raise HTTPException(status_code=403)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError:
+            # Не JSON или не Update (ValidationError — тоже ValueError)
+            raise HTTPException(status_code=400)
+        task = asyncio.create_task(dp.feed_update(bot, update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return Response(status_code=200)
+
+    return app
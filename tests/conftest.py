@@ -0,0 +1,32 @@
+import pytest
+
+from servercatcher.core.config import get_bot, get_settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(monkeypatch, tmp_path):
+    """Каждый тест читает настройки заново и не трогает db.sqlite3 репозитория"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'test.sqlite3'}")
+    for name in ("ARCHIVE_DIR", "TELEGRAM_API_BASE"):
+        monkeypatch.delenv(name, raising=False)
+    get_settings.cache_clear()
+    get_bot.cache_clear()
+    yield
+    get_settings.cache_clear()
+    get_bot.cache_clear()
+
+
+@pytest.fixture
+def migrated_db(isolated_settings):
+    """Пустая БД во временном каталоге, приведенная миграциями к head"""
+    import asyncio
+    from pathlib import Path
+
+    from alembic import command
+    from alembic.config import Config
+
+    from servercatcher.core.models import db_helper
+
+    command.upgrade(Config(str(Path(__file__).resolve().parent.parent / "alembic.ini")), "head")
+    yield db_helper
+    asyncio.run(db_helper.dispose())
@@ -0,0 +1,39 @@
+import pytest
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import SendMessage
+
+from servercatcher.app.notification.broadcast import (
+    SEND_MIGRATED,
+    SEND_REJECTED,
+    SEND_TRANSIENT,
+    SEND_UNREACHABLE,
+    classify_send_error,
+)
+
+METHOD = SendMessage(chat_id=1, text="x")
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (TelegramForbiddenError(METHOD, "Forbidden: bot was blocked by the user"), SEND_UNREACHABLE),
+        (TelegramBadRequest(METHOD, "Bad Request: chat not found"), SEND_UNREACHABLE),
+        (TelegramBadRequest(METHOD, "Bad Request: CHAT_WRITE_FORBIDDEN"), SEND_UNREACHABLE),
+        (TelegramBadRequest(METHOD, "Bad Request: can't parse entities"), SEND_REJECTED),
+        (TelegramBadRequest(METHOD, "Bad Request: message is too long"), SEND_REJECTED),
+        (TelegramMigrateToChat(METHOD, "group chat was upgraded", migrate_to_chat_id=-1001), SEND_MIGRATED),
+        (TelegramRetryAfter(METHOD, "Flood control exceeded", retry_after=5), SEND_TRANSIENT),
+        (TelegramServerError(METHOD, "Internal Server Error"), SEND_TRANSIENT),
+        (TelegramNetworkError(METHOD, "timeout"), SEND_TRANSIENT),
+        (ConnectionError("reset"), SEND_TRANSIENT),
+    ],
+)
+def test_classify_send_error(error, expected):
+    assert classify_send_error(error) == expected
@@ -0,0 +1,72 @@
+import asyncio
+
+from aiogram.exceptions import TelegramMigrateToChat
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+
+from servercatcher.app.notification import outbox
+from servercatcher.app.notification.broadcast import Broadcaster
+from servercatcher.app.notification.subscribers import SubscriberRegistry
+from servercatcher.core.models import Chat, NotificationOutbox, SubscriptionFilter
+
+OLD_CHAT = -100
+NEW_CHAT = -1001234
+
+
+class MigratingBot:
+    """Bot API, в котором группа OLD_CHAT стала супергруппой NEW_CHAT"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if chat_id == OLD_CHAT:
+            raise TelegramMigrateToChat(
+                method=SendMessage(chat_id=chat_id, text=text),
+                message="group chat was upgraded to a supergroup chat",
+                migrate_to_chat_id=NEW_CHAT,
+            )
+        self.sent.append(chat_id)
+
+
+def fast_broadcaster(bot) -> Broadcaster:
+    return Broadcaster(bot, global_rate=1000, private_rate=1000, group_rate=1000)
+
+
+def test_migrated_group_is_resent_to_supergroup():
+    bot = MigratingBot()
+    report = asyncio.run(fast_broadcaster(bot).deliver([(OLD_CHAT, "a"), (5, "b")], event="added"))
+    assert report.sent == 2 and not report.errors
+    assert report.migrated == {OLD_CHAT: NEW_CHAT}
+    assert sorted(bot.sent) == [NEW_CHAT, 5]
+
+
+def test_outbox_moves_migrated_group_without_pruning(migrated_db, monkeypatch):
+    registry = SubscriberRegistry()
+    monkeypatch.setattr(outbox, "subscribers", registry)
+    monkeypatch.setattr(outbox, "broadcaster", fast_broadcaster(MigratingBot()))
+
+    async def run():
+        async with migrated_db.session_factory() as session:
+            session.add(Chat(chat_id=OLD_CHAT, chat_type="group", send_failures=2))
+            session.add(SubscriptionFilter(chat_id=OLD_CHAT, kind="keyword", value="rust"))
+            await session.commit()
+            await registry.load(session)
+            await outbox.enqueue_routed(session, [("added:1.1.1.1:t", "a", [OLD_CHAT])])
+            await session.commit()
+        await outbox.drain_outbox_batch()
+        async with migrated_db.session_factory() as session:
+            chats = (await session.execute(
+                select(Chat.chat_id, Chat.chat_type, Chat.is_active, Chat.send_failures)
+            )).all()
+            filters = (await session.execute(select(SubscriptionFilter.chat_id))).scalars().all()
+            status = await session.scalar(select(NotificationOutbox.status))
+        await migrated_db.dispose()
+        return chats, filters, status
+
+    chats, filters, status = asyncio.run(run())
+    assert chats == [(NEW_CHAT, "supergroup", True, 0)]
+    assert filters == [NEW_CHAT]
+    assert status == "sent"
+    assert registry.chats() == frozenset({NEW_CHAT})
+    assert registry.filter_index().filtered == {NEW_CHAT}
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from servercatcher.app.notification import handler
+from servercatcher.app.notification.handler import MSK, PollState, apply_fetch, load_poll_state
+from servercatcher.app.notification.records import ParsedSnapshot
+from servercatcher.app.notification.snapshot import SnapshotCache
+from servercatcher.app.notification.source import MergedFetch
+from servercatcher.app.notification.subscribers import SubscriberRegistry
+from servercatcher.core import metrics
+from servercatcher.core.models import NotificationOutbox, PollerCheckpoint, PollerServerState, User
+
+SERVERS = [
+    {"ip": "1.1.1.1:27015", "name": "A", "start": "01/01/2026"},
+    {"ip": "2.2.2.2:27015", "name": "B", "start": "01/01/2026", "end": "10/01/2026"},
+    {"ip": "3.3.3.3:27015", "name": "C"},
+]
+PAYLOAD = MergedFetch(
+    snapshot=ParsedSnapshot.from_raw(SERVERS, "test"), digest="payload", failed=frozenset()
+)
+
+
+def statements() -> float:
+    return sum(metrics.db_statements._values.values())
+
+
+async def outbox_keys(db) -> list[str]:
+    async with db.session_factory() as session:
+        rows = await session.execute(
+            select(NotificationOutbox.idempotency_key).order_by(NotificationOutbox.id)
+        )
+        return list(rows.scalars())
+
+
+async def first_run(db, monkeypatch) -> list[str]:
+    """Цикл до перезапуска: подписчик, сервера и чекпоинт в БД"""
+    monkeypatch.setattr(handler, "subscribers", SubscriberRegistry())
+    monkeypatch.setattr(handler, "snapshot_cache", SnapshotCache())
+    async with db.session_factory() as session:
+        session.add(User(telegram_id=7))
+        await session.commit()
+    await apply_fetch(PollState(), PAYLOAD, datetime(2026, 1, 10, 12, tzinfo=MSK))
+    keys = await outbox_keys(db)
+    assert len(keys) == len(SERVERS)
+    return keys
+
+
+async def restart(db, monkeypatch) -> PollState:
+    """Новый процесс: пустые кеши, состояние только из чекпоинта"""
+    monkeypatch.setattr(handler, "subscribers", SubscriberRegistry())
+    monkeypatch.setattr(handler, "snapshot_cache", SnapshotCache())
+    async with db.session_factory() as session:
+        return await load_poll_state(session)
+
+
+def test_warm_restart_with_same_payload_skips_cycle(migrated_db, monkeypatch):
+    async def run():
+        keys = await first_run(migrated_db, monkeypatch)
+        state = await restart(migrated_db, monkeypatch)
+        assert state.cycle_key == ("payload", date(2026, 1, 10))
+        assert state.server_ips == {"1.1.1.1:27015", "2.2.2.2:27015", "3.3.3.3:27015"}
+
+        started = statements()
+        await apply_fetch(state, PAYLOAD, datetime(2026, 1, 10, 18, tzinfo=MSK))
+        # Тот же список в тот же день: ни сравнения, ни одного запроса к БД
+        assert statements() - started == 0
+        assert await outbox_keys(migrated_db) == keys
+        # /main после перезапуска получает список без обращения к источнику
+        assert [r.ip for r in handler.snapshot_cache.current.servers] == [s["ip"] for s in SERVERS]
+        await migrated_db.dispose()
+
+    asyncio.run(run())
+
+
+def test_restart_after_date_rollover_diffs_only_the_change(migrated_db, monkeypatch):
+    async def run():
+        keys = await first_run(migrated_db, monkeypatch)
+        state = await restart(migrated_db, monkeypatch)
+
+        # Между запусками наступил новый день: у B закончился срок
+        now = datetime(2026, 1, 11, 9, tzinfo=MSK)
+        await apply_fetch(state, PAYLOAD, now)
+        end = datetime(2026, 1, 10, 23, 59, 59, tzinfo=MSK)
+        # Остальные сервера не считаются вернувшимися
+        assert await outbox_keys(migrated_db) == keys + [f"expired:2.2.2.2:27015:{end.isoformat()}:7"]
+
+        async with migrated_db.session_factory() as session:
+            checkpoint = (await session.execute(select(PollerCheckpoint.digest, PollerCheckpoint.cycle_day))).one()
+            listed = await session.scalar(
+                select(func.count(PollerServerState.id)).where(PollerServerState.listed == True)
+            )
+        assert tuple(checkpoint) == ("payload", date(2026, 1, 11))
+        assert listed == 2
+        await migrated_db.dispose()
+
+    asyncio.run(run())
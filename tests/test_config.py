@@ -0,0 +1,29 @@
+import pytest
+from pydantic import ValidationError
+
+from servercatcher.core.config import Settings
+
+
+def test_defaults():
+    settings = Settings()
+    assert (settings.db_profile, settings.sqlite_synchronous, settings.bot_mode) == ("auto", "NORMAL", "polling")
+
+
+def test_sqlite_synchronous_is_case_insensitive(monkeypatch):
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "full")
+    assert Settings().sqlite_synchronous == "FULL"
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("SQLITE_SYNCHRONOUS", "NORMAL; DROP TABLE chat"),
+        ("SQLITE_SYNCHRONOUS", "2"),
+        ("DB_PROFILE", "postgres"),
+        ("BOT_MODE", "Webhook"),
+    ],
+)
+def test_unknown_values_fail_on_load(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+    with pytest.raises(ValidationError):
+        Settings()
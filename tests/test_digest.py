@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from servercatcher.app.notification.handler import MESSAGE_LIMIT, MSK, digest_messages
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=MSK)
+SEPARATOR = "\n\n➖➖➖\n\n"
+
+
+def test_short_digest_is_one_message():
+    parts = digest_messages(["a", "b"], NOW)
+    assert len(parts) == 1
+    assert parts[0].startswith("🗞 <b>Изменения на 01.01.2026 12:00:00 МСК</b> (2)")
+    assert parts[0].endswith(f"{SEPARATOR}a{SEPARATOR}b")
+
+
+def test_events_are_not_split_between_messages():
+    texts = [str(i) * 1000 for i in range(10)]
+    parts = digest_messages(texts, NOW)
+    assert all(len(part) <= MESSAGE_LIMIT for part in parts)
+    assert len(parts) == 3
+    # Каждое событие целиком в одном сообщении и в исходном порядке
+    found = [chunk for part in parts for chunk in part.split(SEPARATOR)[1 if part is parts[0] else 0:]]
+    assert found == texts
+
+
+def test_event_longer_than_limit_is_cut():
+    parts = digest_messages(["x" * (MESSAGE_LIMIT + 10)], NOW)
+    assert all(len(part) <= MESSAGE_LIMIT for part in parts)
+    assert "".join(parts[1:]) == "x" * (MESSAGE_LIMIT + 10)
@@ -0,0 +1,57 @@
+import ipaddress
+
+from servercatcher.app.notification.filters import (
+    EVENT_ADDED,
+    EVENT_REMOVED,
+    FilterIndex,
+    IpTrie,
+    KeywordAutomaton,
+    ServerEvent,
+)
+
+
+def event(ip: str, kind: str = EVENT_ADDED, name: str | None = None) -> ServerEvent:
+    return ServerEvent(key=f"{kind}:{ip}", text="", kind=kind, ip=ip, name=name)
+
+
+def test_ip_trie_matches_every_containing_network():
+    trie = IpTrie()
+    trie.add(ipaddress.ip_network("10.0.0.0/8"), 1)
+    trie.add(ipaddress.ip_network("10.1.0.0/16"), 2)
+    trie.add(ipaddress.ip_network("10.1.2.3/32"), 3)
+    trie.add(ipaddress.ip_network("0.0.0.0/0"), 4)
+    trie.add(ipaddress.ip_network("2001:db8::/32"), 6)
+
+    assert trie.match(ipaddress.ip_address("10.1.2.3")) == {1, 2, 3, 4}
+    assert trie.match(ipaddress.ip_address("10.1.2.4")) == {1, 2, 4}
+    assert trie.match(ipaddress.ip_address("11.0.0.1")) == {4}
+    # Сети IPv4 и IPv6 не пересекаются
+    assert trie.match(ipaddress.ip_address("2001:db8::1")) == {6}
+    assert trie.match(ipaddress.ip_address("2001:db9::1")) == set()
+
+
+def test_keyword_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton({"he": {1}, "she": {2}, "hers": {3}, "his": {4}})
+    assert automaton.match("USHERS") == {1, 2, 3}
+    assert automaton.match("this") == {4}
+    assert automaton.match("hxe") == set()
+
+
+def test_filter_index_combines_targets_and_event_kinds():
+    index = FilterIndex([
+        (1, "ip", "10.0.0.0/8"),
+        (2, "host", "example.net"),
+        (3, "keyword", "dust"),
+        (3, "event", EVENT_REMOVED),
+        (4, "event", EVENT_ADDED),
+    ])
+    assert len(index) == 4
+
+    assert index.matching(event("10.2.3.4:27015")) == {1, 4}
+    # Хост совпадает с поддоменами, но не с похожими именами
+    assert index.matching(event("eu.example.net:27015")) == {2, 4}
+    assert index.matching(event("badexample.net")) == {4}
+    # Чат 3 ограничил ключевое слово типом события
+    assert index.matching(event("1.1.1.1", EVENT_ADDED, name="Dust2 only")) == {4}
+    assert index.matching(event("1.1.1.1", EVENT_REMOVED, name="Dust2 only")) == {3}
+    assert index.matching(event("[2001:db8::1]:27015", EVENT_REMOVED)) == set()
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from servercatcher.app.server.crud import MSK, get_history_page
+from servercatcher.core.models import Server, ServerHistory
+
+IP = "1.1.1.1:27015"
+BASE = datetime(2026, 1, 1, tzinfo=MSK)
+
+
+def seed_history(db) -> list[int]:
+    """Шесть периодов IP, у двух одинаковое начало, одна старая запись об удалении (start = end); id в порядке листания"""
+    periods = [
+        (BASE, BASE + timedelta(hours=1)),
+        (BASE + timedelta(days=1), BASE + timedelta(days=1)),
+        (BASE + timedelta(days=2), BASE + timedelta(days=3)),
+        (BASE + timedelta(days=2), None),
+        (BASE + timedelta(days=4), None),
+        (BASE + timedelta(days=5), None),
+    ]
+
+    async def run():
+        async with db.session_factory() as session:
+            session.add(Server(ip_adress=IP, text=IP))
+            session.add(ServerHistory(server_ip="2.2.2.2:27015", start=BASE + timedelta(days=3)))
+            rows = [ServerHistory(server_ip=IP, start=start, end=end) for start, end in periods]
+            session.add_all(rows)
+            await session.commit()
+            return [row.id for row in rows]
+
+    return asyncio.run(run())
+
+
+def page(db, cursor=None, forward=True, limit=2):
+    async def run():
+        async with db.session_factory() as session:
+            rows, has_more = await get_history_page(session, IP, cursor, forward, limit)
+        await db.dispose()
+        return [row.id for row in rows], has_more
+
+    return asyncio.run(run())
+
+
+def test_history_pages_forward_and_back(migrated_db):
+    ids = seed_history(migrated_db)
+
+    assert page(migrated_db) == (ids[0:2], True)
+    # Курсор внутри группы с одинаковым началом: порядок добирается по id
+    assert page(migrated_db, cursor=ids[1]) == (ids[2:4], True)
+    assert page(migrated_db, cursor=ids[3]) == (ids[4:6], False)
+    assert page(migrated_db, cursor=ids[5]) == ([], False)
+
+    assert page(migrated_db, cursor=ids[4], forward=False) == (ids[2:4], True)
+    assert page(migrated_db, cursor=ids[2], forward=False) == (ids[0:2], False)
+    assert page(migrated_db, cursor=ids[0], forward=False) == ([], False)
+
+
+def test_history_page_limit_equal_to_remaining_rows(migrated_db):
+    ids = seed_history(migrated_db)
+    # Ровно limit строк до конца — признака продолжения нет
+    assert page(migrated_db, cursor=ids[1], limit=4) == (ids[2:6], False)
+    assert page(migrated_db, limit=6) == (ids, False)
+    assert page(migrated_db, limit=5) == (ids[:5], True)
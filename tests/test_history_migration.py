@@ -0,0 +1,54 @@
+from datetime import datetime
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC = Config(str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+X = "1.1.1.1:27015"
+Y = "2.2.2.2:27015"
+
+history = sa.table(
+    "server_history",
+    sa.column("id", sa.Integer()),
+    sa.column("server_ip", sa.String()),
+    sa.column("start", sa.DateTime()),
+    sa.column("end", sa.DateTime()),
+)
+
+
+def d(day: int) -> datetime:
+    return datetime(2026, 1, day, 12)
+
+
+def periods(engine) -> dict[str, list]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            sa.select(history.c.server_ip, history.c.start, history.c.end).order_by(history.c.id)
+        ).all()
+    result: dict[str, list] = {}
+    for ip, start, end in rows:
+        result.setdefault(ip, []).append((start, end))
+    return result
+
+
+def test_compaction_merges_legacy_open_and_close_rows(tmp_path):
+    command.upgrade(ALEMBIC, "a81f3c5e7d92")
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    # Старая схема: открытие — строка только со start, закрытие — только с end
+    legacy = [
+        (X, d(1), None), (Y, None, d(6)), (X, None, d(2)), (X, d(3), None),
+        (Y, d(7), None), (X, d(4), None), (X, None, d(5)),
+    ]
+    with engine.begin() as conn:
+        conn.execute(history.insert(), [{"server_ip": ip, "start": s, "end": e} for ip, s, e in legacy])
+
+    command.upgrade(ALEMBIC, "f4d19b7c2e85")
+    # Повторное открытие продолжает период, непарное закрытие остается как есть
+    assert periods(engine) == {X: [(d(1), d(2)), (d(3), d(5))], Y: [(None, d(6)), (d(7), None)]}
+
+    command.upgrade(ALEMBIC, "head")
+    # С ключом по start закрытие без известного начала становится точкой
+    assert periods(engine) == {X: [(d(1), d(2)), (d(3), d(5))], Y: [(d(6), d(6)), (d(7), None)]}
+    engine.dispose()
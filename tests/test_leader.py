@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from servercatcher.app.notification import leader
+from servercatcher.app.notification.leader import LeaderLease, LeaseLostError
+from servercatcher.core.models import Chat
+
+
+async def write_chat(db, chat_id: int) -> None:
+    """Запись лидера: строка чата и проверка аренды перед commit"""
+    async with db.session_factory() as session:
+        session.add(Chat(chat_id=chat_id, chat_type="private"))
+        await leader.fence(session)
+        await session.commit()
+
+
+def test_takeover_after_expiry_fences_old_leader(migrated_db, monkeypatch):
+    old = LeaderLease("poller", ttl=0.2, holder="old")
+    new = LeaderLease("poller", ttl=60, holder="new")
+
+    async def run():
+        assert await old.try_acquire()
+        assert old.token == 1
+        # Продление тем же держателем token не меняет
+        assert await old.try_acquire()
+        assert old.token == 1
+        assert not await new.try_acquire()
+
+        # Старый лидер завис дольше ttl, аренду забрала другая реплика
+        await asyncio.sleep(0.3)
+        assert await new.try_acquire()
+        assert new.token == 2
+
+        # Старый лидер еще не узнал о потере и пытается записать результат цикла
+        monkeypatch.setattr(leader, "current_lease", old)
+        with pytest.raises(LeaseLostError):
+            await write_chat(migrated_db, 1)
+        assert old.token is None
+
+        monkeypatch.setattr(leader, "current_lease", new)
+        await write_chat(migrated_db, 2)
+
+        # Продлить чужую аренду старый лидер тоже не может
+        assert not await old.try_acquire()
+        async with migrated_db.session_factory() as session:
+            chats = (await session.execute(select(Chat.chat_id))).scalars().all()
+        await migrated_db.dispose()
+        return chats
+
+    assert asyncio.run(run()) == [2]
+
+
+def test_writes_without_election_are_not_fenced(migrated_db, monkeypatch):
+    # Админские команды и replay не выбирают лидера и пишут без проверки
+    monkeypatch.setattr(leader, "current_lease", None)
+
+    async def run():
+        await write_chat(migrated_db, 3)
+        await migrated_db.dispose()
+
+    asyncio.run(run())
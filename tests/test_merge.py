@@ -0,0 +1,44 @@
+from servercatcher.app.notification.records import ParsedSnapshot
+from servercatcher.app.notification.source import FetchResult, merge_fetches
+
+
+def part(name: str, servers: list[dict], digest: str) -> tuple[str, FetchResult]:
+    return name, FetchResult(snapshot=ParsedSnapshot.from_raw(servers, name), digest=digest)
+
+
+MAIN = part("main", [{"ip": "1.1.1.1", "name": "main-1"}, {"ip": "2.2.2.2", "name": "main-2"}], "m1")
+MIRROR = part("mirror", [{"ip": "3.3.3.3", "name": "mirror-3"}, {"ip": "1.1.1.1", "name": "mirror-1"}], "r1")
+
+
+def test_first_source_wins_and_records_keep_their_source():
+    merged = merge_fetches([MAIN, MIRROR], failed=set())
+    assert [(r.ip, r.name, r.source) for r in merged.snapshot.records] == [
+        ("1.1.1.1", "main-1", "main"),
+        ("2.2.2.2", "main-2", "main"),
+        ("3.3.3.3", "mirror-3", "mirror"),
+    ]
+    # Порядок источников задает приоритет
+    swapped = merge_fetches([MIRROR, MAIN], failed=set())
+    assert swapped.snapshot.by_ip["1.1.1.1"].source == "mirror"
+    assert swapped.digest != merged.digest
+
+
+def test_unchanged_digests_return_previous_merge():
+    merged = merge_fetches([MAIN, MIRROR], failed=set())
+    assert merge_fetches([MAIN, MIRROR], failed=set(), previous=merged) is merged
+
+    changed = part("mirror", [{"ip": "4.4.4.4"}], "r2")
+    again = merge_fetches([MAIN, changed], failed=set(), previous=merged)
+    assert again is not merged
+    assert {r.ip: r.source for r in again.snapshot.records} == {
+        "1.1.1.1": "main", "2.2.2.2": "main", "4.4.4.4": "mirror",
+    }
+
+
+def test_failed_sources_are_part_of_the_digest():
+    merged = merge_fetches([MAIN], failed=set())
+    degraded = merge_fetches([MAIN], failed={"mirror"}, previous=merged)
+    assert degraded is not merged
+    assert degraded.failed == frozenset({"mirror"})
+    # Единственный источник отдается без пересборки снимка
+    assert degraded.snapshot is MAIN[1].snapshot
@@ -0,0 +1,59 @@
+import asyncio
+
+from sqlalchemy import select
+
+from servercatcher.app.notification import outbox
+from servercatcher.app.notification.broadcast import BroadcastReport
+from servercatcher.core.models import NotificationOutbox
+
+
+class RecordingBroadcaster:
+    def __init__(self, failing_chats=()):
+        self.calls = []
+        self.failing_chats = set(failing_chats)
+
+    async def deliver(self, messages, event=""):
+        self.calls.append((event, [chat_id for chat_id, _ in messages]))
+        report = BroadcastReport(event=event, total=len(messages))
+        for idx, (chat_id, _) in enumerate(messages):
+            if chat_id in self.failing_chats:
+                report.errors[idx] = ConnectionError("timeout")
+            else:
+                report.sent += 1
+        return report
+
+
+def test_drained_batch_is_reported_per_event_kind(migrated_db, monkeypatch):
+    broadcaster = RecordingBroadcaster(failing_chats={2})
+    monkeypatch.setattr(outbox, "broadcaster", broadcaster)
+
+    async def run():
+        async with migrated_db.session_factory() as session:
+            await outbox.enqueue_routed(
+                session,
+                [
+                    ("added:1.1.1.1:2026-01-01T00:00:00+03:00", "added", [1, 2]),
+                    ("removed:2.2.2.2:2026-01-01T00:00:00+03:00", "removed", [1]),
+                    ("digest:2026-01-01T00:00:00+03:00:0", "digest", [3]),
+                ],
+            )
+            await session.commit()
+        processed = await outbox.drain_outbox_batch()
+        async with migrated_db.session_factory() as session:
+            rows = (await session.execute(
+                select(NotificationOutbox.event, NotificationOutbox.chat_id, NotificationOutbox.status)
+                .order_by(NotificationOutbox.id)
+            )).all()
+        await migrated_db.dispose()
+        return processed, rows
+
+    processed, rows = asyncio.run(run())
+    assert processed == 4
+    assert sorted(broadcaster.calls) == [("added", [1, 2]), ("digest", [3]), ("removed", [1])]
+    # Ошибка из группы сопоставляется со своей строкой, а не с позицией в пачке
+    assert rows == [
+        ("added", 1, "sent"),
+        ("added", 2, "pending"),
+        ("removed", 1, "sent"),
+        ("digest", 3, "sent"),
+    ]
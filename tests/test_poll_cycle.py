@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select
+
+from servercatcher.app.notification import handler
+from servercatcher.app.notification.handler import MSK, PollState, apply_fetch
+from servercatcher.app.notification.records import ParsedSnapshot
+from servercatcher.app.notification.source import MergedFetch
+from servercatcher.app.notification.subscribers import SubscriberRegistry
+from servercatcher.core import metrics
+from servercatcher.core.config import get_settings
+from servercatcher.core.models import NotificationOutbox, Server, ServerHistory, User
+
+CHAT = 7
+
+
+def fetch(servers: list[dict], digest: str) -> MergedFetch:
+    return MergedFetch(
+        snapshot=ParsedSnapshot.from_raw(servers, "test"), digest=digest, failed=frozenset()
+    )
+
+
+def at(day: int, month: int = 1, hour: int = 12) -> datetime:
+    return datetime(2026, month, day, hour, tzinfo=MSK)
+
+
+def statements() -> float:
+    return sum(metrics.db_statements._values.values())
+
+
+class Poller:
+    """Циклы опроса над migrated_db с подписчиком CHAT"""
+
+    def __init__(self, db, monkeypatch):
+        self.db = db
+        self.state = PollState()
+        monkeypatch.setattr(handler, "subscribers", SubscriberRegistry())
+
+    async def subscribe(self) -> None:
+        async with self.db.session_factory() as session:
+            session.add(User(telegram_id=CHAT))
+            await session.commit()
+
+    async def cycle(self, servers: list[dict], now: datetime, digest: str | None = None) -> float:
+        """Один цикл, возвращает число SQL-запросов в нем"""
+        started = statements()
+        await apply_fetch(self.state, fetch(servers, digest or f"{now.isoformat()}:{len(servers)}"), now)
+        return statements() - started
+
+    async def history(self, ip: str) -> list[tuple]:
+        async with self.db.session_factory() as session:
+            rows = await session.execute(
+                select(ServerHistory.start, ServerHistory.end)
+                .where(ServerHistory.server_ip == ip)
+                .order_by(ServerHistory.id)
+            )
+            return [tuple(handler.as_msk(dt) for dt in row) for row in rows]
+
+    async def outbox_keys(self) -> list[str]:
+        async with self.db.session_factory() as session:
+            rows = await session.execute(
+                select(NotificationOutbox.idempotency_key).order_by(NotificationOutbox.id)
+            )
+            return list(rows.scalars())
+
+
+def test_cycle_writes_history_and_outbox(migrated_db, monkeypatch):
+    a = {"ip": "1.1.1.1:27015", "name": "A", "start": "01/01/2026", "end": "31/01/2026"}
+    b = {"ip": "2.2.2.2:27015", "name": "B"}
+    moved = {**a, "start": "02/01/2026"}
+
+    async def run():
+        poller = Poller(migrated_db, monkeypatch)
+        await poller.subscribe()
+        # Добавление: старт из источника, без даты — время цикла
+        await poller.cycle([a, b], at(10))
+        assert await poller.history(a["ip"]) == [(at(1, hour=0), None)]
+        assert await poller.history(b["ip"]) == [(at(10), None)]
+        keys = [f"added:{a['ip']}:{at(10).isoformat()}:{CHAT}", f"added:{b['ip']}:{at(10).isoformat()}:{CHAT}"]
+        assert await poller.outbox_keys() == keys
+
+        # Удаление из списка закрывает период временем цикла
+        await poller.cycle([a], at(11))
+        assert await poller.history(b["ip"]) == [(at(10), at(11))]
+        keys.append(f"removed:{b['ip']}:{at(11).isoformat()}:{CHAT}")
+        assert await poller.outbox_keys() == keys
+
+        # Возвращение открывает новый период
+        await poller.cycle([a, b], at(12))
+        assert await poller.history(b["ip"]) == [(at(10), at(11)), (at(12), None)]
+        keys.append(f"added:{b['ip']}:{at(12).isoformat()}:{CHAT}")
+        assert await poller.outbox_keys() == keys
+
+        # Смена дат: старый период закрыт как удаление, новый открыт с новым стартом
+        await poller.cycle([moved, b], at(13))
+        assert await poller.history(a["ip"]) == [(at(1, hour=0), at(13)), (at(2, hour=0), None)]
+        keys.append(f"removed:{a['ip']}:{at(13).isoformat()}:{CHAT}")
+        assert await poller.outbox_keys() == keys
+
+        # Окончание: период закрыт концом дня end, а не временем цикла
+        end = datetime(2026, 1, 31, 23, 59, 59, tzinfo=MSK)
+        await poller.cycle([moved, b], at(1, month=2))
+        assert await poller.history(a["ip"]) == [(at(1, hour=0), at(13)), (at(2, hour=0), end)]
+        keys.append(f"expired:{a['ip']}:{end.isoformat()}:{CHAT}")
+        assert await poller.outbox_keys() == keys
+
+        async with migrated_db.session_factory() as session:
+            servers = await session.execute(select(Server.ip_adress, Server.is_active).order_by(Server.id))
+            assert servers.all() == [(a["ip"], False), (b["ip"], True)]
+        await migrated_db.dispose()
+
+    asyncio.run(run())
+
+
+def test_statements_per_cycle_do_not_grow_with_list(migrated_db, monkeypatch, tmp_path):
+    def servers(count: int, offset: int = 0) -> list[dict]:
+        return [{"ip": f"10.0.{i // 256}.{i % 256}", "name": f"s{i}"} for i in range(offset, offset + count)]
+
+    async def run(count: int) -> list[float]:
+        poller = Poller(migrated_db, monkeypatch)
+        await poller.subscribe()
+        base = servers(count)
+        counts = [
+            await poller.cycle(base, at(10)),
+            # Половина списка заменена: удаления, добавления, закрытие периодов
+            await poller.cycle(base[: count // 2] + servers(count // 2, offset=count), at(11)),
+            # Возвращение удаленных
+            await poller.cycle(base + servers(count // 2, offset=count), at(12)),
+        ]
+        await migrated_db.dispose()
+        return counts
+
+    small = asyncio.run(run(20))
+    # Большой список — в своей БД, чтобы сервера прошлого прогона не считались удаленными
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'large.sqlite3'}")
+    get_settings.cache_clear()
+    command.upgrade(Config(str(Path(__file__).resolve().parent.parent / "alembic.ini")), "head")
+    large = asyncio.run(run(1000))
+    assert small == large
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from servercatcher.app.admin.diagnostics import find_full_scans, query_plan
+from servercatcher.app.server.crud import HISTORY_PAGE_SIZE, history_page_query
+
+
+def test_hot_queries_use_indexes_after_migrations(migrated_db):
+    async def run():
+        async with migrated_db.session_factory() as session:
+            problems = await find_full_scans(session)
+        await migrated_db.dispose()
+        return problems
+
+    assert asyncio.run(run()) == []
+
+
+@pytest.mark.parametrize("cursor", [None, 1])
+@pytest.mark.parametrize("forward", [True, False])
+def test_history_page_reads_index_range_without_sorting(migrated_db, cursor, forward):
+    async def run():
+        async with migrated_db.session_factory() as session:
+            plan = await query_plan(
+                session, history_page_query("1.1.1.1", cursor, forward, HISTORY_PAGE_SIZE)
+            )
+        await migrated_db.dispose()
+        return plan
+
+    plan = asyncio.run(run())
+    assert any("ix_server_history_server_ip_start_id" in detail for detail in plan), plan
+    assert not any("TEMP B-TREE" in detail or detail.startswith("SCAN ") for detail in plan), plan
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from servercatcher.app.notification import handler
+from servercatcher.app.notification.handler import PollState, apply_fetch
+from servercatcher.app.notification.records import MSK, ParsedSnapshot, as_msk
+from servercatcher.app.notification.source import MergedFetch
+from servercatcher.app.notification.stats import rollup_history
+from servercatcher.app.notification.subscribers import SubscriberRegistry
+from servercatcher.core.models import ServerHistory, ServerStats
+
+A = {"ip": "1.1.1.1:27015", "name": "A"}
+B = {"ip": "2.2.2.2:27015", "name": "B"}
+C = "3.3.3.3:27015"
+DAY = timedelta(days=1).total_seconds()
+
+
+def at(day: int) -> datetime:
+    return datetime(2026, 1, day, 12, tzinfo=MSK)
+
+
+async def seed(db) -> None:
+    """A: дни 1-3, 5-6 и открыт с 8; B: дни 2-4; C — история старше server_stats"""
+    state = PollState()
+    for day, servers in ((1, [A]), (2, [A, B]), (3, [B]), (4, []), (5, [A]), (6, []), (8, [A])):
+        fetched = MergedFetch(
+            snapshot=ParsedSnapshot.from_raw(servers, "test"), digest=str(day), failed=frozenset()
+        )
+        await apply_fetch(state, fetched, at(day))
+    async with db.session_factory() as session:
+        session.add(ServerHistory(server_ip=C, start=at(1), end=at(2)))
+        await session.commit()
+
+
+async def snapshot(db) -> tuple[dict, list]:
+    async with db.session_factory() as session:
+        stats = {
+            row.ip_adress: (
+                row.placements, row.total_seconds, row.is_active,
+                row.rolled_placements, row.rolled_seconds, as_msk(row.rolled_until),
+            )
+            for row in (await session.execute(select(ServerStats))).scalars()
+        }
+        history = (await session.execute(
+            select(ServerHistory.server_ip, ServerHistory.start, ServerHistory.end).order_by(ServerHistory.id)
+        )).all()
+    return stats, [(ip, as_msk(start), as_msk(end)) for ip, start, end in history]
+
+
+async def rollup(db, before: datetime, limit: int) -> int:
+    async with db.session_factory() as session:
+        rolled = await rollup_history(session, before, limit)
+        await session.commit()
+    return rolled
+
+
+def test_rollup_moves_old_periods_into_stats_once(migrated_db, monkeypatch):
+    monkeypatch.setattr(handler, "subscribers", SubscriberRegistry())
+
+    async def run():
+        await seed(migrated_db)
+        stats_before, _ = await snapshot(migrated_db)
+
+        # Пачками по 2: результат тот же, что и одним проходом
+        assert await rollup(migrated_db, at(7), limit=2) == 2
+        assert await rollup(migrated_db, at(7), limit=2) == 2
+        assert await rollup(migrated_db, at(7), limit=2) == 0
+        stats, history = await snapshot(migrated_db)
+
+        # Повторный запуск ничего не меняет
+        assert await rollup(migrated_db, at(7), limit=2) == 0
+        assert await snapshot(migrated_db) == (stats, history)
+        await migrated_db.dispose()
+        return stats_before, stats, history
+
+    stats_before, stats, history = asyncio.run(run())
+    # Открытый период не сворачивается
+    assert history == [(A["ip"], at(8), None)]
+    # Итоги размещений не меняются, свернутое учитывается отдельно
+    assert stats[A["ip"]] == (*stats_before[A["ip"]][:3], 2, 3 * DAY, at(6))
+    assert stats[B["ip"]] == (*stats_before[B["ip"]][:3], 1, 2 * DAY, at(4))
+    # Период без строки в server_stats попадает и в итоги
+    assert C not in stats_before
+    assert stats[C] == (1, DAY, False, 1, DAY, at(2))
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from servercatcher.app.notification import scheduler
+from servercatcher.app.notification.scheduler import CircuitBreaker, PollScheduler
+from servercatcher.core import metrics
+
+
+class Stop(Exception):
+    pass
+
+
+class FakeClock:
+    """Монотонное время, которое двигают только цикл и сон планировщика"""
+
+    def __init__(self, ticks: int):
+        self.now = 0.0
+        self.ticks = ticks
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        if len(self.sleeps) == self.ticks:
+            raise Stop
+        self.now += delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(ticks=4)
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(scheduler, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+def run_cycles(clock: FakeClock, durations: list[float], fail: set[int] = frozenset()) -> list[float]:
+    """Запускает планировщик с периодом 10с и возвращает моменты начала циклов"""
+    starts: list[float] = []
+
+    async def cycle():
+        index = len(starts)
+        starts.append(clock.now)
+        clock.now += durations[index]
+        if index in fail:
+            raise RuntimeError("source down")
+        return None
+
+    poll = PollScheduler(interval=10, breaker=CircuitBreaker(threshold=10, cooldown=60))
+    with pytest.raises(Stop):
+        asyncio.run(poll.run(cycle))
+    return starts
+
+
+def test_ticks_keep_fixed_rate_regardless_of_cycle_time(clock):
+    assert run_cycles(clock, [3, 1, 6, 2]) == [0, 10, 20, 30]
+    assert clock.sleeps == [7, 9, 4, 8]
+
+
+def test_overrun_skips_missed_ticks_instead_of_bursting(clock):
+    overruns = sum(metrics.cycle_overruns._values.values())
+    # Второй цикл длится 25с: тики 20 и 30 пропущены, а не догоняются подряд
+    assert run_cycles(clock, [3, 25, 3, 3]) == [0, 10, 35, 45]
+    assert clock.sleeps == [7, 0, 7, 7]
+    assert sum(metrics.cycle_overruns._values.values()) == overruns + 1
+
+
+def test_failures_back_off_exponentially(clock):
+    assert run_cycles(clock, [0, 0, 0, 0], fail={0, 1}) == [0, 20, 60, 70]
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(monotonic=lambda: now.value))
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+    assert breaker.remaining() == 60
+
+    # После cooldown пропускается пробная попытка, ее ошибка снова размыкает
+    now.value = 60
+    assert breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.remaining() == 60
+
+    now.value = 120
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.failures == 0 and breaker.remaining() == 0
+
+    poll = PollScheduler(interval=10, backoff_max=300, breaker=breaker)
+    breaker.failures = 1
+    assert poll.next_period() == 20
+    breaker.failures = 6
+    assert poll.next_period() == 300
+    breaker.record_failure()
+    now.value = 150
+    assert poll.next_period() == 30
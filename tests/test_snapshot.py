@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from servercatcher.app.notification import handler
+from servercatcher.app.notification.records import MSK, ServerRecord
+from servercatcher.app.notification.snapshot import SnapshotCache
+
+
+class FailingSources:
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        raise ConnectionError("source is down")
+
+
+def record(ip: str) -> ServerRecord:
+    return ServerRecord(ip=ip, name=ip, source="main", start_raw=None, end_raw=None, start=None, end=None)
+
+
+def test_failing_source_is_fetched_once_for_concurrent_commands(monkeypatch):
+    sources = FailingSources()
+    cache = SnapshotCache()
+    old = cache.publish([record("1.1.1.1"), record("2.2.2.2")], datetime.now(MSK) - timedelta(hours=1))
+    monkeypatch.setattr(handler, "get_sources", lambda: sources)
+    monkeypatch.setattr(handler, "snapshot_cache", cache)
+    monkeypatch.setattr(handler, "poll_breaker", None)
+
+    async def run():
+        monkeypatch.setattr(handler, "_snapshot_refresh_lock", asyncio.Lock())
+        first = await asyncio.gather(*(handler.get_snapshot() for _ in range(20)))
+        # В окне ожидания новые команды тоже не ходят в источник
+        later = await handler.get_snapshot()
+        return first, later
+
+    first, later = asyncio.run(run())
+    assert sources.calls == 1
+    for snapshot in [*first, later]:
+        assert snapshot.stale
+        assert snapshot.servers == old.servers
+        assert snapshot.version == old.version
+
+
+def test_source_is_retried_after_backoff(monkeypatch):
+    sources = FailingSources()
+    cache = SnapshotCache()
+    cache.fail(datetime.now(MSK) - handler.SNAPSHOT_RETRY_AFTER - timedelta(seconds=1))
+    monkeypatch.setattr(handler, "get_sources", lambda: sources)
+    monkeypatch.setattr(handler, "snapshot_cache", cache)
+    monkeypatch.setattr(handler, "poll_breaker", None)
+
+    async def run():
+        monkeypatch.setattr(handler, "_snapshot_refresh_lock", asyncio.Lock())
+        return await handler.get_snapshot()
+
+    assert asyncio.run(run()) is None
+    assert sources.calls == 1
+
+
+def test_open_poll_breaker_skips_source(monkeypatch):
+    sources = FailingSources()
+    breaker = handler.CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure()
+    monkeypatch.setattr(handler, "get_sources", lambda: sources)
+    monkeypatch.setattr(handler, "snapshot_cache", SnapshotCache())
+    monkeypatch.setattr(handler, "poll_breaker", breaker)
+
+    assert asyncio.run(handler.get_snapshot()) is None
+    assert sources.calls == 0
+
+
+def test_publish_clears_failure():
+    cache = SnapshotCache()
+    cache.publish([record("1.1.1.1")], datetime.now(MSK))
+    assert cache.fail(datetime.now(MSK)).stale
+    cache.touch(datetime.now(MSK))
+    assert not cache.current.stale
+    assert cache.failed_at is None
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from servercatcher.app.notification.records import ServerRecord, SnapshotBuilder
+from servercatcher.app.notification.source import SourceSet
+from servercatcher.app.notification.streaming import ServersStreamParser
+
+
+class Source:
+    """Локальный источник: отдает body, с etag — отвечает 304 на If-None-Match"""
+
+    def __init__(self, etag: str | None):
+        self.etag = etag
+        self.body = b""
+        self.requests: list[str | None] = []
+
+    def serve(self, servers: list[dict]) -> None:
+        self.body = json.dumps({"servers": servers}).encode()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(request.headers.get("If-None-Match"))
+        headers = {"ETag": self.etag} if self.etag else {}
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=self.body, content_type="application/json", headers=headers)
+
+
+class Calls:
+    """Считает вызовы метода класса, не меняя его поведения"""
+
+    def __init__(self, monkeypatch, owner, name: str, wrap=lambda f: f):
+        self.count = 0
+        original = getattr(owner, name)
+
+        def counted(*args, **kwargs):
+            self.count += 1
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(owner, name, wrap(counted))
+
+
+def fetch_sequence(source: Source, bodies: list[list[dict]]) -> list:
+    async def run():
+        app = web.Application()
+        app.router.add_get("/servers", source.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        sources = SourceSet({"main": f"http://127.0.0.1:{port}/servers"})
+        results = []
+        try:
+            for servers in bodies:
+                source.serve(servers)
+                results.append(await sources.fetch())
+        finally:
+            await sources.close()
+            await runner.cleanup()
+        return results
+
+    return asyncio.run(run())
+
+
+SERVERS = [
+    {"ip": "1.1.1.1", "name": "a", "start": "01/01/2026", "end": "31/01/2026"},
+    {"ip": "2.2.2.2", "name": "b", "start": "01/01/2026"},
+]
+
+
+def test_not_modified_returns_previous_fetch_without_reading_body(monkeypatch):
+    feeds = Calls(monkeypatch, ServersStreamParser, "feed")
+    builds = Calls(monkeypatch, SnapshotBuilder, "build")
+    source = Source(etag='"v1"')
+
+    first, second = fetch_sequence(source, [SERVERS, SERVERS])
+    assert source.requests == [None, '"v1"']
+    assert second is first
+    assert feeds.count == 1 and builds.count == 1
+
+
+def test_same_body_without_validators_is_not_rebuilt(monkeypatch):
+    parses = Calls(monkeypatch, ServerRecord, "parse", wrap=staticmethod)
+    builds = Calls(monkeypatch, SnapshotBuilder, "build")
+    source = Source(etag=None)
+    changed = [SERVERS[0], {**SERVERS[1], "end": "28/02/2026"}]
+
+    first, same, third = fetch_sequence(source, [SERVERS, SERVERS, changed])
+    assert source.requests == [None, None, None]
+    # Тот же хеш: прошлый результат, цикл опроса получает тот же ключ
+    assert same is first
+    assert builds.count == 2
+    # Новое тело разбирает заново только изменившуюся запись
+    assert parses.count == 3
+    assert third.snapshot.by_ip["1.1.1.1"] is first.snapshot.by_ip["1.1.1.1"]
+    assert third.snapshot.by_ip["2.2.2.2"].end_raw == "28/02/2026"
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from servercatcher.app.notification import handler
+from servercatcher.app.notification.handler import PollState, apply_fetch
+from servercatcher.app.notification.records import MSK, ParsedSnapshot, as_msk
+from servercatcher.app.notification.source import MergedFetch
+from servercatcher.app.notification.stats import apply_placement, empty_stats
+from servercatcher.app.notification.subscribers import SubscriberRegistry
+from servercatcher.app.server.handler import cmd_stats, cmd_top
+from servercatcher.core.models import ServerStats
+
+IP = "<b>1.1.1.1</b>&"
+
+
+class FakeMessage:
+    def __init__(self, text: str):
+        self.text = text
+        self.answers: list[tuple[str, str | None]] = []
+
+    async def answer(self, text: str, parse_mode: str | None = None, **kwargs):
+        self.answers.append((text, parse_mode))
+
+
+def test_stats_and_top_escape_ip(migrated_db):
+    first_seen = datetime(2026, 1, 1, tzinfo=MSK)
+
+    async def run():
+        async with migrated_db.session_factory() as session:
+            session.add(ServerStats(
+                ip_adress=IP, placements=1, total_seconds=86400.0, rank_key=86400.0,
+                first_seen=first_seen, last_seen=first_seen, is_active=False,
+            ))
+            await session.commit()
+        stats, top = FakeMessage(f"/stats {IP}"), FakeMessage("/top")
+        await cmd_stats(stats)
+        await cmd_top(top)
+        await migrated_db.dispose()
+        return stats.answers + top.answers
+
+    for text, parse_mode in asyncio.run(run()):
+        assert parse_mode == "HTML"
+        assert "<code>&lt;b&gt;1.1.1.1&lt;/b&gt;&amp;</code>" in text
+        assert "<b>1.1.1.1</b>" not in text
+
+
+def at(day: int) -> datetime:
+    return datetime(2026, 1, day, 12, tzinfo=MSK)
+
+
+def test_stats_follow_add_remove_and_readd(migrated_db, monkeypatch):
+    monkeypatch.setattr(handler, "subscribers", SubscriberRegistry())
+    server = {"ip": "1.1.1.1:27015", "name": "A"}
+    state = PollState()
+
+    async def cycle(servers: list[dict], now: datetime) -> dict:
+        fetched = MergedFetch(
+            snapshot=ParsedSnapshot.from_raw(servers, "test"), digest=now.isoformat(), failed=frozenset()
+        )
+        await apply_fetch(state, fetched, now)
+        async with migrated_db.session_factory() as session:
+            row = (await session.execute(select(ServerStats))).scalar_one()
+        return {
+            "placements": row.placements,
+            "total_seconds": row.total_seconds,
+            "first_seen": as_msk(row.first_seen),
+            "last_seen": as_msk(row.last_seen),
+            "current_start": as_msk(row.current_start),
+            "is_active": row.is_active,
+            "rank_key": row.rank_key,
+        }
+
+    async def run():
+        added = await cycle([server], at(10))
+        assert added == {
+            "placements": 1, "total_seconds": 0.0, "first_seen": at(10), "last_seen": at(10),
+            "current_start": at(10), "is_active": True, "rank_key": -at(10).timestamp(),
+        }
+        removed = await cycle([], at(11))
+        assert removed == {
+            "placements": 1, "total_seconds": 86400.0, "first_seen": at(10), "last_seen": at(11),
+            "current_start": None, "is_active": False, "rank_key": 86400.0,
+        }
+        readded = await cycle([server], at(13))
+        assert readded == {
+            "placements": 2, "total_seconds": 86400.0, "first_seen": at(10), "last_seen": at(13),
+            "current_start": at(13), "is_active": True, "rank_key": 86400.0 - at(13).timestamp(),
+        }
+        await migrated_db.dispose()
+
+    asyncio.run(run())
+
+
+def test_reopen_with_old_start_does_not_count_time_twice():
+    row = empty_stats("1.1.1.1")
+    apply_placement(row, "open", at(1))
+    apply_placement(row, "close", at(5))
+    # Источник вернул сервер с прежней датой старта
+    apply_placement(row, "open", at(2))
+    assert row["current_start"] == at(5)
+    apply_placement(row, "close", at(6))
+    assert row["total_seconds"] == timedelta(days=5).total_seconds()
+    assert row["placements"] == 2
+    # Повторное открытие без закрытия продолжает текущее размещение
+    apply_placement(row, "open", at(7))
+    apply_placement(row, "open", at(8))
+    assert (row["placements"], row["current_start"]) == (3, at(7))
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from servercatcher.app.notification.streaming import ServersStreamParser, StreamFormatError
+
+
+def parse_chunks(chunks: list[bytes]) -> list:
+    parser = ServersStreamParser()
+    items = []
+    for chunk in chunks:
+        items += parser.feed(chunk)
+    return items + parser.close()
+
+
+def byte_chunks(body: bytes) -> list[bytes]:
+    return [body[i:i + 1] for i in range(len(body))]
+
+
+def test_items_split_at_every_byte():
+    servers = [
+        {"ip": "1.1.1.1:27015", "name": "Сервер №1", "start": "01.01.2026 00:00"},
+        {"ip": "[2001:db8::1]:27015", "players": -1.5e3, "tags": ["a", "]"]},
+        12,
+        "строка с \"кавычками\" и {скобками}",
+    ]
+    body = json.dumps({"meta": {"servers": [0]}, "servers": servers, "total": 4}, ensure_ascii=False)
+    assert parse_chunks(byte_chunks(body.encode())) == servers
+
+
+def test_items_returned_before_body_ends():
+    parser = ServersStreamParser()
+    assert parser.feed(b'{"servers": [{"ip": "1.1.1.1"}, {"ip": "2.2') == [{"ip": "1.1.1.1"}]
+    # Число на границе куска не принимается, пока не виден его конец
+    assert parser.feed(b'.2.2"}, 12') == [{"ip": "2.2.2.2"}]
+    assert parser.feed(b'34') == []
+    assert parser.feed(b']}') == [1234]
+    assert parser.close() == []
+
+
+def test_missing_servers_key_yields_nothing():
+    parser = ServersStreamParser()
+    assert parser.feed(b'{"other": [1, 2]}') == []
+    assert parser.close() == []
+    assert not parser.found
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'[{"ip": "1.1.1.1"}]',
+        b'{"servers": [{"ip": "1.1.1.1"}',
+        b'{"servers": [{"ip": "1.1.1.1"}]} {}',
+        b'{"servers" [1]}',
+        b'{"servers": [{"ip": 1.1.1}]}',
+        b'{"servers": [1 2]}',
+        b'{"servers": [{"ip": "a"} {"ip": "b"}]}',
+        b'{"servers": [{"ip": "a"},,{"ip": "b"}]}',
+        b'{"servers": [,1]}',
+        b'{"servers": [1,]}',
+        b'{"servers": [1],}',
+        b'{"servers": [1] "total": 1}',
+        b'{,"servers": [1]}',
+    ],
+)
+def test_malformed_body_is_rejected(body):
+    with pytest.raises(StreamFormatError):
+        parse_chunks(byte_chunks(body))
+
+
+def test_element_is_decoded_once_however_it_is_chunked():
+    parser = ServersStreamParser()
+    calls = []
+    raw_decode = parser._decoder.raw_decode
+
+    def counting_raw_decode(s, idx=0):
+        calls.append(idx)
+        return raw_decode(s, idx)
+
+    parser._decoder.raw_decode = counting_raw_decode
+    server = {"ip": "1.1.1.1", "text": "x\\\"]}" * 2000, "tags": [[{}]] * 100}
+    body = json.dumps({"servers": [server]}).encode()
+    items = []
+    for i in range(0, len(body), 7):
+        items += parser.feed(body[i:i + 7])
+    items += parser.close()
+    assert items == [server]
+    # Ключ "servers" и сам элемент — без повторного разбора незаконченного хвоста
+    assert len(calls) == 2
@@ -0,0 +1,16 @@
+from servercatcher.app.notification.filters import normalize_filter
+from servercatcher.app.subscription.handler import render_filters, usage
+
+
+def test_filter_values_are_escaped():
+    keyword = normalize_filter("keyword", "A<b>&C")
+    text = render_filters({("keyword", keyword), ("ip", "10.0.0.0/8")})
+    assert "<code>a&lt;b&gt;&amp;c</code>" in text
+    assert "<b>" not in text
+
+
+def test_usage_escapes_error_and_placeholders():
+    text = usage(ValueError("Некорректное имя хоста: <x>"))
+    assert "&lt;x&gt;" in text
+    # Справка содержит <тип> и <значение> — в HTML это были бы теги
+    assert "<тип>" not in text and "&lt;тип&gt;" in text
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from servercatcher.core.config import Settings
+from servercatcher.webhook import SECRET_HEADER, create_webhook_app
+
+SECRET = "test_secret-1"
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.updates = []
+
+    async def feed_update(self, bot, update):
+        self.updates.append(update)
+
+
+async def post(app, body: bytes, headers: dict[str, str]) -> int:
+    """POST через ASGI без HTTP-клиента, возвращает код ответа"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/telegram/webhook",
+        "raw_path": b"/telegram/webhook",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    await asyncio.sleep(0)
+    return status
+
+
+@pytest.fixture
+def webhook_env(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "1:test")
+    monkeypatch.setenv("BOT_MODE", "webhook")
+    monkeypatch.setenv("WEBHOOK_SECRET", SECRET)
+
+
+def test_webhook_mode_requires_secret(monkeypatch):
+    monkeypatch.setenv("BOT_MODE", "webhook")
+    monkeypatch.delenv("WEBHOOK_SECRET", raising=False)
+    with pytest.raises(ValidationError, match="WEBHOOK_SECRET"):
+        Settings()
+
+
+def test_webhook_secret_format_is_checked(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_SECRET", "has spaces")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_webhook_rejects_wrong_secret_and_bad_body(webhook_env):
+    dp = RecordingDispatcher()
+    app = create_webhook_app(dp, bot=None, allowed_updates=[])
+    update = json.dumps({"update_id": 1}).encode()
+
+    async def run():
+        return (
+            await post(app, update, {}),
+            await post(app, update, {SECRET_HEADER: "wrong"}),
+            await post(app, update, {SECRET_HEADER: "не ascii"}),
+            await post(app, b"{not json", {SECRET_HEADER: SECRET}),
+            await post(app, b'{"update_id": "x"}', {SECRET_HEADER: SECRET}),
+            await post(app, update, {SECRET_HEADER: SECRET}),
+        )
+
+    assert asyncio.run(run()) == (403, 403, 403, 400, 400, 200)
+    assert [update.update_id for update in dp.updates] == [1]